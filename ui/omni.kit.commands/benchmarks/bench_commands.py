@@ -0,0 +1,412 @@
+"""Benchmarks of omni.kit.commands and omni.kit.undo.
+
+Runs on plain Python, outside of Kit: carb, omni.ext, omni.kit.app, omni.kit.actions.core and the native
+_kit_commands module are replaced with minimal stubs before the extension modules are imported.
+
+Each scenario is run for every requested number of commands and reports the wall time, the throughput in operations
+per second and the peak memory allocated by Python (tracemalloc) while it ran. Results are written as JSON, and can
+be compared with the results of a previous run to catch regressions:
+
+    python benchmarks/bench_commands.py --sizes 1000,10000,100000 --output results.json
+    python benchmarks/bench_commands.py --sizes 1000,10000,100000 --baseline results.json --tolerance 0.25
+
+The process exits with 1 when a scenario is slower than its baseline by more than the tolerance.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import types
+from collections import namedtuple
+
+EXT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BenchmarkResult = namedtuple("BenchmarkResult", ["scenario", "size", "operations", "time", "ops_per_second", "peak_memory"])
+
+
+class _Settings:
+    def __init__(self, values):
+        self._values = dict(values)
+
+    def get(self, path):
+        return self._values.get(path, None)
+
+    def set(self, path, value):
+        self._values[path] = value
+
+    def set_default(self, path, value):
+        self._values.setdefault(path, value)
+
+
+def _add_stub_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    parent_name, _, child_name = name.rpartition(".")
+    if parent_name in sys.modules:
+        setattr(sys.modules[parent_name], child_name, module)
+    return module
+
+
+def _install_stubs(settings):
+    """Replace the Kit modules used by omni.kit.commands with stubs, so it can be imported by plain Python."""
+
+    def log(message):
+        pass
+
+    _add_stub_module("carb", log_error=log, log_warn=log, log_info=log, log_verbose=log)
+    _add_stub_module("carb.settings", get_settings=lambda: settings)
+    _add_stub_module("carb.profiler", begin=lambda mask, name: None, end=lambda mask: None)
+
+    sys.path.insert(0, EXT_PATH)
+    import omni
+    import omni.kit
+
+    _add_stub_module("omni.ext", IExt=object, get_extension_name=lambda ext_id: ext_id, EXTENSION_EVENT_SCRIPT_CHANGED=0)
+    # the update event stream never pops, so the crash report history is not formatted, as between two frames in Kit
+    app = types.SimpleNamespace(
+        get_update_event_stream=lambda: types.SimpleNamespace(create_subscription_to_pop=lambda fn, name="": object())
+    )
+    _add_stub_module("omni.kit.app", get_app=lambda: app)
+    _add_stub_module("omni.kit.actions")
+    _add_stub_module("omni.kit.actions.core", get_action_registry=lambda: None)
+    _add_stub_module("omni.kit.commands._kit_commands")
+
+
+_settings = _Settings(
+    {
+        "/exts/omni.kit.commands/crashReportHistoryCount": 10,
+        "/exts/omni.kit.commands/historyFullArgumentsCount": 1000,
+        "/exts/omni.kit.commands/historyMaxEntries": 100000,
+        "/exts/omni.kit.commands/undoStackMaxEntries": 0,
+        "/exts/omni.kit.commands/undoStackMaxMemory": 0,
+        "/exts/omni.kit.commands/undoMergeTimeWindow": 0,
+    }
+)
+_install_stubs(_settings)
+
+import omni.kit.commands  # noqa: E402
+import omni.kit.undo  # noqa: E402
+
+
+class BenchAppendCommand(omni.kit.commands.Command):
+    def __init__(self, target: list, value: int = 0):
+        self._target = target
+        self._value = value
+
+    def do(self):
+        self._target.append(self._value)
+
+    def undo(self):
+        del self._target[-1]
+
+
+class BenchAppendNoUndoCommand(omni.kit.commands.Command):
+    def __init__(self, target: list, value: int = 0):
+        self._target = target
+        self._value = value
+
+    def do(self):
+        self._target.append(self._value)
+
+
+class BenchNestedCommand(omni.kit.commands.Command):
+    """Executes **depth** levels of nested commands, each appending to **target**."""
+
+    def __init__(self, target: list, depth: int = 1):
+        self._target = target
+        self._depth = depth
+
+    def do(self):
+        if self._depth > 1:
+            omni.kit.commands.execute("BenchNested", target=self._target, depth=self._depth - 1)
+        self._target.append(self._depth)
+
+    def undo(self):
+        del self._target[-1]
+
+
+_COMMANDS = (BenchAppendCommand, BenchAppendNoUndoCommand, BenchNestedCommand)
+# number of callbacks registered for the callback heavy scenario
+CALLBACK_COUNT = 10
+# number of commands per group and depth of the nested commands in the group scenarios
+GROUP_SIZE = 10
+NESTED_DEPTH = 5
+
+
+def _reset():
+    omni.kit.undo.clear_stack()
+    omni.kit.undo.clear_history()
+    omni.kit.undo.set_undo_stack_limits(0, 0)
+
+
+def _execute(size):
+    target = []
+    for i in range(size):
+        omni.kit.commands.execute("BenchAppend", target=target, value=i)
+    return size
+
+
+def _execute_no_undo(size):
+    target = []
+    for i in range(size):
+        omni.kit.commands.execute("BenchAppendNoUndo", target=target, value=i)
+    return size
+
+
+def _execute_disabled_bulk(size):
+    target = []
+    with omni.kit.undo.disabled(bulk=True):
+        for i in range(size):
+            omni.kit.commands.execute("BenchAppend", target=target, value=i)
+    return size
+
+
+def _execute_batch(size):
+    target = []
+    omni.kit.commands.execute_batch("BenchAppend", [{"target": target, "value": i} for i in range(size)])
+    return size
+
+
+def _setup_undo_redo(size):
+    _execute(size)
+
+
+def _undo(size):
+    for _ in range(size):
+        omni.kit.undo.undo()
+    return size
+
+
+def _setup_redo(size):
+    _execute(size)
+    _undo(size)
+
+
+def _redo(size):
+    for _ in range(size):
+        omni.kit.undo.redo()
+    return size
+
+
+def _groups(size):
+    target = []
+    for _ in range(size // GROUP_SIZE):
+        with omni.kit.undo.group():
+            for j in range(GROUP_SIZE):
+                omni.kit.commands.execute("BenchAppend", target=target, value=j)
+    return size
+
+
+def _setup_undo_groups(size):
+    _groups(size)
+
+
+def _undo_groups(size):
+    for _ in range(size // GROUP_SIZE):
+        omni.kit.undo.undo()
+    return size
+
+
+def _nested(size):
+    target = []
+    for _ in range(size // NESTED_DEPTH):
+        omni.kit.commands.execute("BenchNested", target=target, depth=NESTED_DEPTH)
+    return size
+
+
+def _setup_callbacks(size):
+    callback_ids = []
+    for _ in range(CALLBACK_COUNT):
+        for cb_type in (omni.kit.commands.PRE_DO_CALLBACK, omni.kit.commands.POST_DO_CALLBACK):
+            callback_ids.append(omni.kit.commands.register_callback("BenchAppend", cb_type, lambda info: None))
+    return callback_ids
+
+
+def _teardown_callbacks(callback_ids):
+    for callback_id in callback_ids:
+        omni.kit.commands.unregister_callback(callback_id)
+
+
+def _setup_history_overflow(size):
+    # fill the history up to its limit, so every command executed by the benchmark evicts the oldest entry
+    omni.kit.undo.set_history_max_entries(size)
+    _execute_no_undo(size)
+
+
+def _teardown_history_overflow(_):
+    omni.kit.undo.set_history_max_entries(_default_max_history_entries)
+
+
+def _setup_undo_stack_limit(size):
+    omni.kit.undo.set_undo_stack_limits(max_entries=max(size // 10, 1))
+
+
+_default_max_history_entries = _settings.get("/exts/omni.kit.commands/historyMaxEntries")
+
+Scenario = namedtuple("Scenario", ["name", "run", "setup", "teardown"])
+Scenario.__new__.__defaults__ = (None, None)
+
+SCENARIOS = [
+    Scenario("execute", _execute),
+    Scenario("execute_no_undo", _execute_no_undo),
+    Scenario("execute_disabled_bulk", _execute_disabled_bulk),
+    Scenario("execute_batch", _execute_batch),
+    Scenario("undo", _undo, _setup_undo_redo),
+    Scenario("redo", _redo, _setup_redo),
+    Scenario("group", _groups),
+    Scenario("undo_group", _undo_groups, _setup_undo_groups),
+    Scenario("nested", _nested),
+    Scenario("execute_callbacks", _execute, _setup_callbacks, _teardown_callbacks),
+    Scenario("history_overflow", _execute_no_undo, _setup_history_overflow, _teardown_history_overflow),
+    Scenario("undo_stack_limit", _execute, _setup_undo_stack_limit),
+]
+
+
+def _run_once(scenario: Scenario, size: int, trace_memory: bool):
+    _reset()
+    state = scenario.setup(size) if scenario.setup else None
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        operations = scenario.run(size)
+        elapsed = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        if scenario.teardown:
+            scenario.teardown(state)
+        _reset()
+    return operations, elapsed, peak_memory
+
+
+def run_scenario(scenario: Scenario, size: int, trace_memory: bool = True) -> BenchmarkResult:
+    """Run **scenario** for **size** commands on empty undo stack and history, and measure it.
+
+    Tracing allocations slows Python down a lot, so the memory is measured by a second run of the scenario.
+    """
+    operations, elapsed, _ = _run_once(scenario, size, False)
+    peak_memory = _run_once(scenario, size, True)[2] if trace_memory else 0
+
+    ops_per_second = operations / elapsed if elapsed > 0 else 0.0
+    return BenchmarkResult(scenario.name, size, operations, elapsed, ops_per_second, peak_memory)
+
+
+def run(sizes, scenario_names=None, trace_memory=True, verbose=True):
+    """Run the benchmarks.
+
+    Args:
+        sizes: Numbers of commands to run each scenario with.
+        scenario_names: Names of the scenarios to run, all of them if None.
+        trace_memory: Measure the peak memory, which runs every scenario twice.
+        verbose: Print each result as it completes.
+
+    Returns:
+        List of :class:`BenchmarkResult`.
+    """
+    for command in _COMMANDS:
+        omni.kit.commands.register(command)
+    omni.kit.commands.set_logging_enabled(False)
+
+    results = []
+    try:
+        for scenario in SCENARIOS:
+            if scenario_names and scenario.name not in scenario_names:
+                continue
+            for size in sizes:
+                result = run_scenario(scenario, size, trace_memory)
+                results.append(result)
+                if verbose:
+                    print(
+                        f"{result.scenario:>24} {result.size:>9} {result.time:>10.4f}s "
+                        f"{result.ops_per_second:>12.0f} ops/s {result.peak_memory / 1024 / 1024:>9.2f} MB"
+                    )
+    finally:
+        omni.kit.commands.set_logging_enabled(True)
+        for command in _COMMANDS:
+            omni.kit.commands.unregister(command)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Returns the results slower than the same scenario and size in **baseline** by more than **tolerance**.
+
+    Args:
+        results: List of :class:`BenchmarkResult`.
+        baseline: Dictionary loaded from the JSON output of a previous run.
+        tolerance: Allowed relative slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        List of tuples (result, baseline operations per second).
+    """
+    baseline_ops = {(r["scenario"], r["size"]): r["ops_per_second"] for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        expected = baseline_ops.get((result.scenario, result.size), None)
+        if expected and result.ops_per_second < expected * (1.0 - tolerance):
+            regressions.append((result, expected))
+    return regressions
+
+
+def _to_json(results):
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.time(),
+        "results": [result._asdict() for result in results],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated numbers of commands")
+    parser.add_argument("--scenarios", default="", help="comma separated scenario names, all if empty")
+    parser.add_argument("--output", default="", help="path of the JSON file to write the results to")
+    parser.add_argument("--baseline", default="", help="path of the JSON results of a previous run to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown from the baseline")
+    parser.add_argument("--no-memory", action="store_true", help="don't measure memory, which runs each scenario twice")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for scenario in SCENARIOS:
+            print(scenario.name)
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    scenario_names = {name for name in args.scenarios.split(",") if name}
+    unknown = scenario_names - {scenario.name for scenario in SCENARIOS}
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = run(sizes, scenario_names, trace_memory=not args.no_memory)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(_to_json(results), f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for result, expected in regressions:
+            print(
+                f"REGRESSION {result.scenario} ({result.size}): {result.ops_per_second:.0f} ops/s, "
+                f"baseline {expected:.0f} ops/s"
+            )
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
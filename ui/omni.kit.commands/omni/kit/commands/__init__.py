@@ -53,14 +53,25 @@ from .command import (
     get_commands,
     get_commands_list,
     execute,
+    execute_async,
+    execute_batch,
     execute_argv,
     get_argument_parser_from_function,
     _log_error,
     set_logging_enabled,
 )
+from .profiler import (
+    CommandProfileStats,
+    set_profiling_enabled,
+    is_profiling_enabled,
+    get_profile_stats,
+    reset_profile_stats,
+    export_profile_stats,
+)
 from .command_actions import register_actions, deregister_actions
 from .command_bridge import CommandBridge
 from .on_change import subscribe_on_change, unsubscribe_on_change, _dispatch_changed
+import carb.settings
 import omni.ext
 import omni.kit.app
 
@@ -76,6 +87,15 @@ class CommandExt(omni.ext.IExt):
     """
 
     def on_startup(self, ext_id):
+        settings = carb.settings.get_settings()
+        set_profiling_enabled(settings.get("/exts/omni.kit.commands/profilerEnabled") or False)
+
+        # Record executed commands to a journal file if requested
+        if settings.get("/exts/omni.kit.commands/journalPath"):
+            import omni.kit.undo
+
+            omni.kit.undo.start_journal()
+
         # Setup the command bridge
         self._command_bridge = CommandBridge()
         self._command_bridge.on_startup()
@@ -111,3 +131,7 @@ class CommandExt(omni.ext.IExt):
         # Shutdown the command bridge
         self._command_bridge.on_shutdown()
         self._command_bridge = None
+
+        import omni.kit.undo
+
+        omni.kit.undo.stop_journal()
@@ -18,8 +18,15 @@ POST_DO_CALLBACK = 'post_do'
 
 # Callback dictionary:
 #   Keys: tuple(command class name minus any trailing 'Command', module name), callback type.
-#   Value: list of callables.
-_callbacks: Dict[Tuple[str, str], Dict[str, List[Callable]]] = defaultdict(lambda: defaultdict(list))
+#   Value: tuple of callables. Tuples are replaced rather than modified, so that callbacks can be (un)registered
+#          while they are being called. Empty entries are removed, so only commands with callbacks have an entry.
+_callbacks: Dict[Tuple[str, str], Dict[str, Tuple[Callable, ...]]] = {}
+
+# Resolved command name dictionary, so that executing a command is a single lookup:
+#   Keys: command name exactly as passed to execute() (with or without module name and 'Command' suffix).
+#   Value: tuple(command class, callback dictionary of that command or None if it has no callbacks).
+# Must be cleared whenever commands or callbacks are registered or unregistered.
+_resolved_names: Dict[str, Tuple[Type["Command"], Dict[str, Tuple[Callable, ...]]]] = {}
 
 # Callback ID object. We don't expose this publicly to prevent users from relying on its internal representation.
 class CallbackID:
@@ -40,11 +47,21 @@ class Command(ABC):
     def do(self):
         pass
 
+    async def do_async(self):
+        """Asynchronous version of ``do()``, used when the command is executed with :func:`execute_async`.
+
+        Long running commands can override it to yield to the Kit update loop between chunks of work, e.g. with
+        ``await omni.kit.app.get_app().next_update_async()``, instead of blocking the UI. Redo and repeat still call
+        ``do()``, so both methods must perform the same changes. By default it calls ``do()``.
+        """
+        return self.do()
+
     def modify_callback_info(self, cb_type: str, args: Dict[str, Any]) -> Dict[str, Any]:
         """Returns a dictionary of information to be passed to callbacks of the given type.
 
         By default callbacks are passed a copy of the arguments which were passed to **execute()** when the command
-        was invoked. This method can be overridden to modify that information for specific callback types.
+        was invoked, the same copy for all the callback types. This method can be overridden to modify that
+        information for specific callback types, it is then called with a new copy for each callback type.
 
         Args:
             cb_type: Type of callback the information will be passed to.
@@ -57,6 +74,45 @@ class Command(ABC):
         """
         return args
 
+    def can_merge(self, other: "Command") -> bool:
+        """Returns True if the **other** command, executed right after this one, can be merged into this one.
+
+        When merging is enabled with :func:`omni.kit.undo.set_undo_merge_time_window` (or the
+        "/exts/omni.kit.commands/undoMergeTimeWindow" setting), consecutive root level commands executed within the
+        time window are merged into a single undo entry and history entry when this returns True. It keeps the undo
+        stack and the history small during interactive edits, e.g. when dragging a slider. By default commands are
+        never merged. Commands that can be merged must not execute other commands from their ``do()`` method.
+
+        Args:
+            other: **Command** that has just been executed.
+
+        Returns:
+            True if **other** can be merged into this command with :meth:`merge`.
+        """
+        return False
+
+    def merge(self, other: "Command"):
+        """Merge the **other** command, which has already been executed, into this one.
+
+        After merging, ``undo()`` must revert the changes of both commands and ``do()`` must redo both of them.
+
+        Args:
+            other: **Command** that has just been executed, for which :meth:`can_merge` returned True.
+        """
+        pass
+
+    def get_memory_footprint(self) -> int:
+        """Returns an estimate of the memory (in bytes) kept alive by this command while it is on the undo stack.
+
+        It is used to limit the memory used by the undo stack, see :func:`omni.kit.undo.set_undo_stack_limits`.
+        By default commands are assumed not to hold any significant data. Commands that keep large data around
+        to be able to undo (e.g. copies of layers) should override this method.
+
+        Returns:
+            Estimated number of bytes.
+        """
+        return 0
+
 
 def _log_error(message: str):
     if LOGGING_ENABLED:
@@ -81,6 +137,23 @@ def _get_module_and_stripped_class(name: str) -> Tuple[str, str]:
     return _get_module_and_class(name)
 
 
+def _clear_resolved_names():
+    _resolved_names.clear()
+
+
+def _resolve_name(name: str) -> Tuple[Type[Command], Dict[str, Tuple[Callable, ...]]]:
+    resolved = _resolved_names.get(name, None)
+    if resolved is not None:
+        return resolved
+
+    module_name, class_name = _get_module_and_stripped_class(name)
+    resolved = (_find_command_class(name), _callbacks.get((class_name, module_name), None))
+    # Failed lookups are not cached so that they keep reporting errors (e.g. for ambiguous names)
+    if resolved[0] is not None:
+        _resolved_names[name] = resolved
+    return resolved
+
+
 def create(name, **kwargs):
     """Create **Command** object.
 
@@ -112,7 +185,7 @@ def register(command_class: Type[Command]):
     name = command_class.__name__
     module = command_class.__module__
 
-    if module in _commands[name]:
+    if module in _commands.get(name, ()):
         carb.log_verbose('Command: "{}" is already registered. Overwriting it.'.format(name))
 
     # If the class contains the "Command" suffix, register it without the suffix
@@ -120,6 +193,7 @@ def register(command_class: Type[Command]):
         name = name[:-7]
 
     _commands[name][module] = command_class
+    _clear_resolved_names()
 
     _dispatch_changed()
 
@@ -224,8 +298,11 @@ def unregister(command_class: Type[Command]):
         name = name[:-7]
 
     module = command_class.__module__
-    _commands[name].pop(module, None)
+    cmds = _commands.get(name, None)
+    if cmds is not None:
+        cmds.pop(module, None)
     _callbacks.pop((name, module), None)
+    _clear_resolved_names()
 
     _dispatch_changed()
 
@@ -239,16 +316,19 @@ def get_command_class(name: str) -> Type[Command]:
     Returns:
         **Command** class if succeeded. `None` if can't find a command with this name.
     """
+    return _resolve_name(name)[0]
+
 
+def _find_command_class(name: str) -> Type[Command]:
     module_name, class_name = _get_module_and_class(name)
 
-    cmds = _commands[class_name]
-    if len(cmds) == 0:
+    cmds = _commands.get(class_name, None)
+    if not cmds:
         # Backward compatibility - allow commands to be invoked with "Command" suffix in their name
         if name.endswith("Command"):
             stripped_name = name[:-7]
             module_name, class_name = _get_module_and_class(stripped_name)
-            cmds = _commands[class_name]
+            cmds = _commands.get(class_name, None)
             if not cmds:
                 return None
         else:
@@ -306,14 +386,16 @@ def register_callback(name: str, cb_type: str, callback: Callable[[Dict[str, Any
                   execute(), but this may be overridden by individual commands so check their documentation.
                   Many command parameters are optional so it is important that callbacks check for their
                   presence before attempting to access them. The callback must not make any changes to
-                  the dictionary passed to it.
+                  the dictionary passed to it, which may be a read-only mapping.
 
     Returns:
         An ID that can be passed to **unregister_callback**.
     """
     global _callbacks
     module_name, class_name = _get_module_and_stripped_class(name)
-    _callbacks[(class_name, module_name)][cb_type] += [callback]
+    cbs = _callbacks.setdefault((class_name, module_name), {})
+    cbs[cb_type] = cbs.get(cb_type, ()) + (callback,)
+    _clear_resolved_names()
     return CallbackID(class_name, module_name, cb_type, callback)
 
 
@@ -326,12 +408,18 @@ def unregister_callback(id: CallbackID):
     global _callbacks
     if isinstance(id, CallbackID):
         class_name, module_name, cb_type, callback = id.get()
-        cbs = _callbacks[(class_name, module_name)][cb_type]
-        try:
-            cbs.remove(callback)
+        cbs = _callbacks.get((class_name, module_name), {})
+        if callback in cbs.get(cb_type, ()):
+            remaining = list(cbs[cb_type])
+            remaining.remove(callback)
+            if remaining:
+                cbs[cb_type] = tuple(remaining)
+            else:
+                del cbs[cb_type]
+                if not cbs:
+                    del _callbacks[(class_name, module_name)]
+            _clear_resolved_names()
             return
-        except:
-            pass
         carb.log_error(f'Attempt to unregister a {cb_type} callback on {module_name}.{class_name} which was not registered.')
     else:
         carb.log_error('Invalid callback id')
@@ -420,20 +508,39 @@ def get_commands_list() -> List[Type[Command]]:
     return [c for m in _commands.values() for c in m.values()]
 
 
-def _get_callback_info(cb_type:str, command: Command, cmd_args: Dict[str, Any]) -> Dict[str, Any]:
+def _has_default_callback_info(command: Command) -> bool:
+    return getattr(type(command), "modify_callback_info", None) is Command.modify_callback_info
+
+
+def _get_callback_info(cb_type: str, command: Command, cmd_args: Dict[str, Any]) -> Dict[str, Any]:
     cmd_args = cmd_args.copy()
+    if _has_default_callback_info(command):
+        return cmd_args
+
     info = command.modify_callback_info(cb_type, cmd_args)
     if isinstance(info, dict):
         return info
     return cmd_args
 
-def _call_callbacks(command: Command, name: str, kwargs: Dict[str, Any], cb_type: str):
-    module_name, class_name = _get_module_and_stripped_class(name)
-    callbacks = _callbacks[(class_name, module_name)][cb_type]
+
+def _call_callbacks(
+    command: Command, name: str, kwargs: Dict[str, Any], cb_type: str, info: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """Call the callbacks of **cb_type** registered for the command.
+
+    Returns the information passed to the callbacks when the callbacks of the other types can be passed the same
+    (as **info**), so it's computed once for the pre and post callbacks. None otherwise.
+    """
+    shared = _has_default_callback_info(command)
+    callbacks = _resolve_name(name)[1]
+    callbacks = callbacks.get(cb_type, None) if callbacks else None
     if callbacks:
-        info = _get_callback_info(cb_type, command, kwargs)
+        if info is None or not shared:
+            info = _get_callback_info(cb_type, command, kwargs)
         for cb in callbacks:
             cb(info)
+    return info if shared else None
+
 
 def execute(name, **kwargs) -> Tuple[bool, Any]:
     """Execute **Command**.
@@ -460,6 +567,67 @@ def execute(name, **kwargs) -> Tuple[bool, Any]:
     return result
 
 
+async def execute_async(name, **kwargs) -> Tuple[bool, Any]:
+    """Execute **Command** asynchronously by awaiting its ``do_async()`` method.
+
+    The command is put on the undo stack and in the history the same way as with :func:`execute`. Asynchronous
+    commands are executed one at a time. The commands executed by ``do_async()`` are recorded as descendants of
+    the command and undone together with it, while the ones executed by others in the meantime are recorded on
+    their own. Undo, redo and repeat do nothing until the command completes.
+
+    Args:
+        name: **Command** name. Can be class name (e.g. "My") or full name including module (e.g. "foo.bar.MyCommand")
+        **kwargs: Arbitrary keyword arguments to be passed into into **Command** constructor.
+    """
+    # Create command using passed params
+    command = create(name, **kwargs)
+
+    # Check command is valid
+    if not command:
+        _log_error("Can't execute command: \"{}\", it wasn't registered or ambigious.".format(name))
+        return (False, None)
+    if not callable(getattr(command, "do", None)):
+        _log_error("Can't execute command: \"{}\", it doesn't have do() method.".format(name))
+        return (False, None)
+
+    import omni.kit.undo  # Prevent a circular dependency which breaks the doc-gen
+
+    # Execute the command.
+    return await omni.kit.undo.execute_async(command, name, kwargs)
+
+
+def execute_batch(name, kwargs_list: List[Dict[str, Any]]) -> Tuple[bool, Any]:
+    """Execute **Command** once for each set of arguments, as a single undoable operation.
+
+    This is much cheaper than calling :func:`execute` in a loop for large numbers of the same command
+    (e.g. transforming many prims): only one undo entry and one history entry are created, and change
+    listeners are notified once. Pre- and post-do callbacks are still called for every command.
+
+    Args:
+        name: **Command** name. Can be class name (e.g. "My") or full name including module (e.g. "foo.bar.MyCommand")
+        kwargs_list: List of keyword arguments dictionaries, one for each **Command** to be constructed and executed.
+
+    Returns:
+        (True, list of results of each **Command**) if succeeded. (False, None) if failed, in which case all the
+        commands executed as part of the batch are undone.
+    """
+    command_class = get_command_class(name)
+
+    # Check command is valid
+    if not command_class:
+        _log_error("Can't execute command: \"{}\", it wasn't registered or ambigious.".format(name))
+        return (False, None)
+    if not callable(getattr(command_class, "do", None)):
+        _log_error("Can't execute command: \"{}\", it doesn't have do() method.".format(name))
+        return (False, None)
+    if not kwargs_list:
+        return (True, [])
+
+    import omni.kit.undo  # Prevent a circular dependency which breaks the doc-gen
+
+    return omni.kit.undo.execute_batch(command_class, name, list(kwargs_list))
+
+
 def execute_argv(name, argv: list) -> Tuple[bool, Any]:
     """Execute **Command** using argument list..
 
@@ -0,0 +1,161 @@
+"""Per **Command** execution statistics.
+
+Profiling is disabled by default and then costs a single flag check per executed command. It can be enabled with
+the "/exts/omni.kit.commands/profilerEnabled" setting or :func:`set_profiling_enabled`. When enabled, the time spent
+in ``do()``, ``undo()`` and in the callbacks of every command is recorded per command name, and each ``do()`` is also
+reported to carb profiler as a zone named after the command.
+
+Times include the time spent in the commands executed by the command itself.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict, deque, namedtuple
+from typing import Dict
+
+import carb
+import carb.settings
+
+CommandProfileStats = namedtuple(
+    "CommandProfileStats",
+    [
+        "count",
+        "total_time",
+        "p50_time",
+        "p99_time",
+        "undo_count",
+        "undo_total_time",
+        "undo_p50_time",
+        "undo_p99_time",
+        "callback_time",
+    ],
+)
+CommandProfileStats.__doc__ = """Execution statistics of a **Command**, all times are in seconds.
+
+count: Number of times ``do()`` was called.
+total_time: Total time spent in ``do()``.
+p50_time, p99_time: Median and 99th percentile of the time spent in ``do()``, over the most recent calls.
+undo_count: Number of times ``undo()`` was called.
+undo_total_time: Total time spent in ``undo()``.
+undo_p50_time, undo_p99_time: Median and 99th percentile of the time spent in ``undo()``, over the most recent calls.
+callback_time: Total time spent in the pre- and post-do callbacks registered for the command.
+"""
+
+DO = "do"
+UNDO = "undo"
+CALLBACK = "callback"
+
+# checked by the undo system before each command, keep it a plain module attribute
+_enabled = False
+
+
+class _Samples:
+    def __init__(self, max_samples):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=max_samples)
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.recent.append(duration)
+
+    def percentile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+_stats: Dict[str, Dict[str, _Samples]] = {}
+_trace_events = deque(maxlen=10000)
+_max_samples = 1000
+
+
+def set_profiling_enabled(enabled: bool):
+    """Enable or disable recording of **Command** execution statistics. Recorded statistics are kept."""
+    global _enabled, _max_samples, _trace_events
+    if enabled and not _enabled:
+        settings = carb.settings.get_settings()
+        _max_samples = settings.get("/exts/omni.kit.commands/profilerMaxSamples") or 1000
+        max_trace_events = settings.get("/exts/omni.kit.commands/profilerMaxTraceEvents") or 10000
+        if _trace_events.maxlen != max_trace_events:
+            _trace_events = deque(_trace_events, maxlen=max_trace_events)
+    _enabled = bool(enabled)
+
+
+def is_profiling_enabled() -> bool:
+    """Returns True if **Command** execution statistics are being recorded."""
+    return _enabled
+
+
+def reset_profile_stats():
+    """Clear all recorded **Command** execution statistics and trace events."""
+    _stats.clear()
+    _trace_events.clear()
+
+
+def get_profile_stats() -> Dict[str, CommandProfileStats]:
+    """Get the recorded execution statistics.
+
+    Returns:
+        Dictionary of :class:`CommandProfileStats` keyed by **Command** name, as passed to **execute()**.
+    """
+    result = {}
+    empty = _Samples(1)
+    for name, samples in _stats.items():
+        do = samples.get(DO, empty)
+        undo = samples.get(UNDO, empty)
+        callback = samples.get(CALLBACK, empty)
+        result[name] = CommandProfileStats(
+            do.count,
+            do.total,
+            do.percentile(0.5),
+            do.percentile(0.99),
+            undo.count,
+            undo.total,
+            undo.percentile(0.5),
+            undo.percentile(0.99),
+            callback.total,
+        )
+    return result
+
+
+def export_profile_stats(format: str = "json") -> str:
+    """Export the recorded execution statistics.
+
+    Args:
+        format: "json" for the statistics returned by :func:`get_profile_stats` keyed by **Command** name, or
+                "chrome" for the most recent calls as Chrome trace events, to be loaded in chrome://tracing or
+                Perfetto.
+
+    Returns:
+        JSON string, empty string if the format is not supported.
+    """
+    if format == "json":
+        return json.dumps({name: stats._asdict() for name, stats in get_profile_stats().items()}, indent=4)
+    if format == "chrome":
+        return json.dumps({"traceEvents": list(_trace_events), "displayTimeUnit": "ms"})
+
+    carb.log_error(f"Unsupported profile stats export format: {format}")
+    return ""
+
+
+def _record(name: str, kind: str, start: float, end: float):
+    samples = _stats.get(name)
+    if samples is None:
+        samples = _stats[name] = defaultdict(lambda: _Samples(_max_samples))
+    samples[kind].add(end - start)
+
+    _trace_events.append(
+        {
+            "name": name,
+            "cat": kind,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+    )
@@ -1,3 +1,9 @@
+import asyncio
+import json
+import os
+import tempfile
+import carb.settings
+import omni.kit.app
 import omni.kit.test
 import omni.kit.commands
 import omni.kit.undo
@@ -111,6 +117,79 @@ class TestCommandParameters(omni.kit.commands.Command):
         pass
 
 
+class TestSetValueCommand(omni.kit.commands.Command):
+    def __init__(self, index, value):
+        self._index = index
+        self._value = value
+        self._prev = None
+
+    def do(self):
+        global _result
+        self._prev = _result[self._index]
+        _result[self._index] = self._value
+
+    def undo(self):
+        global _result
+        _result[self._index] = self._prev
+
+    def can_merge(self, other):
+        return isinstance(other, TestSetValueCommand) and other._index == self._index
+
+    def merge(self, other):
+        self._value = other._value
+
+
+class TestAppendAsyncCommand(omni.kit.commands.Command):
+    def __init__(self, values):
+        self._values = values
+
+    def do(self):
+        global _result
+        _result.extend(self._values)
+
+    async def do_async(self):
+        global _result
+        for value in self._values:
+            _result.append(value)
+            await omni.kit.app.get_app().next_update_async()
+
+    def undo(self):
+        global _result
+        del _result[-len(self._values) :]
+
+
+class TestAppendNestedCommand(omni.kit.commands.Command):
+    def __init__(self, x, y):
+        self._x = x
+        self._y = y
+        self.undone = None
+
+    def do(self):
+        global _result
+        _result.append(self._x)
+        omni.kit.commands.execute("TestAppend", x=self._y, y=self._y)
+
+    def undo(self):
+        global _result
+        self.undone = _result.pop()
+
+
+class TestExecuteAsyncCommand(omni.kit.commands.Command):
+    def __init__(self, x, y):
+        self._x = x
+        self._y = y
+
+    def do(self):
+        omni.kit.commands.execute("TestAppend", x=self._x, y=self._y)
+
+    async def do_async(self):
+        await omni.kit.app.get_app().next_update_async()
+        omni.kit.commands.execute("TestAppend", x=self._x, y=self._y)
+
+    def undo(self):
+        pass
+
+
 class TestCommands(omni.kit.test.AsyncTestCase):
     async def setUp(self):
         # Cache the command tests interface.
@@ -130,6 +209,10 @@ class TestCommands(omni.kit.test.AsyncTestCase):
         omni.kit.commands.register(TestNoBaseCommand)
         omni.kit.commands.register(TestMissingDoMethod)
         omni.kit.commands.register(TestCommandParameters)
+        omni.kit.commands.register(TestSetValueCommand)
+        omni.kit.commands.register(TestAppendAsyncCommand)
+        omni.kit.commands.register(TestExecuteAsyncCommand)
+        omni.kit.commands.register(TestAppendNestedCommand)
 
     async def tearDown(self):
         # Unregister all commands
@@ -139,6 +222,10 @@ class TestCommands(omni.kit.test.AsyncTestCase):
         omni.kit.commands.unregister(TestNoBaseCommand)
         omni.kit.commands.unregister(TestMissingDoMethod)
         omni.kit.commands.unregister(TestCommandParameters)
+        omni.kit.commands.unregister(TestSetValueCommand)
+        omni.kit.commands.unregister(TestAppendAsyncCommand)
+        omni.kit.commands.unregister(TestExecuteAsyncCommand)
+        omni.kit.commands.unregister(TestAppendNestedCommand)
 
         omni.kit.commands.set_logging_enabled(True)
 
@@ -508,6 +595,438 @@ class TestCommands(omni.kit.test.AsyncTestCase):
         omni.kit.commands.unregister_callback(pre_cb)
         omni.kit.commands.unregister_callback(post_cb)
 
+    async def test_callback_dispatch(self):
+        global _result
+        _result = []
+        infos = []
+
+        # Commands which don't customize callback info pass one copy of their arguments to pre and post callbacks
+        pre_cb = omni.kit.commands.register_callback("TestAppendNoUndo", omni.kit.commands.PRE_DO_CALLBACK, infos.append)
+        post_cb = omni.kit.commands.register_callback("TestAppendNoUndo", omni.kit.commands.POST_DO_CALLBACK, infos.append)
+        omni.kit.commands.execute("TestAppendNoUndo", x=1, y=2)
+        self.assertEqual(len(infos), 2)
+        self.assertDictEqual(infos[0], {"x": 1, "y": 2})
+        self.assertIs(infos[0], infos[1])
+        infos[0]["x"] = 3
+        infos.clear()
+        omni.kit.commands.execute("TestAppendNoUndo", x=1, y=2)
+        self.assertDictEqual(infos[0], {"x": 1, "y": 2})
+
+        # Callbacks can be unregistered while callbacks are being called
+        def unregister_pre_cb(info):
+            omni.kit.commands.unregister_callback(pre_cb)
+            omni.kit.commands.unregister_callback(unregister_cb)
+
+        unregister_cb = omni.kit.commands.register_callback(
+            "TestAppendNoUndo", omni.kit.commands.PRE_DO_CALLBACK, unregister_pre_cb
+        )
+        infos.clear()
+        omni.kit.commands.execute("TestAppendNoUndo", x=1, y=2)
+        self.assertEqual(len(infos), 2)
+        infos.clear()
+        omni.kit.commands.execute("TestAppendNoUndo", x=1, y=2)
+        self.assertEqual(len(infos), 1)
+        omni.kit.commands.unregister_callback(post_cb)
+
+        # Once all callbacks are unregistered nothing is kept for the command
+        callbacks = omni.kit.commands.command._callbacks
+        self.assertFalse(any(key[0] == "TestAppendNoUndo" for key in callbacks))
+
+        # Looking up unregistered commands doesn't add entries
+        commands_count = len(omni.kit.commands.get_commands())
+        callbacks_count = len(callbacks)
+        for i in range(10):
+            omni.kit.commands.execute(f"TestUnregistered{i}")
+            omni.kit.commands.get_command_class(f"TestUnregistered{i}Command")
+        self.assertEqual(len(omni.kit.commands.get_commands()), commands_count)
+        self.assertEqual(len(callbacks), callbacks_count)
+
+    async def test_resolved_name_cache(self):
+        global _result
+
+        # Resolve and execute the command so its name is cached
+        _result = []
+        omni.kit.commands.execute("TestAppend", x=1, y=2)
+        self.assertListEqual(_result, [1, 2])
+        self.assertIs(omni.kit.commands.get_command_class("TestAppend"), TestAppendCommand)
+
+        # Registering a different class under the same name must not resolve to the cached one
+        class TestAppendCommand2(TestAppendNoUndoCommand):
+            pass
+
+        TestAppendCommand2.__name__ = "TestAppendCommand"
+        TestAppendCommand2.__module__ = "omni.kit.commands.tests.other"
+        omni.kit.commands.unregister(TestAppendCommand)
+        omni.kit.commands.register(TestAppendCommand2)
+        self.assertIs(omni.kit.commands.get_command_class("TestAppend"), TestAppendCommand2)
+        self.assertIs(omni.kit.commands.get_command_class("TestAppendCommand"), TestAppendCommand2)
+        omni.kit.commands.unregister(TestAppendCommand2)
+        self.assertIsNone(omni.kit.commands.get_command_class("TestAppend"))
+
+        # Callbacks registered after the name was cached must still be called
+        self.count = 0
+
+        def callback(info):
+            self.count += 1
+
+        omni.kit.commands.register(TestAppendCommand)
+        omni.kit.commands.execute("TestAppend", x=1, y=2)
+        cb = omni.kit.commands.register_callback("TestAppend", omni.kit.commands.PRE_DO_CALLBACK, callback)
+        omni.kit.commands.execute("TestAppend", x=1, y=2)
+        self.assertEqual(self.count, 1)
+        omni.kit.commands.unregister_callback(cb)
+        omni.kit.commands.execute("TestAppend", x=1, y=2)
+        self.assertEqual(self.count, 1)
+
+    async def test_execute_batch(self):
+        global _result
+        self.command_names = []
+        self.pre_count = 0
+
+        def on_undo_stack_change(command_names):
+            self.command_names += command_names
+
+        def pre_callback(info):
+            self.pre_count += 1
+
+        omni.kit.undo.subscribe_on_change(on_undo_stack_change)
+        pre_cb = omni.kit.commands.register_callback("TestAppend", omni.kit.commands.PRE_DO_CALLBACK, pre_callback)
+
+        # Execute a batch, it should be one undo entry and one history entry but call callbacks for each command
+        _result = []
+        undo_stack_len = len(omni.kit.undo.get_undo_stack())
+        history_len = len(omni.kit.undo.get_history())
+        res = omni.kit.commands.execute_batch("TestAppend", [dict(x=1, y=2), dict(x=3, y=4), dict(x=5, y=6)])
+        self.assertEqual(res, (True, [None, None, None]))
+        self.assertListEqual(_result, [1, 2, 3, 4, 5, 6])
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_stack_len + 1)
+        self.assertEqual(len(omni.kit.undo.get_history()), history_len + 1)
+        self.assertListEqual(self.command_names, ["TestAppend"])
+        self.assertEqual(self.pre_count, 3)
+
+        # Undo, redo and repeat the whole batch
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [])
+        omni.kit.undo.redo()
+        self.assertListEqual(_result, [1, 2, 3, 4, 5, 6])
+        omni.kit.undo.repeat()
+        self.assertListEqual(_result, [1, 2, 3, 4, 5, 6, 1, 2, 3, 4, 5, 6])
+        omni.kit.undo.undo()
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [])
+
+        # Batch of commands without undo doesn't go to the undo stack
+        res = omni.kit.commands.execute_batch("TestAppendNoUndo", [dict(x=1, y=2), dict(x=3, y=4)])
+        self.assertTrue(res[0])
+        self.assertListEqual(_result, [1, 2, 3, 4])
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_stack_len)
+
+        # Failing batch undoes the commands which were already executed
+        _result = []
+        res = omni.kit.commands.execute_batch("TestAppend", [dict(x=1, y=2), dict(x=3)])
+        self.assertEqual(res, (False, None))
+        self.assertListEqual(_result, [])
+
+        # Each command is undone right after the commands it executed, as when executed one by one
+        _result = []
+        res = omni.kit.commands.execute_batch("TestAppendNested", [dict(x=1, y=2), dict(x=3, y=4)])
+        self.assertTrue(res[0])
+        self.assertListEqual(_result, [1, 2, 2, 3, 4, 4])
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_stack_len + 1)
+        commands = omni.kit.undo.get_undo_stack()[-1].command._commands
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [])
+        self.assertListEqual([command.undone for command in commands], [1, 3])
+        omni.kit.undo.redo()
+        self.assertListEqual(_result, [1, 2, 2, 3, 4, 4])
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [])
+
+        omni.kit.commands.unregister_callback(pre_cb)
+        omni.kit.undo.unsubscribe_on_change(on_undo_stack_change)
+
+    async def test_undo_stack_limits(self):
+        global _result
+
+        class TestFootprintCommand(TestAppendCommand):
+            def get_memory_footprint(self):
+                return 100
+
+        omni.kit.commands.register(TestFootprintCommand)
+
+        # Limit by number of entries, whole groups are dropped
+        _result = []
+        omni.kit.undo.set_undo_stack_limits(max_entries=4)
+        with omni.kit.undo.group():
+            omni.kit.commands.execute("TestAppend", x=1, y=2)
+            omni.kit.commands.execute("TestAppend", x=3, y=4)
+        omni.kit.commands.execute("TestAppend", x=5, y=6)
+        omni.kit.commands.execute("TestAppend", x=7, y=8)
+        self.assertEqual(omni.kit.undo.get_undo_stack_usage().entries, 2)
+        omni.kit.undo.undo()
+        omni.kit.undo.undo()
+        self.assertFalse(omni.kit.undo.undo())
+        self.assertListEqual(_result, [1, 2, 3, 4])
+
+        # Limit by memory, the last command is always kept
+        omni.kit.undo.clear_stack()
+        _result = []
+        omni.kit.undo.set_undo_stack_limits(max_memory=250)
+        omni.kit.commands.execute("TestFootprint", x=1, y=2)
+        omni.kit.commands.execute("TestFootprint", x=3, y=4)
+        self.assertEqual(omni.kit.undo.get_undo_stack_usage().memory, 200)
+        omni.kit.commands.execute("TestFootprint", x=5, y=6)
+        usage = omni.kit.undo.get_undo_stack_usage()
+        self.assertEqual((usage.entries, usage.memory, usage.max_memory), (2, 200, 250))
+        omni.kit.undo.undo()
+        self.assertEqual(omni.kit.undo.get_undo_stack_usage().memory, 100)
+        omni.kit.undo.set_undo_stack_limits(max_memory=50)
+        self.assertEqual(omni.kit.undo.get_undo_stack_usage().entries, 1)
+
+        omni.kit.undo.set_undo_stack_limits()
+        omni.kit.commands.unregister(TestFootprintCommand)
+
+    async def test_history(self):
+        global _result
+        _result = []
+
+        # Redo and repeat don't depend on the history
+        omni.kit.commands.execute("TestAppend", x=1, y=2)
+        omni.kit.undo.clear_history()
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [])
+        omni.kit.undo.redo()
+        self.assertListEqual(_result, [1, 2])
+        omni.kit.undo.repeat()
+        self.assertListEqual(_result, [1, 2, 1, 2])
+
+        # The name of the last command is in the crash report right away, the last commands on the next frame
+        omni.kit.undo.update_crash_report()
+        settings = carb.settings.get_settings()
+        self.assertTrue(settings.get("/crashreporter/data/lastCommands").endswith("TestAppend(x=1,y=2)"))
+        omni.kit.commands.execute("TestAppend", x=3, y="a")
+        self.assertEqual(settings.get("/crashreporter/data/lastCommand"), "TestAppend")
+        self.assertFalse(settings.get("/crashreporter/data/lastCommands").endswith("TestAppend(x=3,y=a)"))
+        await omni.kit.app.get_app().next_update_async()
+        last_commands = settings.get("/crashreporter/data/lastCommands")
+        self.assertTrue(last_commands.endswith("TestAppend(x=1,y=2),TestAppend(x=3,y=a)"))
+
+        # The oldest entries are dropped when the history is full
+        omni.kit.undo.set_history_max_entries(3)
+        self.addCleanup(omni.kit.undo.set_history_max_entries)
+        for x in range(5):
+            omni.kit.commands.execute("TestAppend", x=x, y=x)
+        history = omni.kit.undo.get_history()
+        self.assertListEqual([entry.kwargs["x"] for entry in history.values()], [2, 3, 4])
+
+    async def test_merge(self):
+        global _result
+        _result = [0, 0]
+
+        # Commands are not merged by default
+        undo_stack_len = len(omni.kit.undo.get_undo_stack())
+        omni.kit.commands.execute("TestSetValue", index=0, value=1)
+        omni.kit.commands.execute("TestSetValue", index=0, value=2)
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_stack_len + 2)
+        omni.kit.undo.undo()
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [0, 0])
+
+        omni.kit.undo.set_undo_merge_time_window(60)
+        self.addCleanup(omni.kit.undo.set_undo_merge_time_window)
+
+        # Consecutive commands on the same index are merged into one entry
+        undo_stack_len = len(omni.kit.undo.get_undo_stack())
+        history_len = len(omni.kit.undo.get_history())
+        for value in range(1, 6):
+            omni.kit.commands.execute("TestSetValue", index=0, value=value)
+        self.assertListEqual(_result, [5, 0])
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_stack_len + 1)
+        self.assertEqual(len(omni.kit.undo.get_history()), history_len + 1)
+
+        # A command on another index is not merged
+        omni.kit.commands.execute("TestSetValue", index=1, value=1)
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_stack_len + 2)
+
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [5, 0])
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [0, 0])
+        omni.kit.undo.redo()
+        self.assertListEqual(_result, [5, 0])
+
+        # Commands in a group are not merged
+        with omni.kit.undo.group():
+            omni.kit.commands.execute("TestSetValue", index=0, value=6)
+            omni.kit.commands.execute("TestSetValue", index=0, value=7)
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [5, 0])
+
+    async def test_execute_async(self):
+        global _result
+        _result = []
+
+        undo_stack_len = len(omni.kit.undo.get_undo_stack())
+        history_len = len(omni.kit.undo.get_history())
+        res = await omni.kit.commands.execute_async("TestAppendAsync", values=[1, 2, 3])
+        self.assertEqual(res, (True, None))
+        self.assertListEqual(_result, [1, 2, 3])
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_stack_len + 1)
+        self.assertEqual(len(omni.kit.undo.get_history()), history_len + 1)
+
+        # Commands without do_async() run synchronously
+        await omni.kit.commands.execute_async("TestAppend", x=4, y=5)
+        self.assertListEqual(_result, [1, 2, 3, 4, 5])
+
+        omni.kit.undo.undo()
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [])
+        omni.kit.undo.redo()
+        self.assertListEqual(_result, [1, 2, 3])
+
+        # Commands executed by an async command are undone with it, the ones executed by others while it is
+        # running are not, and undo is blocked until it completes
+        _result = []
+        undo_stack_len = len(omni.kit.undo.get_undo_stack())
+        task = asyncio.ensure_future(omni.kit.commands.execute_async("TestExecuteAsync", x=1, y=2))
+        await omni.kit.app.get_app().next_update_async()
+        omni.kit.commands.execute("TestAppend", x=3, y=4)
+        self.assertFalse(omni.kit.undo.undo())
+        await task
+        self.assertListEqual(_result, [3, 4, 1, 2])
+        undo_stack = omni.kit.undo.get_undo_stack()
+        self.assertEqual(len(undo_stack), undo_stack_len + 3)
+        self.assertListEqual(
+            [(entry.name, entry.level) for entry in list(undo_stack)[-3:]],
+            [("TestAppend", 0), ("TestExecuteAsync", 0), ("TestAppend", 1)],
+        )
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [3, 4])
+        omni.kit.undo.undo()
+        self.assertListEqual(_result, [])
+
+    async def test_profiler(self):
+        global _result
+        _result = []
+
+        omni.kit.commands.reset_profile_stats()
+        omni.kit.commands.execute("TestAppend", x=1, y=2)
+        self.assertDictEqual(omni.kit.commands.get_profile_stats(), {})
+
+        omni.kit.commands.set_profiling_enabled(True)
+        try:
+            callback_id = omni.kit.commands.register_callback(
+                "TestAppend", omni.kit.commands.PRE_DO_CALLBACK, lambda _: None
+            )
+            omni.kit.commands.execute("TestAppend", x=1, y=2)
+            omni.kit.commands.execute("TestAppend", x=3, y=4)
+            omni.kit.undo.undo()
+            omni.kit.commands.unregister_callback(callback_id)
+        finally:
+            omni.kit.commands.set_profiling_enabled(False)
+
+        stats = omni.kit.commands.get_profile_stats()["TestAppend"]
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.undo_count, 1)
+        self.assertGreaterEqual(stats.total_time, stats.p99_time)
+        self.assertGreaterEqual(stats.p99_time, stats.p50_time)
+        self.assertGreater(stats.callback_time, 0)
+
+        exported = json.loads(omni.kit.commands.export_profile_stats())
+        self.assertEqual(exported["TestAppend"]["count"], 2)
+        trace = json.loads(omni.kit.commands.export_profile_stats("chrome"))
+        events = [(e["name"], e["cat"]) for e in trace["traceEvents"]]
+        self.assertEqual(events.count(("TestAppend", "do")), 2)
+        self.assertEqual(events.count(("TestAppend", "undo")), 1)
+
+        omni.kit.commands.reset_profile_stats()
+        self.assertDictEqual(omni.kit.commands.get_profile_stats(), {})
+
+    async def test_journal(self):
+        global _result
+        _result = []
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "commands.journal")
+            self.assertTrue(omni.kit.undo.start_journal(path))
+            try:
+                self.assertEqual(omni.kit.undo.get_journal_path(), path)
+                omni.kit.commands.execute("TestAppend", x=1, y=2)
+                omni.kit.commands.execute_batch("TestAppend", [{"x": 3, "y": 4}, {"x": 5, "y": 6}])
+                with omni.kit.undo.group():
+                    omni.kit.commands.execute("TestAppend", x=7, y=8)
+                    omni.kit.commands.execute("TestAppend", x=9, y=10)
+                # Commands executed by undo and redo are not journaled
+                omni.kit.undo.undo()
+                omni.kit.undo.redo()
+            finally:
+                omni.kit.undo.stop_journal()
+            self.assertIsNone(omni.kit.undo.get_journal_path())
+
+            records = list(omni.kit.undo.read_journal(path))
+            self.assertListEqual(
+                [(record.kind, record.name) for record in records],
+                [
+                    ("command", "TestAppend"),
+                    ("batch", "TestAppend"),
+                    ("begin_group", ""),
+                    ("command", "TestAppend"),
+                    ("command", "TestAppend"),
+                    ("end_group", ""),
+                    ("command", "Undo"),
+                    ("command", "Redo"),
+                ],
+            )
+            self.assertDictEqual(records[0].kwargs, {"x": 1, "y": 2})
+            self.assertListEqual(records[1].kwargs["kwargs_list"], [{"x": 3, "y": 4}, {"x": 5, "y": 6}])
+
+            # Replaying the journal executes the same commands again
+            expected = list(_result)
+            _result = []
+            result = omni.kit.undo.replay_journal(path)
+            self.assertEqual(result.count, 6)
+            self.assertEqual(result.failed, 0)
+            self.assertListEqual(_result, expected)
+
+            # A truncated record ends the journal
+            with open(path, "r+b") as f:
+                f.truncate(os.path.getsize(path) - 1)
+            self.assertEqual(len(list(omni.kit.undo.read_journal(path))), 7)
+
+    async def test_disabled_bulk(self):
+        global _result
+        _result = []
+
+        changed_count = 0
+
+        def on_change():
+            nonlocal changed_count
+            changed_count += 1
+
+        omni.kit.commands.subscribe_on_change(on_change)
+        try:
+            undo_stack_len = len(omni.kit.undo.get_undo_stack())
+            history_len = len(omni.kit.undo.get_history())
+            with omni.kit.undo.disabled(bulk=True):
+                for i in range(100):
+                    omni.kit.commands.execute("TestAppend", x=i, y=i)
+                # Nested disabled scopes defer to the outermost one
+                with omni.kit.undo.disabled():
+                    omni.kit.commands.execute("TestAppendNoUndo", x=1, y=2)
+                self.assertFalse(omni.kit.commands.execute("TestRaiseException", x=1, y=2)[0])
+                self.assertEqual(changed_count, 0)
+            self.assertEqual(changed_count, 1)
+            self.assertEqual(len(_result), 202)
+            self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_stack_len)
+            self.assertEqual(len(omni.kit.undo.get_history()), history_len)
+
+            # Regular disabled scope still records history
+            with omni.kit.undo.disabled():
+                omni.kit.commands.execute("TestAppend", x=1, y=2)
+            self.assertEqual(len(omni.kit.undo.get_history()), history_len + 1)
+        finally:
+            omni.kit.commands.unsubscribe_on_change(on_change)
+
     async def test_subscribe_on_undo_stack_change(self):
         self.command_names = []
         self.command_entries = []
@@ -1,6 +1,18 @@
-from .history import clear_history, get_history
+from .history import clear_history, get_history, set_history_max_entries, update_crash_report
+from .journal import (
+    CommandJournal,
+    JournalRecord,
+    JournalReplayResult,
+    start_journal,
+    stop_journal,
+    get_journal_path,
+    read_journal,
+    replay_journal,
+)
 from .undo import (
     execute,
+    execute_async,
+    execute_batch,
     begin_group,
     end_group,
     begin_disabled,
@@ -10,6 +22,9 @@ from .undo import (
     get_redo_stack,
     get_undo_stack,
     clear_stack,
+    set_undo_stack_limits,
+    get_undo_stack_usage,
+    set_undo_merge_time_window,
     group,
     redo,
     undo,
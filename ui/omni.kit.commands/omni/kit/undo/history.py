@@ -1,8 +1,9 @@
+import sys
 import carb.settings
+import omni.kit.app
 
-from collections import namedtuple, OrderedDict
+from collections import namedtuple, OrderedDict, deque
 from functools import lru_cache
-from itertools import islice
 
 # implementing the history as an OrderedDict so we can cap the max size
 # while keeping consistent indices that outside systems can hold on to
@@ -12,13 +13,64 @@ from itertools import islice
 MAX_HISTORY_SIZE = 1000000
 _history = OrderedDict()
 _history_index = 0
+# maximum number of entries in the history (0 is unlimited), read from the settings on first use
+_max_entries = None
+
+# last N history entries for the crash report, only formatted into strings once per frame (or on demand)
+_crash_report_entries = None
+_crash_report_settings = None
+_crash_report_update_sub = None
 
 HistoryEntry = namedtuple("HistoryEntry", ["name", "kwargs", "level", "error"])
 
 
 @lru_cache()
 def _get_crash_report_history_count():
-    return carb.settings.get_settings().get("/exts/omni.kit.commands/crashReportHistoryCount")
+    return carb.settings.get_settings().get("/exts/omni.kit.commands/crashReportHistoryCount") or 0
+
+
+@lru_cache()
+def _get_history_full_arguments_count():
+    # number of most recent history entries that keep their full arguments, older ones are summarized
+    return carb.settings.get_settings().get("/exts/omni.kit.commands/historyFullArgumentsCount") or 0
+
+
+def set_history_max_entries(max_entries: int = MAX_HISTORY_SIZE):
+    """Limit the number of entries in the **Command** history. The oldest root level entries are dropped (along with
+    their descendants) when the limit is exceeded.
+
+    The default is read from "/exts/omni.kit.commands/historyMaxEntries" setting.
+
+    Args:
+        max_entries: Maximum number of entries in the history. 0 for unlimited.
+    """
+    global _max_entries
+    _max_entries = max(max_entries or 0, 0)
+    _enforce_max_entries()
+
+
+def _get_max_entries():
+    global _max_entries
+    if _max_entries is None:
+        max_entries = carb.settings.get_settings().get("/exts/omni.kit.commands/historyMaxEntries")
+        _max_entries = MAX_HISTORY_SIZE if max_entries is None else max(max_entries, 0)
+    return _max_entries
+
+
+def _enforce_max_entries():
+    max_entries = _get_max_entries()
+    if max_entries <= 0:
+        return
+
+    while True:
+        # if the head of the history is a root command and we are under the size limit, we are done
+        # otherwise we need to remove the entire group so we don't end up with children at the front of the history
+        key = next(iter(_history)) if len(_history) else None
+        if not key or (_history[key].level == 0 and len(_history) <= max_entries):
+            break
+
+        # pop the entry from the front of the list and move on
+        _history.popitem(last=False)
 
 
 # Only convert to string primitive types, others may lead to crash (UsdStage was one of them).
@@ -36,38 +88,88 @@ def _format_history_entry(history: HistoryEntry):
     return history.name + s
 
 
+def _summarize_kwargs(kwargs: dict) -> dict:
+    # Keep primitive values only, so the history doesn't keep large objects (stages, layers, lists of prims) alive
+    return {k: v if str(type(v)) in PRIMITIVE_TYPES else f"<{type(v).__name__}>" for k, v in kwargs.items()}
+
+
 def add_history(name: str, kwargs: dict, level: int):
     """Add a **Command** execution to the history.
 
+    Only the most recent entries keep their full arguments ("/exts/omni.kit.commands/historyFullArgumentsCount"
+    setting, 0 to keep all), arguments of older entries are replaced with a summary holding primitive values only.
+
     Takes: (Command name, Arguments, Groupping level).
     Return: index that can be used to modify it later"""
     global _history_index
     _history_index = _history_index + 1
+    name = sys.intern(name)
     _history[_history_index] = HistoryEntry(name, kwargs, level, False)
 
-    # now make sure we have <= MAX_HISTORY_SIZE elements in the history
-    while True:
-        # if the head of the history is a root command and we are under the size limit, we are done
-        # otherwise we need to remove the entire group so we don't end up with children at the front of the history
-        key = next(iter(_history)) if len(_history) else None
-        if not key or (_history[key].level == 0 and len(_history) < MAX_HISTORY_SIZE):
-            break
+    # summarize the arguments of the entry which just went out of the full arguments window
+    full_arguments_count = _get_history_full_arguments_count()
+    if full_arguments_count > 0:
+        summarized_key = _history_index - full_arguments_count
+        summarized_entry = _history.get(summarized_key, None)
+        if summarized_entry and summarized_entry.kwargs:
+            _history[summarized_key] = summarized_entry._replace(kwargs=_summarize_kwargs(summarized_entry.kwargs))
 
-        # pop the entry from the front of the list and move on
-        _history.popitem(last=False)
+    # now make sure we have no more elements in the history than allowed
+    _enforce_max_entries()
 
     # store last N commands for crash report (if we crash later)
-    n = _get_crash_report_history_count()
-    if n > 0:
-        # join last N elements of history into comma separted string
-        lastCommands = [_format_history_entry(x) for x in islice(reversed(_history.values()), n)]
-        settings = carb.settings.get_settings()
-        settings.set("/crashreporter/data/lastCommands", ",".join(reversed(lastCommands)))
-        settings.set("/crashreporter/data/lastCommand", next(iter(lastCommands), ""))
+    _add_crash_report_entry(_history_index, name)
 
     return _history_index
 
 
+def _add_crash_report_entry(history_key: int, name: str):
+    global _crash_report_entries
+    global _crash_report_settings
+    global _crash_report_update_sub
+
+    if _crash_report_entries is None:
+        n = _get_crash_report_history_count()
+        if n <= 0:
+            return
+        _crash_report_entries = deque(maxlen=n)
+        _crash_report_settings = carb.settings.get_settings()
+
+    _crash_report_entries.append(history_key)
+
+    # the command is about to be executed and may crash the app, its name is recorded right away
+    _crash_report_settings.set("/crashreporter/data/lastCommand", name)
+
+    # formatting the entries is deferred to the next update, so it's done at most once per frame
+    if _crash_report_update_sub is None:
+        app = omni.kit.app.get_app()
+        if app is None:
+            update_crash_report()
+            return
+        _crash_report_update_sub = app.get_update_event_stream().create_subscription_to_pop(
+            _on_update, name="omni.kit.undo crash report history"
+        )
+
+
+def _on_update(event):
+    global _crash_report_update_sub
+    _crash_report_update_sub = None
+    update_crash_report()
+
+
+def update_crash_report():
+    """Write the last N **Command** history entries, with their arguments, to the crash report data.
+
+    It's called automatically once per frame when the history has changed. The name of the last command is written
+    as soon as it's added to the history."""
+    if not _crash_report_entries:
+        return
+
+    # join last N elements of history into comma separted string
+    lastCommands = [_format_history_entry(_history[key]) for key in _crash_report_entries if key in _history]
+    _crash_report_settings.set("/crashreporter/data/lastCommands", ",".join(lastCommands))
+
+
 def change_history(key: int, **kwargs):
     """Update the history entry for **key**.
 
@@ -77,6 +179,13 @@ def change_history(key: int, **kwargs):
         _history[key] = _history[key]._replace(**kwargs)
 
 
+def remove_history(key: int):
+    """Remove the history entry for **key**.
+
+    key: Index of the history entry to remove."""
+    _history.pop(key, None)
+
+
 def get_history():
     """Get **Command** execution history.
 
@@ -0,0 +1,242 @@
+"""Journal of executed **Commands**, for crash recovery and replay.
+
+The journal is an append-only binary file: an 8 bytes header, followed by one record per executed root level
+**Command**, and per start and end of root level group. Each record is a 4 bytes little endian length followed by a JSON payload with the time, the name and
+the arguments of the command. Arguments which are not JSON types are converted: sequences (e.g. Gf vectors and
+matrices) to lists, other objects to their string representation (e.g. Sdf.Path). Commands taking arguments which
+can't be converted back that way (e.g. a Usd.Stage) can't be replayed.
+
+Records are written as commands are executed, so they survive a crash of the application, and are synced to disk at
+most every "/exts/omni.kit.commands/journalSyncInterval" seconds, so they also survive a crash of the system.
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from typing import Any, Iterator
+
+import carb
+import carb.settings
+
+_HEADER = b"OKCJ" + struct.pack("<I", 1)
+_LENGTH = struct.Struct("<I")
+
+# Kinds of journal records
+COMMAND = "command"
+BATCH = "batch"
+BEGIN_GROUP = "begin_group"
+END_GROUP = "end_group"
+
+JournalRecord = namedtuple("JournalRecord", ["time", "kind", "name", "kwargs"])
+JournalRecord.__doc__ = """Record of a journal.
+
+time: Time at which the record was written, in seconds since the epoch.
+kind: COMMAND for a command executed with **execute()**, BATCH for **execute_batch()**, BEGIN_GROUP and END_GROUP for
+      the start and the end of a group of commands.
+name: Name of the command, as passed to **execute()**. Empty for groups.
+kwargs: Arguments of the command. For a batch, dictionary with the list of arguments in "kwargs_list".
+"""
+
+JournalReplayResult = namedtuple("JournalReplayResult", ["count", "failed", "elapsed"])
+JournalReplayResult.__doc__ = """Result of :func:`replay_journal`.
+
+count: Number of commands executed.
+failed: Number of commands which failed.
+elapsed: Time spent executing the commands, in seconds.
+"""
+
+
+def _encode(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_encode(v) for v in value]
+    # Gf vectors and matrices support the sequence protocol and can be constructed back from lists
+    if hasattr(value, "__len__") and hasattr(value, "__getitem__"):
+        try:
+            return [_encode(value[i]) for i in range(len(value))]
+        except Exception:
+            pass
+    return str(value)
+
+
+class CommandJournal:
+    """Appends records of executed **Commands** to a journal file.
+
+    Args:
+        path: Path of the journal file. Records are appended if it already exists.
+        sync_interval: Minimum time between two syncs of the file to disk, in seconds.
+    """
+
+    def __init__(self, path: str, sync_interval: float = 1.0):
+        self._path = path
+        self._sync_interval = sync_interval
+        self._last_sync = time.monotonic()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(_HEADER)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def append(self, kind: str, name: str = "", kwargs: dict = None):
+        """Append a record to the journal."""
+        record = {"time": time.time(), "kind": kind, "name": name, "kwargs": _encode(kwargs or {})}
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        self._file.write(_LENGTH.pack(len(payload)))
+        self._file.write(payload)
+
+        # hand the record over to the system right away, so it survives a crash of the application,
+        # but only pay for syncing to the disk once per interval
+        self._file.flush()
+        now = time.monotonic()
+        if now - self._last_sync >= self._sync_interval:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+
+    def close(self):
+        """Sync and close the journal file."""
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+_journal = None
+
+
+def start_journal(path: str = None) -> bool:
+    """Start recording executed root level **Commands** to a journal file.
+
+    Args:
+        path: Path of the journal file. Defaults to the "/exts/omni.kit.commands/journalPath" setting.
+
+    Returns:
+        True if the journal was started.
+    """
+    global _journal
+    settings = carb.settings.get_settings()
+    path = path or settings.get("/exts/omni.kit.commands/journalPath")
+    if not path:
+        carb.log_error("Can't start command journal, no path specified.")
+        return False
+
+    stop_journal()
+    try:
+        sync_interval = settings.get("/exts/omni.kit.commands/journalSyncInterval")
+        _journal = CommandJournal(path, 1.0 if sync_interval is None else sync_interval)
+    except OSError as e:
+        carb.log_error(f"Can't start command journal {path}: {e}")
+        return False
+    return True
+
+
+def stop_journal():
+    """Stop recording **Commands** to the journal file, if it was started."""
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+
+
+def get_journal_path() -> str:
+    """Returns the path of the journal file being recorded, None if there is none."""
+    return _journal.path if _journal is not None else None
+
+
+def _append(kind: str, name: str = "", kwargs: dict = None):
+    global _journal
+    try:
+        _journal.append(kind, name, kwargs)
+    except Exception as e:
+        # don't keep failing on every command, e.g. when the disk is full
+        carb.log_error(f"Failed to write to command journal {_journal.path}, stopping it: {e}")
+        _journal = None
+
+
+def read_journal(path: str) -> Iterator[JournalRecord]:
+    """Read the records of a journal file.
+
+    A record which was only partially written, e.g. when the system crashed, ends the journal.
+
+    Args:
+        path: Path of the journal file.
+
+    Returns:
+        Iterator over the :class:`JournalRecord` in the journal, in execution order.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(_HEADER):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[: len(_HEADER)] != _HEADER:
+                carb.log_error(f"{path} is not a command journal.")
+                return
+
+            offset = len(_HEADER)
+            while offset + _LENGTH.size <= len(data):
+                (length,) = _LENGTH.unpack_from(data, offset)
+                offset += _LENGTH.size
+                if offset + length > len(data):
+                    carb.log_warn(f"Command journal {path} ends with a truncated record.")
+                    return
+                record = json.loads(data[offset : offset + length].decode("utf-8"))
+                offset += length
+                yield JournalRecord(record["time"], record["kind"], record["name"], record["kwargs"])
+
+
+def replay_journal(path: str, stop_on_error: bool = False) -> JournalReplayResult:
+    """Execute again the **Commands** recorded in a journal file, in order.
+
+    Commands are executed on the current stage of the context they use, with :func:`omni.kit.commands.execute`,
+    and grouped as they were, so they are put on the undo stack and in the history as usual.
+
+    Args:
+        path: Path of the journal file.
+        stop_on_error: Stop at the first command which fails.
+
+    Returns:
+        :class:`JournalReplayResult` with the number of commands executed and failed, and the time spent.
+    """
+    import omni.kit.commands
+    from .undo import begin_group, end_group
+
+    count = 0
+    failed = 0
+    elapsed = 0.0
+    group_count = 0
+    for record in read_journal(path):
+        if record.kind == BEGIN_GROUP:
+            begin_group()
+            group_count += 1
+            continue
+        if record.kind == END_GROUP:
+            if group_count > 0:
+                end_group()
+                group_count -= 1
+            continue
+
+        start = time.perf_counter()
+        if record.kind == BATCH:
+            success, _ = omni.kit.commands.execute_batch(record.name, record.kwargs.get("kwargs_list", []))
+        else:
+            success, _ = omni.kit.commands.execute(record.name, **record.kwargs)
+        elapsed += time.perf_counter() - start
+        count += 1
+        if not success:
+            failed += 1
+            if stop_on_error:
+                break
+
+    # close the groups which were still open when the journal ended
+    for _ in range(group_count):
+        end_group()
+
+    return JournalReplayResult(count, failed, elapsed)
@@ -1,13 +1,21 @@
+import asyncio
 from datetime import datetime
 from collections import namedtuple, deque
 from functools import partial
+from itertools import islice
+from time import perf_counter
 import traceback
+import types
 from contextlib import contextmanager
 import carb
+import carb.profiler
+import carb.settings
 import omni.kit.commands
 from typing import Any, Tuple
-from .history import add_history, change_history, get_history, get_history_item
+from . import journal as _journal
+from .history import add_history, change_history, get_history_item, remove_history
 from ..commands.command import _call_callbacks as call_callbacks
+from ..commands import profiler as _profiler
 
 
 # register undo/redo commands on system startup
@@ -15,18 +23,37 @@ def register_undo_commands():
     omni.kit.commands.register_all_commands_in_module(__name__)
 
 
-Entry = namedtuple("Entry", ["command", "name", "level", "history_key", "time"])
+# kwargs are kept with the entry (not only in the history) as they are needed to redo or repeat the command
+Entry = namedtuple("Entry", ["command", "name", "level", "history_key", "time", "kwargs"])
+# Root level entry on the undo stack, along with the number of entries and estimated memory of its whole group.
+RootGroup = namedtuple("RootGroup", ["entry", "entry_count", "memory"])
+UndoStackUsage = namedtuple("UndoStackUsage", ["entries", "memory", "redo_entries", "max_entries", "max_memory"])
 
 _undo_stack = deque()
 _redo_stack = deque()
+# root level groups on the undo stack, oldest first, so they can be evicted when the undo stack limits are exceeded
+_root_groups = deque()
+_undo_stack_memory = 0
+# limits of the undo stack (0 means unlimited), read from the settings on first use
+_max_entries = None
+_max_memory = None
+# time window (in seconds) to merge consecutive commands in, 0 disables merging, read from the settings on first use
+_merge_time_window = None
 _on_change = set()
 _on_change_detailed = set()
 _level = 0
 _group_entry = None
+# length of the undo stack right after the group entry was added, i.e. index of its first child entry
+_group_start = 0
 _group_count = 0
 _disabled_count = 0
+# one entry per begin_disabled() call, True for the bulk ones
+_disabled_bulk = []
+_bulk_count = 0
+_changed_while_disabled = False
 _in_redo_command = False
 _in_repeat_command = False
+_async_lock = None
 
 
 def _incr_command_level():
@@ -46,11 +73,11 @@ def _get_command_level():
     return _level
 
 
-def _create_entry(command, name, level, history_key):
+def _create_entry(command, name, level, history_key, kwargs):
     global _redo_stack
     global _undo_stack
     global _in_redo_command
-    entry = Entry(command, name, level, history_key, datetime.now())
+    entry = Entry(command, name, level, history_key, datetime.now(), kwargs)
 
     # Reset the redo stack if the command being executed is a root level command
     # and we are not in the middle of a redo command.  Leave the stack alone in that
@@ -64,6 +91,9 @@ def _create_entry(command, name, level, history_key):
 
 
 def execute(command, name, kwargs) -> Tuple[bool, Any]:
+    if _bulk_count > 0:
+        return _execute_bulk(command, name, kwargs)
+
     level = _get_command_level()
     history_key = add_history(name, kwargs, level)
     _incr_command_level()
@@ -74,20 +104,14 @@ def execute(command, name, kwargs) -> Tuple[bool, Any]:
         # unless undo functionality has been disabled using "begin_disabled()"
         # Otherwise just call "do()".
         if _disabled_count == 0 and callable(getattr(command, "undo", None)):
-            result = _execute(command, name, level, history_key)
+            undo_stack_len = len(_undo_stack)
+            result = _execute(command, name, level, history_key, kwargs)
+            if level == 0:
+                _add_root_group(len(_undo_stack) - undo_stack_len)
         else:
-            call_callbacks(command, name, kwargs, omni.kit.commands.PRE_DO_CALLBACK)
-            result = command.do()
-            call_callbacks(command, name, kwargs, omni.kit.commands.POST_DO_CALLBACK)
+            result = _do(command, name, kwargs)
     except Exception as e:
-        # update the history to flag it as having an error so we can render it different
-        change_history(history_key, error=True)
-
-        # if there is an active group being created, flag it as being in error state as well
-        if _group_entry:
-            change_history(_group_entry.history_key, error=True)
-
-        omni.kit.commands._log_error(f"Failed to execute a command: {name}.\n{omni.kit.undo.format_exception(e)}")
+        _on_execute_error(name, history_key, e)
         return (False, None)
     finally:
         # always decrement the group level so we don't end up with a mismatch due to an error being raised
@@ -96,9 +120,160 @@ def execute(command, name, kwargs) -> Tuple[bool, Any]:
         # History changed -> dispatch change event
         omni.kit.commands._dispatch_changed()
 
+    if _journal._journal is not None:
+        _journal_command(command, name, kwargs, level)
+
+    return (True, result)
+
+
+def _execute_bulk(command, name, kwargs) -> Tuple[bool, Any]:
+    # same as execute() when undo is disabled, without recording history or notifying listeners for each command
+    global _changed_while_disabled
+    level = _get_command_level()
+    _incr_command_level()
+    try:
+        result = _do(command, name, kwargs)
+    except Exception as e:
+        omni.kit.commands._log_error(f"Failed to execute a command: {name}.\n{omni.kit.undo.format_exception(e)}")
+        return (False, None)
+    finally:
+        _decr_command_level()
+        _changed_while_disabled = True
+
+    if _journal._journal is not None:
+        _journal_command(command, name, kwargs, level)
+
     return (True, result)
 
 
+async def execute_async(command, name, kwargs) -> Tuple[bool, Any]:
+    """Execute **command** by awaiting its ``do_async()`` method, see :func:`omni.kit.commands.execute_async`.
+
+    Only one asynchronous command runs at a time. The command and the commands it executes are recorded apart from
+    the undo stack until it completes, so commands executed by others while it is suspended are recorded on their own.
+    """
+    global _async_lock
+    if _async_lock is None:
+        _async_lock = asyncio.Lock()
+
+    async with _async_lock:
+        level = _get_command_level()
+        history_key = add_history(name, kwargs, level)
+        scope = _AsyncScope(level)
+
+        try:
+            if _disabled_count == 0 and callable(getattr(command, "undo", None)):
+                with scope:
+                    entry = _create_entry(command, name, level, history_key, kwargs)
+                try:
+                    result = await _await_in_scope(_do_async(command, name, kwargs), scope)
+                except Exception:
+                    with scope:
+                        _rollback(entry, level)
+                    raise
+                undo_stack_len = len(_undo_stack)
+                _undo_stack.extend(scope.undo_stack)
+                _finish_execute(entry, name, level, history_key)
+                if level == 0:
+                    _add_root_group(len(_undo_stack) - undo_stack_len)
+            else:
+                result = await _await_in_scope(_do_async(command, name, kwargs), scope)
+                _undo_stack.extend(scope.undo_stack)
+        except Exception as e:
+            _on_execute_error(name, history_key, e)
+            return (False, None)
+        finally:
+            omni.kit.commands._dispatch_changed()
+
+        if _journal._journal is not None:
+            _journal_command(command, name, kwargs, level)
+
+        return (True, result)
+
+
+class _AsyncScope:
+    """Undo state of an asynchronous command, swapped with the module's while the command runs."""
+
+    def __init__(self, level):
+        self.undo_stack = deque()
+        self.level = level + 1
+        self.group_entry = None
+        self.group_start = 0
+        self.group_count = 0
+
+    def __enter__(self):
+        self._swap()
+
+    def __exit__(self, *exc_info):
+        self._swap()
+
+    def _swap(self):
+        global _undo_stack, _level, _group_entry, _group_start, _group_count
+        _undo_stack, self.undo_stack = self.undo_stack, _undo_stack
+        _level, self.level = self.level, _level
+        _group_entry, self.group_entry = self.group_entry, _group_entry
+        _group_start, self.group_start = self.group_start, _group_start
+        _group_count, self.group_count = self.group_count, _group_count
+
+
+@types.coroutine
+def _await_in_scope(coro, scope):
+    # await the coroutine, entering the scope each time it is resumed and leaving it each time it is suspended
+    send, value = coro.send, None
+    while True:
+        try:
+            with scope:
+                yielded = send(value)
+        except StopIteration as e:
+            return e.value
+        try:
+            value = yield yielded
+            send = coro.send
+        except GeneratorExit:
+            with scope:
+                coro.close()
+            raise
+        except BaseException as e:
+            send, value = coro.throw, e
+
+
+def _is_async_command_running():
+    return _async_lock is not None and _async_lock.locked()
+
+
+def _journal_command(command, name, kwargs, level):
+    # Commands executed by other commands are executed again when the journal is replayed, as are the
+    # commands executed by redo and repeat, which are journaled as the "Redo" and "Repeat" commands.
+    # Only commands executed at the root level or directly in a root level group are journaled.
+    if _in_redo_command or _in_repeat_command:
+        return
+    if level != 0 and not (level == 1 and _group_entry is not None and _group_entry.level == 0):
+        return
+    _journal._append(_journal.BATCH if isinstance(command, BatchCommand) else _journal.COMMAND, name, kwargs)
+
+
+def _on_execute_error(name, history_key, e):
+    # update the history to flag it as having an error so we can render it different
+    change_history(history_key, error=True)
+
+    # if there is an active group being created, flag it as being in error state as well
+    if _group_entry:
+        change_history(_group_entry.history_key, error=True)
+
+    omni.kit.commands._log_error(f"Failed to execute a command: {name}.\n{omni.kit.undo.format_exception(e)}")
+
+
+def execute_batch(command_class, name, kwargs_list) -> Tuple[bool, Any]:
+    """Execute **command_class** once for each of the arguments in **kwargs_list** as a single command.
+
+    All the commands share one undo entry and one history entry (with the arguments stored under
+    "kwargs_list"), and the change listeners are notified once for the whole batch.
+    Callbacks registered for the command are still called for each of the commands.
+    """
+    command = BatchCommand(command_class, name, kwargs_list)
+    return execute(command, name, {"kwargs_list": kwargs_list})
+
+
 def subscribe_on_change(on_change):
     global _on_change
     _on_change.add(on_change)
@@ -132,8 +307,11 @@ def can_repeat():
 
 
 def clear_stack():
+    global _undo_stack_memory
     _undo_stack.clear()
     _redo_stack.clear()
+    _root_groups.clear()
+    _undo_stack_memory = 0
 
 
 def get_undo_stack():
@@ -144,6 +322,92 @@ def get_redo_stack():
     return _redo_stack
 
 
+def set_undo_stack_limits(max_entries: int = 0, max_memory: int = 0):
+    """Limit the size of the undo stack. The oldest root level commands or groups are dropped
+    (along with all of their descendants) when any of the limits is exceeded.
+    The most recent root level command or group is always kept.
+
+    Defaults are read from "/exts/omni.kit.commands/undoStackMaxEntries" and
+    "/exts/omni.kit.commands/undoStackMaxMemory" settings.
+
+    Args:
+        max_entries: Maximum number of entries on the undo stack. 0 for unlimited.
+        max_memory: Maximum estimated memory in bytes kept alive by the commands on the undo stack,
+                    as reported by their ``get_memory_footprint()``. 0 for unlimited.
+    """
+    global _max_entries
+    global _max_memory
+    _max_entries = max(max_entries or 0, 0)
+    _max_memory = max(max_memory or 0, 0)
+    _enforce_undo_stack_limits()
+
+
+def get_undo_stack_usage() -> UndoStackUsage:
+    """Get the current size of the undo stack.
+
+    Returns:
+        UndoStackUsage(number of entries, estimated memory in bytes, number of redo entries,
+        max number of entries, max memory in bytes).
+    """
+    max_entries, max_memory = _get_undo_stack_limits()
+    return UndoStackUsage(len(_undo_stack), _undo_stack_memory, len(_redo_stack), max_entries, max_memory)
+
+
+def _get_undo_stack_limits():
+    global _max_entries
+    global _max_memory
+    if _max_entries is None or _max_memory is None:
+        settings = carb.settings.get_settings()
+        _max_entries = settings.get("/exts/omni.kit.commands/undoStackMaxEntries") or 0
+        _max_memory = settings.get("/exts/omni.kit.commands/undoStackMaxMemory") or 0
+    return _max_entries, _max_memory
+
+
+def _get_memory_footprint(command):
+    get_memory_footprint = getattr(command, "get_memory_footprint", None)
+    if not callable(get_memory_footprint):
+        return 0
+    try:
+        return get_memory_footprint() or 0
+    except Exception as e:
+        carb.log_error(f"Failed to get memory footprint of a command: {command}.\n{format_exception(e)}")
+        return 0
+
+
+def _add_root_group(entry_count):
+    # called when a root level command or group is complete, its entries are the last ones on the undo stack
+    global _undo_stack_memory
+    if entry_count <= 0:
+        return
+
+    memory = sum(_get_memory_footprint(entry.command) for entry in islice(reversed(_undo_stack), entry_count))
+    _root_groups.append(RootGroup(_undo_stack[-entry_count], entry_count, memory))
+    _undo_stack_memory += memory
+    _enforce_undo_stack_limits()
+
+
+def _remove_root_group(entry):
+    # called when a root level entry was popped from the undo stack
+    global _undo_stack_memory
+    if _root_groups and _root_groups[-1].entry is entry:
+        _undo_stack_memory -= _root_groups.pop().memory
+
+
+def _enforce_undo_stack_limits():
+    global _undo_stack_memory
+    max_entries, max_memory = _get_undo_stack_limits()
+    while len(_root_groups) > 1 and (
+        (max_entries > 0 and len(_undo_stack) > max_entries) or (max_memory > 0 and _undo_stack_memory > max_memory)
+    ):
+        # drop the oldest root entry with all of its descendants
+        group = _root_groups.popleft()
+        _undo_stack_memory -= group.memory
+        while _undo_stack and _undo_stack.popleft() is not group.entry:
+            pass
+        while _undo_stack and _undo_stack[0].level != 0:
+            _undo_stack.popleft()
+
+
 # implement these as bare commands so they integrate properly with the history part of the system
 class Undo(omni.kit.commands.Command):
     def __init__(self):
@@ -151,6 +415,9 @@ class Undo(omni.kit.commands.Command):
 
     def do(self):
         global _redo_stack
+        if _is_async_command_running():
+            carb.log_warn("Can't undo while an asynchronous command is running.")
+            return False
         if not can_undo():
             return False
 
@@ -160,10 +427,11 @@ class Undo(omni.kit.commands.Command):
         while keep_going and len(_undo_stack) > 0:
             entry = _undo_stack.pop()
             if entry.level == 0:
+                _remove_root_group(entry)
                 _redo_stack.append(entry)
                 keep_going = False
             try:
-                entry.command.undo()
+                _undo(entry)
                 cmds.append(entry.name)
                 history_entry = get_history_item(entry.history_key)
                 if history_entry:
@@ -208,6 +476,9 @@ class Redo(omni.kit.commands.Command):
     def do(self):
         global _redo_stack
         global _in_redo_command
+        if _is_async_command_running():
+            carb.log_warn("Can't redo while an asynchronous command is running.")
+            return False
         if not can_redo():
             return False
 
@@ -231,6 +502,9 @@ class Repeat(omni.kit.commands.Command):
     def do(self):
         global _undo_stack
         global _in_repeat_command
+        if _is_async_command_running():
+            carb.log_warn("Can't repeat while an asynchronous command is running.")
+            return False
         if not can_repeat():
             return False
 
@@ -265,14 +539,16 @@ def repeat():
 
 # helper used to execute commands in the group scope when 'redo' or 'repeat' is called on the group
 def _execute_group_entries(entries):
-    history = get_history()
     for e in entries:
-        kwargs = history[e.history_key].kwargs if e.history_key in history else {}
+        kwargs = e.kwargs
         command = e.command
         if _in_repeat_command:
             # If we're repeating the command, we must create a new instance,
             # and if it's a group command we must also copy the 'do' function.
-            command = e.command.__class__(**kwargs)
+            if isinstance(command, BatchCommand):
+                command = BatchCommand(command.command_class, e.name, command.kwargs_list)
+            else:
+                command = e.command.__class__(**kwargs)
             if isinstance(command, GroupCommand):
                 command.do = e.command.do
         (success, _) = execute(command, e.name, kwargs)
@@ -294,9 +570,64 @@ class GroupCommand(object):
         pass
 
 
+class BatchCommand(object):
+    def __init__(self, command_class, name, kwargs_list):
+        self.command_class = command_class
+        self.kwargs_list = kwargs_list
+        self._name = name
+        self._commands = []
+        self._done_count = 0
+        # undo entries of the commands executed by each command, taken off the undo stack so that each command is
+        # undone right after its own nested commands, as when the commands are executed one by one
+        self._nested_entries = []
+
+        # batch of commands without undo is executed without an undo entry, same as a single command
+        if not callable(getattr(command_class, "undo", None)):
+            self.undo = None
+
+    def do(self):
+        # commands are created right before they are executed (as they would be one by one),
+        # since their constructors may depend on what the previous commands did (e.g. next free path)
+        results = []
+        self._nested_entries = []
+        for i, kwargs in enumerate(self.kwargs_list):
+            if i == len(self._commands):
+                self._commands.append(self.command_class(**kwargs))
+            command = self._commands[i]
+            undo_stack_len = len(_undo_stack)
+            info = call_callbacks(command, self._name, kwargs, omni.kit.commands.PRE_DO_CALLBACK)
+            results.append(command.do())
+            self._done_count = i + 1
+            call_callbacks(command, self._name, kwargs, omni.kit.commands.POST_DO_CALLBACK, info)
+            nested_entries = [_undo_stack.pop() for _ in range(len(_undo_stack) - undo_stack_len)]
+            nested_entries.reverse()
+            self._nested_entries.append(nested_entries)
+        return results
+
+    def undo(self):
+        # only undo the commands which were done, the batch may have failed part way through
+        for i in reversed(range(self._done_count)):
+            if i < len(self._nested_entries):
+                for entry in reversed(self._nested_entries[i]):
+                    try:
+                        _undo(entry)
+                    except Exception as e:
+                        carb.log_error(f"Failed to undo a command: {entry.name}.\n{format_exception(e)}")
+            self._commands[i].undo()
+        self._done_count = 0
+        self._nested_entries = []
+
+    def get_memory_footprint(self):
+        memory = sum(_get_memory_footprint(command) for command in self._commands)
+        for entries in self._nested_entries:
+            memory += sum(_get_memory_footprint(entry.command) for entry in entries)
+        return memory
+
+
 def begin_group():
     """Begin group of **Commands**."""
     global _group_entry
+    global _group_start
     global _group_count
 
     _group_count = _group_count + 1
@@ -304,7 +635,10 @@ def begin_group():
         level = _get_command_level()
         _incr_command_level()  # this should only be called if an undo entry is created
         history_key = add_history("Group", {}, level)
-        _group_entry = _create_entry(GroupCommand(), "Group", level, history_key)
+        _group_entry = _create_entry(GroupCommand(), "Group", level, history_key, {})
+        _group_start = len(_undo_stack)
+        if level == 0 and _journal._journal is not None and not (_in_redo_command or _in_repeat_command):
+            _journal._append(_journal.BEGIN_GROUP)
 
 
 def end_group():
@@ -321,10 +655,14 @@ def end_group():
             # create a real do function now that we have the full list of entries associated with the group
             # grab all entries after the group until the end of the list and capture that list in a partial
             # function for processing if 'redo' is called on the group
-            group_index = _undo_stack.index(_group_entry)
-            group_entries = list(filter(lambda entry: entry.level == 1, list(_undo_stack)[group_index + 1 :]))
+            group_index = _get_group_index()
+            group_size = len(_undo_stack) - group_index - 1
+            group_entries = [entry for entry in islice(reversed(_undo_stack), group_size) if entry.level == 1]
+            group_entries.reverse()
             if group_entries:
                 _group_entry.command.do = partial(_execute_group_entries, group_entries)
+            if _group_entry.level == 0:
+                _add_root_group(group_size + 1)
 
         finally:
             # have to manually call the listeners since groups don't go through higher level command code
@@ -334,10 +672,25 @@ def end_group():
                 _dispatch_changed_detailed([history_entry])
             omni.kit.commands._dispatch_changed()
 
+            if _group_entry.level == 0 and _journal._journal is not None:
+                if not (_in_redo_command or _in_repeat_command):
+                    _journal._append(_journal.END_GROUP)
+
             # whether there was anything to capture or not, this group is closed, so clear out the entry
             _group_entry = None
 
 
+def _get_group_index():
+    # Entries are only appended or popped from the end of the undo stack while a group is open, so the group
+    # entry is expected where it was added. Accessing it from the end of the deque is O(group size).
+    group_index = _group_start - 1
+    if 0 <= group_index < len(_undo_stack) and _undo_stack[group_index] is _group_entry:
+        return group_index
+
+    # the group entry has moved (e.g. the undo stack was modified inside of the group), fall back to a search
+    return _undo_stack.index(_group_entry)
+
+
 @contextmanager
 def group():
     """Group multiple commands in one.
@@ -360,13 +713,21 @@ def group():
         end_group()
 
 
-def begin_disabled():
+def begin_disabled(bulk: bool = False):
     """
     Begin preventing **Commands** being added to the undo stack.
     Must be paired with a subsequent call to end_disabled()
+
+    Args:
+        bulk: Also skip recording **Commands** in the history, and notify the history listeners only once when the
+              outermost end_disabled() is called. Meant for executing large numbers of commands, e.g. on import.
     """
     global _disabled_count
+    global _bulk_count
     _disabled_count = _disabled_count + 1
+    _disabled_bulk.append(bulk)
+    if bulk:
+        _bulk_count = _bulk_count + 1
 
 
 def end_disabled():
@@ -375,18 +736,28 @@ def end_disabled():
     Must be paired with a prior call to begin_disabled()
     """
     global _disabled_count
+    global _bulk_count
+    global _changed_while_disabled
     if _disabled_count > 0:
         _disabled_count = _disabled_count - 1
+        if _disabled_bulk.pop():
+            _bulk_count = _bulk_count - 1
+        if _disabled_count == 0 and _changed_while_disabled:
+            _changed_while_disabled = False
+            omni.kit.commands._dispatch_changed()
     else:
         carb.log_error(f"undo.end_disabled() called without matching prior call to undo.begin_disabled()")
 
 
 @contextmanager
-def disabled():
+def disabled(bulk: bool = False):
     """Prevent commands being added to the undo stack.
 
     This function is a context manager.
 
+    Args:
+        bulk: Also skip recording commands in the history, see :func:`begin_disabled`.
+
     Example:
 
     .. code-block:: python
@@ -396,62 +767,74 @@ def disabled():
             omni.kit.commands.execute("Foo2")
     """
 
-    begin_disabled()
+    begin_disabled(bulk)
     try:
         yield
     finally:
         end_disabled()
 
 
-def _execute(command, name, level, history_key):
+def _execute(command, name, level, history_key, kwargs):
+    # create an undo entry on the stack and execute its do function
+    entry = _create_entry(command, name, level, history_key, kwargs)
     try:
-        # create an undo entry on the stack and execute its do function
-        entry = _create_entry(command, name, level, history_key)
         # We want the callbacks to execute within the same undo group as the command
         # so that any commands they execute will be undone at the same time as this.
-        history_entry = get_history_item(history_key)
-        kwargs = history_entry.kwargs if history_entry else dict()
-        call_callbacks(command, name, kwargs, omni.kit.commands.PRE_DO_CALLBACK)
-        result = command.do()
-        call_callbacks(command, name, kwargs, omni.kit.commands.POST_DO_CALLBACK)
-    except Exception as error:
-        # If the current command fails we need to unwind anything that came from it.
-        # Undo entries on the stack until we get back to the current entry.
-        # Any commands after this one in the stack were spawned by this command.
-        cmd_names = []
-        history_entries = []
-        while True:
-            last_entry = _undo_stack.pop()
+        result = _do(command, name, kwargs)
+    except Exception:
+        _rollback(entry, level)
 
-            # run undo on the command so we don't leave things in a half complete state
-            # trap any errors individually so each command has a chance to run
-            try:
-                last_entry.command.undo()
+        # re-raise the original error so the command system can handle it
+        # only need to manage the undo stack here, command system will take care of the rest
+        raise
 
-                # make sure to alert the system of changes to all involved commands
-                # only add to the list if the undo command completed successfully
-                cmd_names.append(last_entry.name)
-                history_entry = get_history_item(last_entry.history_key)
-                if history_entry:
-                    history_entries.append(history_entry)
-            except Exception as e:
-                carb.log_error(f"Failed to undo a command: {last_entry.name}.\n{format_exception(e)}")
+    _finish_execute(entry, name, level, history_key)
+    return result
 
-            if last_entry == entry:
-                # add it to the redo stack if it is a base level command
-                if level == 0:
-                    _redo_stack.append(entry)
 
-                # when we get back to the current command we are done
-                break
+def _rollback(entry, level):
+    # If the current command fails we need to unwind anything that came from it.
+    # Undo entries on the stack until we get back to the current entry.
+    # Any commands after this one in the stack were spawned by this command.
+    cmd_names = []
+    history_entries = []
+    while True:
+        last_entry = _undo_stack.pop()
 
-        # pump the callbacks with all commands that changed
-        _dispatch_changed(cmd_names)
-        _dispatch_changed_detailed(history_entries)
+        # run undo on the command so we don't leave things in a half complete state
+        # trap any errors individually so each command has a chance to run
+        try:
+            last_entry.command.undo()
 
-        # re-raise the original error so the command system can handle it
-        # only need to manage the undo stack here, command system will take care of the rest
-        raise error
+            # make sure to alert the system of changes to all involved commands
+            # only add to the list if the undo command completed successfully
+            cmd_names.append(last_entry.name)
+            history_entry = get_history_item(last_entry.history_key)
+            if history_entry:
+                history_entries.append(history_entry)
+        except Exception as e:
+            carb.log_error(f"Failed to undo a command: {last_entry.name}.\n{format_exception(e)}")
+
+        if last_entry == entry:
+            # add it to the redo stack if it is a base level command
+            if level == 0:
+                _redo_stack.append(entry)
+
+            # when we get back to the current command we are done
+            break
+
+    # pump the callbacks with all commands that changed
+    _dispatch_changed(cmd_names)
+    _dispatch_changed_detailed(history_entries)
+
+
+def _finish_execute(entry, name, level, history_key):
+    # fold consecutive root level commands into one entry for interactive edits, see Command.can_merge()
+    if level == 0:
+        merged_entry = _merge_entry(entry)
+        if merged_entry:
+            remove_history(history_key)
+            history_key = merged_entry.history_key
 
     if name:
         _dispatch_changed([name])
@@ -460,9 +843,133 @@ def _execute(command, name, level, history_key):
     if history_entry:
         _dispatch_changed_detailed([history_entry])
 
+
+def set_undo_merge_time_window(time_window: float = 0):
+    """Merge consecutive root level commands executed within **time_window** seconds of each other into a single
+    undo entry when they support it, see :meth:`omni.kit.commands.Command.can_merge`.
+
+    Merging is disabled by default, the default is read from "/exts/omni.kit.commands/undoMergeTimeWindow" setting.
+
+    Args:
+        time_window: Maximum time in seconds between two commands to merge them. 0 disables merging.
+    """
+    global _merge_time_window
+    _merge_time_window = max(time_window or 0, 0)
+
+
+def _get_merge_time_window():
+    global _merge_time_window
+    if _merge_time_window is None:
+        _merge_time_window = carb.settings.get_settings().get("/exts/omni.kit.commands/undoMergeTimeWindow") or 0
+    return _merge_time_window
+
+
+def _merge_entry(entry):
+    global _undo_stack_memory
+
+    # entry must be the last one on the stack (no descendants) and follow a root level entry without descendants
+    if _in_redo_command or _in_repeat_command or len(_undo_stack) < 2 or _undo_stack[-1] is not entry:
+        return None
+
+    previous = _undo_stack[-2]
+    can_merge = getattr(previous.command, "can_merge", None)
+    if previous.level != 0 or not callable(can_merge):
+        return None
+
+    time_window = _get_merge_time_window()
+    if time_window <= 0 or (entry.time - previous.time).total_seconds() > time_window:
+        return None
+
+    if not can_merge(entry.command):
+        return None
+
+    previous.command.merge(entry.command)
+
+    # replace both entries with the merged one, keeping the time of the latest so continuous edits keep merging
+    _undo_stack.pop()
+    _undo_stack.pop()
+    merged_entry = previous._replace(time=entry.time, kwargs=entry.kwargs)
+    _undo_stack.append(merged_entry)
+    change_history(merged_entry.history_key, kwargs=entry.kwargs)
+
+    if _root_groups and _root_groups[-1].entry is previous:
+        group = _root_groups.pop()
+        memory = _get_memory_footprint(merged_entry.command)
+        _root_groups.append(RootGroup(merged_entry, 1, memory))
+        _undo_stack_memory += memory - group.memory
+
+    return merged_entry
+
+
+def _do(command, name, kwargs):
+    if _profiler._enabled:
+        return _do_profiled(command, name, kwargs)
+
+    # a batch calls the callbacks for each of its commands itself
+    if isinstance(command, BatchCommand):
+        return command.do()
+
+    info = call_callbacks(command, name, kwargs, omni.kit.commands.PRE_DO_CALLBACK)
+    result = command.do()
+    call_callbacks(command, name, kwargs, omni.kit.commands.POST_DO_CALLBACK, info)
     return result
 
 
+def _do_profiled(command, name, kwargs):
+    carb.profiler.begin(1, name)
+    try:
+        if isinstance(command, BatchCommand):
+            start = perf_counter()
+            try:
+                return command.do()
+            finally:
+                _profiler._record(name, _profiler.DO, start, perf_counter())
+
+        start = perf_counter()
+        info = call_callbacks(command, name, kwargs, omni.kit.commands.PRE_DO_CALLBACK)
+        do_start = perf_counter()
+        _profiler._record(name, _profiler.CALLBACK, start, do_start)
+        try:
+            result = command.do()
+        finally:
+            do_end = perf_counter()
+            _profiler._record(name, _profiler.DO, do_start, do_end)
+        call_callbacks(command, name, kwargs, omni.kit.commands.POST_DO_CALLBACK, info)
+        _profiler._record(name, _profiler.CALLBACK, do_end, perf_counter())
+        return result
+    finally:
+        carb.profiler.end(1)
+
+
+async def _do_async(command, name, kwargs):
+    do_async = getattr(command, "do_async", None)
+    if not callable(do_async):
+        return _do(command, name, kwargs)
+
+    info = call_callbacks(command, name, kwargs, omni.kit.commands.PRE_DO_CALLBACK)
+    # the time spent in other frames while the command is suspended is included
+    start = perf_counter() if _profiler._enabled else None
+    try:
+        result = await do_async()
+    finally:
+        if start is not None:
+            _profiler._record(name, _profiler.DO, start, perf_counter())
+    call_callbacks(command, name, kwargs, omni.kit.commands.POST_DO_CALLBACK, info)
+    return result
+
+
+def _undo(entry):
+    if not _profiler._enabled:
+        entry.command.undo()
+        return
+
+    start = perf_counter()
+    try:
+        entry.command.undo()
+    finally:
+        _profiler._record(entry.name, _profiler.UNDO, start, perf_counter())
+
+
 def _dispatch_changed(cmd_names=[]):
     for f in _on_change:
         f(cmd_names)
@@ -3,7 +3,8 @@ from .api import *
 from .utils import *
 from .layer_utils import *
 from .timesample_utils import *
-from .watcher import UsdWatcher, get_watcher
+from .utils import _destroy_composition_arc_caches, _destroy_sibling_name_indices
+from .watcher import UsdWatcher, UsdWatcherStats, get_watcher, _destroy_watchers
 from .transform_helper import TransformHelper
 from .layer_legacy import LayerEditMode, SublayerChangeType, Layers
 from .layer_legacy import  _get_layers, reload_layer_async, is_layer_globally_muted, active_authoring_layer_context
@@ -19,7 +20,7 @@ from . import editor
 
 stage_event_sub = None
 
-# Watcher is singleton. Call destroy explicitly to clean up subscriptions.
+# Watchers are created per UsdContext. Destroy them explicitly to clean up subscriptions.
 class UsdExtension(omni.ext.IExt):
     # from kit/source/python/extensions-bundled/omni/kit/builtin/init.py
     @staticmethod
@@ -76,7 +77,9 @@ class UsdExtension(omni.ext.IExt):
         global stage_event_sub
         stage_event_sub = None
 
-        get_watcher().destroy()
+        _destroy_watchers()
+        _destroy_sibling_name_indices()
+        _destroy_composition_arc_caches()
 
         omni.usd.shutdown_usd()
 
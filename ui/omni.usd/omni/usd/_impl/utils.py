@@ -9,7 +9,9 @@ import asyncio
 import carb
 import omni.usd
 from .._usd import WRITABLE_USD_FILE_EXTS_STR, get_context_from_stage_id
+from .watcher import _NoticeQueue
 import weakref
+from collections import namedtuple
 from enum import Enum
 from pxr import Usd, Tf, Sdf, Gf, UsdShade, UsdGeom, UsdLux, Trace, UsdUtils
 from typing import Callable, Union, Tuple, List
@@ -431,18 +433,115 @@ def get_authored_prim(prim):
     return None
 
 
-def get_introducing_layer(prim: Usd.Prim) -> Tuple[Sdf.Layer, Sdf.Path]:
-    """
-    This function will find the introducing layer and prim path of this prim.
-    An introducting layer is where the prim is firstly defined.
+ComposedArcs = namedtuple("ComposedArcs", ["references", "payloads"])
+ComposedArcs.__doc__ = """Composed reference and payload lists of a prim, see :func:`get_composed_arcs_from_prims`.
 
-    Args:
-        prim (Usd.Prim): Prim handle
+references: List of (Sdf.Reference, Sdf.Layer) tuples, as returned by :func:`get_composed_references_from_prim`.
+payloads: List of (Sdf.Payload, Sdf.Layer) tuples, as returned by :func:`get_composed_payloads_from_prim`.
+"""
 
-    Returns:
-        Tuple[Sdf.Layer, Sdf.Path]: Introducing layer and its introducing prim path.
+
+class _CompositionArcCache:
+    """Composition arcs of the prims of one stage, as returned by :func:`get_composed_references_from_prim`,
+    :func:`get_composed_payloads_from_prim`, :func:`get_url_from_prim` and :func:`get_introducing_layer`.
+
+    The arcs of a prim are composed on the first query. The resynced paths of ObjectsChanged notices are queued and
+    drop the entries of the resynced subtrees on the next query. A resync of the pseudo root, which is what changes of
+    the layer stack (sublayers, muting, reloads) are notified as, drops all the entries: they are only valid for the
+    layer stack they were composed with.
     """
 
+    def __init__(self, stage: Usd.Stage):
+        # prim path -> {query key: result}
+        self._entries = {}
+        # path -> paths of its children having an entry or descendants with one
+        self._children = {}
+        self._notices = notices = _NoticeQueue()
+        # The listener must not keep the cache alive, the notice queue is all it needs
+        self._listener = Tf.Notice.Register(
+            Usd.Notice.ObjectsChanged, lambda notice, sender: notices.append(notice), stage
+        )
+
+    def destroy(self):
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self._notices.clear()
+        self._entries.clear()
+        self._children.clear()
+
+    def update(self):
+        resynced, _ = self._notices.drain()
+        if not self._entries:
+            return
+
+        for paths in resynced:
+            for path in paths:
+                if path == Sdf.Path.absoluteRootPath:
+                    self._entries.clear()
+                    self._children.clear()
+                    return
+                if path.IsPrimPath():
+                    children = self._children.get(path.GetParentPath())
+                    if children:
+                        children.discard(path)
+                    self._drop(path)
+
+    def _drop(self, path: Sdf.Path):
+        self._entries.pop(path, None)
+        for child_path in self._children.pop(path, ()):
+            self._drop(child_path)
+
+    def _add(self, path: Sdf.Path) -> dict:
+        entry = {}
+        self._entries[path] = entry
+        # Index the entry under its ancestors, so a resynced subtree is dropped without looking at all the entries
+        while path != Sdf.Path.absoluteRootPath:
+            children = self._children.setdefault(path.GetParentPath(), set())
+            if path in children:
+                break
+            children.add(path)
+            path = path.GetParentPath()
+        return entry
+
+    def get(self, prim: Usd.Prim, key, compute: Callable):
+        """Returns the result of compute(prim) for key, computed once until the prim is resynced.
+        :meth:`update` has to be called first to drop the results of the resynced prims."""
+        path = prim.GetPath()
+        entry = self._entries.get(path)
+        if entry is None:
+            entry = self._add(path)
+        if key not in entry:
+            entry[key] = compute(prim)
+        return entry[key]
+
+
+# Usd.Stage -> _CompositionArcCache, the cache goes away with the last python reference to the stage
+_composition_arc_caches = weakref.WeakKeyDictionary()
+
+
+def _get_composition_arc_cache(stage: Usd.Stage) -> _CompositionArcCache:
+    cache = _composition_arc_caches.get(stage)
+    if cache is None:
+        cache = _CompositionArcCache(stage)
+        _composition_arc_caches[stage] = cache
+    cache.update()
+    return cache
+
+
+def _destroy_composition_arc_caches():
+    for cache in list(_composition_arc_caches.values()):
+        cache.destroy()
+    _composition_arc_caches.clear()
+
+
+def _get_cached_composition(prim: Usd.Prim, key, compute: Callable):
+    if not prim:
+        return compute(prim)
+    return _get_composition_arc_cache(prim.GetStage()).get(prim, key, compute)
+
+
+def _compute_introducing_layer(prim: Usd.Prim) -> Tuple[Sdf.Layer, Sdf.Path]:
     introducing_layer = None
     introducing_prim_path = None
     prim_stack = prim.GetPrimStack()
@@ -473,6 +572,20 @@ def get_introducing_layer(prim: Usd.Prim) -> Tuple[Sdf.Layer, Sdf.Path]:
     return introducing_layer, introducing_prim_path
 
 
+def get_introducing_layer(prim: Usd.Prim) -> Tuple[Sdf.Layer, Sdf.Path]:
+    """
+    This function will find the introducing layer and prim path of this prim.
+    An introducting layer is where the prim is firstly defined.
+
+    Args:
+        prim (Usd.Prim): Prim handle
+
+    Returns:
+        Tuple[Sdf.Layer, Sdf.Path]: Introducing layer and its introducing prim path.
+    """
+    return _get_cached_composition(prim, "introducing_layer", _compute_introducing_layer)
+
+
 def find_path_in_nodes(node, set_fn):
     def find_in_sublayers(node, layerTree, set_fn, sublayer=False):
         layer = layerTree.layer
@@ -487,10 +600,7 @@ def find_path_in_nodes(node, set_fn):
         omni.usd.find_path_in_nodes(node.children[-1], set_fn)
 
 
-def get_url_from_prim(prim):
-    """
-    Returns url of Prim when authored reference or None
-    """
+def _compute_url_from_prim(prim: Usd.Prim):
     url_path = None
     external_refs = omni.usd.get_composed_references_from_prim(prim)
     if not external_refs:
@@ -515,56 +625,64 @@ def get_url_from_prim(prim):
     return url_path
 
 
-def get_composed_payloads_from_prim(prim: Usd.Prim) -> List[Tuple[Sdf.Payload, Sdf.Layer]]:
-    """Gets composed payload list from prim.
+def get_url_from_prim(prim):
+    """
+    Returns url of Prim when authored reference or None
+    """
+    return _get_cached_composition(prim, "url", _compute_url_from_prim)
 
-    Args:
-        prim (Usd.Prim): Handle of Usd.Prim.
 
-    Returns:
-        List of payload items. Each item is a tuple that includes payload handle, and
-        the layer it's from.
-    """
+def _copy_reference(reference: Sdf.Reference, asset_path: str) -> Sdf.Reference:
+    return Sdf.Reference(
+        assetPath=asset_path,
+        primPath=reference.primPath,
+        layerOffset=reference.layerOffset,
+        customData=reference.customData,
+    )
+
+
+def _copy_payload(payload: Sdf.Payload, asset_path: str) -> Sdf.Payload:
+    return Sdf.Payload(assetPath=asset_path, primPath=payload.primPath, layerOffset=payload.layerOffset)
+
+
+def _compose_arcs(prim_stack, key: str, copy_arc: Callable, arc_name: str, fix_slashes: bool) -> List[Tuple]:
+    def _fix_slashes(asset_path):
+        return asset_path.replace("\\", "/") if fix_slashes else asset_path
 
-    def _make_payloads_absolute(info_map, layer, payloads):
-        ret_payloads = []
-        for payload in payloads:
-            authored_asset_path = payload.assetPath
+    def _make_arcs_absolute(info_map, layer, arcs):
+        ret_arcs = []
+        for arc in arcs:
+            authored_asset_path = arc.assetPath
             asset_path = (
                 authored_asset_path
                 if len(authored_asset_path) == 0 or layer.anonymous
                 else layer.ComputeAbsolutePath(authored_asset_path)
             )
-            # make a copy as Reference is immutable
-            ref_new = Sdf.Payload(
-                assetPath=asset_path,
-                primPath=payload.primPath,
-                layerOffset=payload.layerOffset,
-            )
+            # make a copy as Reference and Payload are immutable
+            arc_new = copy_arc(arc, _fix_slashes(asset_path))
 
-            ret_payloads.append(ref_new)
-            info_map.append((ref_new, layer, payload.layerOffset, payload.assetPath))
+            ret_arcs.append(arc_new)
+            info_map.append((arc_new, layer, arc))
 
-        return ret_payloads
+        return ret_arcs
 
-    # Poor man's version of _GetListOpMetadataImpl and _PcpComposeSiteReferencesOrPayloads without discarding invalid reference
-    payload_and_layers = []
-    stack = prim.GetPrimStack()
+    # Poor man's version of _GetListOpMetadataImpl and _PcpComposeSiteReferencesOrPayloads without discarding invalid arcs
+    arc_and_layers = []
     info_map = []  # cannot use dict, have to use equal compare. Equal reference may not have same hash
     list_ops = []
-    for prim_spec in stack:
-        if prim_spec.HasInfo(Sdf.PrimSpec.PayloadKey):
-            op = prim_spec.GetInfo(Sdf.PrimSpec.PayloadKey)
-            # Reference assetPath needs to be converted to absolute path so composed list properly adds and removes refs
+    for prim_spec in prim_stack:
+        if prim_spec.HasInfo(key):
+            op = prim_spec.GetInfo(key)
+            # Arc assetPath needs to be converted to absolute path so composed list properly adds and removes arcs
             # that may have different relative paths but actually resolve to the same absolute path.
             if op.isExplicit:
-                op.explicitItems = _make_payloads_absolute(info_map, prim_spec.layer, op.explicitItems)
+                op.explicitItems = _make_arcs_absolute(info_map, prim_spec.layer, op.explicitItems)
             else:
-                op.addedItems = _make_payloads_absolute(info_map, prim_spec.layer, op.addedItems)
-                op.prependedItems = _make_payloads_absolute(info_map, prim_spec.layer, op.prependedItems)
-                op.appendedItems = _make_payloads_absolute(info_map, prim_spec.layer, op.appendedItems)
-                op.deletedItems = _make_payloads_absolute(info_map, prim_spec.layer, op.deletedItems)
-                op.orderedItems = _make_payloads_absolute(info_map, prim_spec.layer, op.orderedItems)
+                op.addedItems = _make_arcs_absolute(info_map, prim_spec.layer, op.addedItems)
+                op.prependedItems = _make_arcs_absolute(info_map, prim_spec.layer, op.prependedItems)
+                op.appendedItems = _make_arcs_absolute(info_map, prim_spec.layer, op.appendedItems)
+                op.deletedItems = _make_arcs_absolute(info_map, prim_spec.layer, op.deletedItems)
+                op.orderedItems = _make_arcs_absolute(info_map, prim_spec.layer, op.orderedItems)
             list_ops.append(op)
 
     items = []
@@ -575,15 +693,26 @@ def get_composed_payloads_from_prim(prim: Usd.Prim) -> List[Tuple[Sdf.Payload, S
     for item in items:
         info = next((x for x in info_map if x[0] == item), None)
         if info:
-            restored_payload = Sdf.Payload(
-                assetPath=info[3],
-                primPath=info[0].primPath,
-                layerOffset=info[2],
-            )
-            payload_and_layers.append((restored_payload, info[1]))
+            # Restore the authored asset path
+            arc_and_layers.append((copy_arc(info[2], _fix_slashes(info[2].assetPath)), info[1]))
         else:
-            carb.log_error("Cannot found payload in info map! It might be a bug in the widget code.")
-    return payload_and_layers
+            carb.log_error(f"Cannot found {arc_name} in info map! It might be a bug in the widget code.")
+
+    return arc_and_layers
+
+
+def _compute_composed_arcs(prim: Usd.Prim, fix_slashes: bool) -> ComposedArcs:
+    prim_stack = prim.GetPrimStack()
+    return ComposedArcs(
+        _compose_arcs(prim_stack, Sdf.PrimSpec.ReferencesKey, _copy_reference, "reference", fix_slashes),
+        _compose_arcs(prim_stack, Sdf.PrimSpec.PayloadKey, _copy_payload, "payload", fix_slashes),
+    )
+
+
+def _get_composed_arcs(prim: Usd.Prim, fix_slashes: bool) -> ComposedArcs:
+    return _get_cached_composition(
+        prim, ("arcs", fix_slashes), lambda prim: _compute_composed_arcs(prim, fix_slashes)
+    )
 
 
 def get_composed_references_from_prim(prim: Usd.Prim, fix_slashes: bool=True) -> List[Tuple[Sdf.Reference, Sdf.Layer]]:
@@ -596,68 +725,7 @@ def get_composed_references_from_prim(prim: Usd.Prim, fix_slashes: bool=True) ->
         List of reference items. Each item is a tuple that includes reference handle, and
         the layer it's from.
     """
-
-    def _make_refs_absolute(info_map, layer, refs):
-        ret_refs = []
-        for ref in refs:
-            authored_asset_path = ref.assetPath
-            asset_path = (
-                authored_asset_path
-                if len(authored_asset_path) == 0 or layer.anonymous
-                else layer.ComputeAbsolutePath(authored_asset_path)
-            )
-            # make a copy as Reference is immutable
-            ref_new = Sdf.Reference(
-                assetPath=asset_path.replace("\\", "/") if fix_slashes else asset_path,
-                primPath=ref.primPath,
-                layerOffset=ref.layerOffset,
-                customData=ref.customData,
-            )
-
-            ret_refs.append(ref_new)
-            info_map.append((ref_new, layer, ref.layerOffset, ref.assetPath))
-
-        return ret_refs
-
-    # Poor man's version of _GetListOpMetadataImpl and _PcpComposeSiteReferencesOrPayloads without discarding invalid reference
-    ref_and_layers = []
-    stack = prim.GetPrimStack()
-    info_map = []  # cannot use dict, have to use equal compare. Equal reference may not have same hash
-    list_ops = []
-    for prim_spec in stack:
-        if prim_spec.HasInfo(Sdf.PrimSpec.ReferencesKey):
-            op = prim_spec.GetInfo(Sdf.PrimSpec.ReferencesKey)
-            # Reference assetPath needs to be converted to absolute path so composed list properly adds and removes refs
-            # that may have different relative paths but actually resolve to the same absolute path.
-            if op.isExplicit:
-                op.explicitItems = _make_refs_absolute(info_map, prim_spec.layer, op.explicitItems)
-            else:
-                op.addedItems = _make_refs_absolute(info_map, prim_spec.layer, op.addedItems)
-                op.prependedItems = _make_refs_absolute(info_map, prim_spec.layer, op.prependedItems)
-                op.appendedItems = _make_refs_absolute(info_map, prim_spec.layer, op.appendedItems)
-                op.deletedItems = _make_refs_absolute(info_map, prim_spec.layer, op.deletedItems)
-                op.orderedItems = _make_refs_absolute(info_map, prim_spec.layer, op.orderedItems)
-            list_ops.append(op)
-
-    items = []
-    list_ops.reverse()
-    for op in list_ops:
-        items = op.ApplyOperations(items)
-
-    for item in items:
-        info = next((x for x in info_map if x[0] == item), None)
-        if info:
-            restored_ref = Sdf.Reference(
-                assetPath=info[3].replace("\\", "/") if fix_slashes else info[3],
-                primPath=info[0].primPath,
-                layerOffset=info[2],
-                customData=info[0].customData,
-            )
-            ref_and_layers.append((restored_ref, info[1]))
-        else:
-            carb.log_error("Cannot found reference in info map! It might be a bug in the widget code.")
-
-    return ref_and_layers
+    return list(_get_composed_arcs(prim, fix_slashes).references)
 
 
 def get_composed_payloads_from_prim(prim: Usd.Prim, fix_slashes: bool=True) -> List[Tuple[Sdf.Payload, Sdf.Layer]]:
@@ -670,66 +738,40 @@ def get_composed_payloads_from_prim(prim: Usd.Prim, fix_slashes: bool=True) -> L
         List of payload items. Each item is a tuple that includes payload handle, and
         the layer it's from.
     """
+    return list(_get_composed_arcs(prim, fix_slashes).payloads)
 
-    def _make_refs_absolute(info_map, layer, refs):
-        ret_refs = []
-        for ref in refs:
-            authored_asset_path = ref.assetPath
-            asset_path = (
-                authored_asset_path
-                if len(authored_asset_path) == 0 or layer.anonymous
-                else layer.ComputeAbsolutePath(authored_asset_path)
-            )
-            # make a copy as Payload is immutable
-            ref_new = Sdf.Payload(
-                assetPath=asset_path.replace("\\", "/") if fix_slashes else asset_path,
-                primPath=ref.primPath,
-                layerOffset=ref.layerOffset,
-            )
 
-            ret_refs.append(ref_new)
-            info_map.append((ref_new, layer, ref.layerOffset, ref.assetPath))
+def get_composed_arcs_from_prims(prims: List[Usd.Prim], fix_slashes: bool = True) -> List[ComposedArcs]:
+    """Gets composed reference and payload lists of many prims at once, e.g. the rows of a stage tree.
 
-        return ret_refs
+    The changes of each stage are applied to its cache once for all the prims, and the prim stack of each prim is
+    walked once for both lists.
 
-    # Poor man's version of _GetListOpMetadataImpl and _PcpComposeSiteReferencesOrPayloads without discarding invalid payload
-    ref_and_layers = []
-    stack = prim.GetPrimStack()
-    info_map = []  # cannot use dict, have to use equal compare. Equal payload may not have same hash
-    list_ops = []
-    for prim_spec in stack:
-        if prim_spec.HasInfo(Sdf.PrimSpec.PayloadKey):
-            op = prim_spec.GetInfo(Sdf.PrimSpec.PayloadKey)
-            # Payload assetPath needs to be converted to absolute path so composed list properly adds and removes refs
-            # that may have different relative paths but actually resolve to the same absolute path.
-            if op.isExplicit:
-                op.explicitItems = _make_refs_absolute(info_map, prim_spec.layer, op.explicitItems)
-            else:
-                op.addedItems = _make_refs_absolute(info_map, prim_spec.layer, op.addedItems)
-                op.prependedItems = _make_refs_absolute(info_map, prim_spec.layer, op.prependedItems)
-                op.appendedItems = _make_refs_absolute(info_map, prim_spec.layer, op.appendedItems)
-                op.deletedItems = _make_refs_absolute(info_map, prim_spec.layer, op.deletedItems)
-                op.orderedItems = _make_refs_absolute(info_map, prim_spec.layer, op.orderedItems)
-            list_ops.append(op)
+    Args:
+        prims (List[Usd.Prim]): Handles of Usd.Prim.
+        fix_slashes (bool): Replace backslashes of asset paths with slashes.
 
-    items = []
-    list_ops.reverse()
-    for op in list_ops:
-        items = op.ApplyOperations(items)
+    Returns:
+        List of :class:`ComposedArcs`, one per prim.
+    """
+    key = ("arcs", fix_slashes)
 
-    for item in items:
-        info = next((x for x in info_map if x[0] == item), None)
-        if info:
-            restored_ref = Sdf.Payload(
-                assetPath=info[3].replace("\\", "/") if fix_slashes else info[3],
-                primPath=info[0].primPath,
-                layerOffset=info[2],
-            )
-            ref_and_layers.append((restored_ref, info[1]))
-        else:
-            carb.log_error("Cannot found payload in info map! It might be a bug in the widget code.")
+    def compute(prim):
+        return _compute_composed_arcs(prim, fix_slashes)
 
-    return ref_and_layers
+    caches = {}
+    composed_arcs = []
+    for prim in prims:
+        if not prim:
+            arcs = compute(prim)
+        else:
+            stage = prim.GetStage()
+            cache = caches.get(stage)
+            if cache is None:
+                cache = caches[stage] = _get_composition_arc_cache(stage)
+            arcs = cache.get(prim, key, compute)
+        composed_arcs.append(ComposedArcs(list(arcs.references), list(arcs.payloads)))
+    return composed_arcs
 
 
 # Check if prim is brought into composition by its ancestor.
@@ -939,7 +981,141 @@ def get_local_transform_SRT(prim, time=Usd.TimeCode.Default()) -> Tuple[Gf.Vec3d
     return scale, rotation, rotation_order, translation
 
 
-def get_stage_next_free_path(stage: Usd.Stage, path: Union[str, Sdf.Path], prepend_default_prim: bool):
+_NUMERIC_SUFFIX = re.compile(r"_(\d+)$")
+
+
+class _SiblingNameIndex:
+    """Names of the children of the parents queried by :func:`get_stage_next_free_paths` on one stage.
+
+    The children names of a parent are listed once, then kept up to date from the resynced paths of ObjectsChanged
+    notices, which are queued and applied on the next query. For each base name, the first suffix which was found
+    free is kept, so allocating N copies of the same prim doesn't probe all the previous copies N times.
+    """
+
+    def __init__(self, stage: Usd.Stage):
+        self._names = {}
+        # parent path -> {(base name, first suffix): suffix up to which all the names are taken}
+        self._taken_suffixes = {}
+        self._notices = notices = _NoticeQueue()
+        # The listener must not keep the index alive, the notice queue is all it needs
+        self._listener = Tf.Notice.Register(
+            Usd.Notice.ObjectsChanged, lambda notice, sender: notices.append(notice), stage
+        )
+
+    def destroy(self):
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self._notices.clear()
+
+    def _update(self, stage: Usd.Stage):
+        resynced, _ = self._notices.drain()
+        if not self._names:
+            return
+
+        resynced_prim_paths = set()
+        for paths in resynced:
+            for path in paths:
+                if path == Sdf.Path.absoluteRootPath:
+                    self._names.clear()
+                    self._taken_suffixes.clear()
+                    return
+                if path.IsPrimPath():
+                    resynced_prim_paths.add(path)
+        if not resynced_prim_paths:
+            return
+
+        for path in resynced_prim_paths:
+            names = self._names.get(path.GetParentPath())
+            if names is not None:
+                if stage.GetPrimAtPath(path):
+                    names.add(path.name)
+                elif path.name in names:
+                    names.discard(path.name)
+                    self._taken_suffixes.pop(path.GetParentPath(), None)
+
+        # The resynced subtrees are recomposed, their children have to be listed again
+        roots = set(Sdf.Path.RemoveDescendentPaths(list(resynced_prim_paths)))
+        stale_parent_paths = [path for path in self._names if not roots.isdisjoint(path.GetPrefixes())]
+        for parent_path in stale_parent_paths:
+            del self._names[parent_path]
+            self._taken_suffixes.pop(parent_path, None)
+
+    def _get_names(self, stage: Usd.Stage, parent_path: Sdf.Path) -> typing.Set[str]:
+        names = self._names.get(parent_path)
+        if names is None:
+            parent = stage.GetPrimAtPath(parent_path)
+            if parent:
+                # Same prims as the ones returned by Usd.Stage.GetPrimAtPath()
+                predicate = Usd.TraverseInstanceProxies(Usd.PrimAllPrimsPredicate)
+                names = set(parent.GetFilteredChildrenNames(predicate))
+            else:
+                names = set()
+            self._names[parent_path] = names
+        return names
+
+    def allocate(self, stage: Usd.Stage, path: Sdf.Path, count: int) -> List[str]:
+        self._update(stage)
+
+        parent_path = path.GetParentPath()
+        names = self._get_names(stage, parent_path)
+
+        # The index doesn't know about the prims created in a change block which is still open, the free paths are
+        # checked on the stage as well.
+        free_paths = []
+        if path.name not in names and not stage.GetPrimAtPath(path):
+            free_paths.append(path.pathString)
+            if count == 1:
+                return free_paths
+
+        match = _NUMERIC_SUFFIX.search(path.name)
+        if match:
+            base_name = path.name[: match.start()]
+            first_suffix = int(match.group(1)) + 1
+        else:
+            base_name = path.name
+            first_suffix = 1
+
+        taken_suffixes = self._taken_suffixes.setdefault(parent_path, {})
+        key = (base_name, first_suffix)
+        suffix = taken_suffixes.get(key, first_suffix)
+        found_free_suffix = False
+        while len(free_paths) < count:
+            name = f"{base_name}_{suffix:02d}"
+            if name not in names:
+                free_path = parent_path.AppendChild(name)
+                if not stage.GetPrimAtPath(free_path):
+                    # The next paths are free but not taken, they will be probed again by the next call
+                    if not found_free_suffix:
+                        taken_suffixes[key] = suffix
+                        found_free_suffix = True
+                    free_paths.append(free_path.pathString)
+                else:
+                    names.add(name)
+            suffix += 1
+
+        return free_paths
+
+
+# Usd.Stage -> _SiblingNameIndex, the index goes away with the last python reference to the stage
+_sibling_name_indices = weakref.WeakKeyDictionary()
+
+
+def _get_sibling_name_index(stage: Usd.Stage) -> _SiblingNameIndex:
+    index = _sibling_name_indices.get(stage)
+    if index is None:
+        index = _SiblingNameIndex(stage)
+        _sibling_name_indices[stage] = index
+    return index
+
+
+def _destroy_sibling_name_indices():
+    for index in list(_sibling_name_indices.values()):
+        index.destroy()
+    _sibling_name_indices.clear()
+
+
+def _get_new_prim_path(stage: Usd.Stage, path: Union[str, Sdf.Path], prepend_default_prim: bool) -> Sdf.Path:
     if isinstance(path, str) and not Sdf.Path.IsValidPathString(path):
         raise ValueError(f"{path} is not a valid path")
 
@@ -955,20 +1131,38 @@ def get_stage_next_free_path(stage: Usd.Stage, path: Union[str, Sdf.Path], prepe
         if defaultPrim and not (path.HasPrefix(defaultPrim.GetPath()) and path != defaultPrim.GetPath()):
             path = path.ReplacePrefix(Sdf.Path.absoluteRootPath, defaultPrim.GetPath())
 
-    def increment_path(path):
-        match = re.search("_(\d+)$", path)
-        if match:
-            new_num = int(match.group(1)) + 1
-            ret = re.sub("_(\d+)$", str.format("_{:02d}", new_num), path)
-        else:
-            ret = path + "_01"
-        return ret
+    return path
 
-    path_string = path.pathString
-    while stage.GetPrimAtPath(path_string):
-        path_string = increment_path(path_string)
 
-    return path_string
+def get_stage_next_free_path(stage: Usd.Stage, path: Union[str, Sdf.Path], prepend_default_prim: bool):
+    """Returns **path** if there is no prim at it, otherwise the first free path with a numeric suffix added or
+    incremented (e.g. /World/Cube_01, /World/Cube_02...).
+
+    Args:
+        stage: Stage to find a free path on.
+        path: Wanted path.
+        prepend_default_prim: Move **path** under the default prim of the stage, if it's not already under it.
+    """
+    path = _get_new_prim_path(stage, path, prepend_default_prim)
+    return _get_sibling_name_index(stage).allocate(stage, path, 1)[0]
+
+
+def get_stage_next_free_paths(
+    stage: Usd.Stage, path: Union[str, Sdf.Path], count: int, prepend_default_prim: bool
+) -> List[str]:
+    """Returns **count** distinct free paths, the ones :func:`get_stage_next_free_path` would return if a prim was
+    created at each of them in turn.
+
+    Args:
+        stage: Stage to find free paths on.
+        path: Wanted path.
+        count: Number of paths.
+        prepend_default_prim: Move **path** under the default prim of the stage, if it's not already under it.
+    """
+    if count <= 0:
+        return []
+    path = _get_new_prim_path(stage, path, prepend_default_prim)
+    return _get_sibling_name_index(stage).allocate(stage, path, count)
 
 
 def get_prim_descendents(root_prim):
@@ -980,62 +1174,240 @@ def get_prim_descendents(root_prim):
     return descendents
 
 
-class PrimCaching:
-    def __init__(self, usd_type, stage, on_changed=None):
+PrimCachingChanges = namedtuple("PrimCachingChanges", ["added", "removed", "updated"])
+PrimCachingChanges.__doc__ = """Changes of the prims indexed by :class:`PrimCaching` during one update.
+
+added: Set of paths of the prims of the type which appeared on the stage.
+removed: Set of paths of the prims of the type which were removed from the stage, or aren't of the type anymore.
+updated: Set of paths of the prims of the type which were resynced or had properties or metadata changed.
+"""
+
+
+class _StageChanges:
+    """Changes of a stage during one update, shared by all the :class:`PrimCaching` of the stage.
+
+    Each changed path is resolved to a prim at most once, and the resynced subtrees are traversed at most once,
+    whatever the number of caches.
+    """
+
+    def __init__(self, stage, resynced, changed_info):
+        self.stage = stage
+        resynced_roots = set()
+        # prims whose properties or metadata changed
+        self.updated_prim_paths = set()
+        for paths in resynced:
+            for p in paths:
+                if p.IsPropertyPath():
+                    self.updated_prim_paths.add(p.GetPrimPath())
+                else:
+                    resynced_roots.add(p)
+        for paths in changed_info:
+            self.updated_prim_paths.update(p.GetPrimPath() if p.IsPropertyPath() else p for p in paths)
+        self.resynced_roots = Sdf.Path.RemoveDescendentPaths(list(resynced_roots)) if resynced_roots else []
+        self._changed_prim_paths = resynced_roots | self.updated_prim_paths
+        self._prims = {}
+        self._resynced_prims = None
+        self._is_a = {}
+
+    def get_changed_prim_paths(self) -> typing.Set[Sdf.Path]:
+        return self._changed_prim_paths
+
+    def get_prim(self, path: Sdf.Path) -> Usd.Prim:
+        prim = self._prims.get(path, None)
+        if prim is None:
+            prim = self._prims[path] = self.stage.GetPrimAtPath(path)
+        return prim
+
+    def get_resynced_prims(self) -> typing.List[Usd.Prim]:
+        """Returns the prims of the resynced subtrees, as they are on the stage now."""
+        if self._resynced_prims is None:
+            self._resynced_prims = []
+            for root in self.resynced_roots:
+                prim = self.get_prim(root)
+                if prim:
+                    self._resynced_prims.extend(Usd.PrimRange(prim))
+        return self._resynced_prims
+
+    def is_a(self, prim: Usd.Prim, usd_type) -> bool:
+        # the result only depends on the type of the prim
+        key = (prim.GetTypeName(), usd_type)
+        result = self._is_a.get(key, None)
+        if result is None:
+            result = self._is_a[key] = prim.IsA(usd_type)
+        return result
+
+
+class _PrimCachingHub:
+    """Listens to the changes of one stage for all of its :class:`PrimCaching`, and processes them once per update."""
+
+    def __init__(self, stage):
+        self._stage = weakref.ref(stage)
+        # weak, so that a PrimCaching which is not destroyed is still collected and reported as a leak
+        self._caches = weakref.WeakSet()
+        self._notices = _NoticeQueue()
         self._notice_listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_usd_changed, stage)
-        self._stage = weakref.ref(stage) if stage else None
-        self._usd_type = usd_type
-        self._on_changed = on_changed
-        self._usd_cache_state = False
-        self._usd_property_changes = set()
         self.__prim_changed_task = None
-        self._stage_event_sub = (
-            omni.usd.get_context()
-            .get_stage_event_stream()
-            .create_subscription_to_pop(self._on_stage_event, name="PrimCaching stage update")
-        )
-
-    def __del__(self):
-        if self._notice_listener:
-            carb.log_error(f"PrimCaching leak. destroy has not been called")
-            self.destroy()
 
     def destroy(self):
         if self._notice_listener:
             self._notice_listener.Revoke()
         self._notice_listener = None
         self._stage = None
-        self._usd_type = None
-        self._usd_property_changes = None
+        self._caches = weakref.WeakSet()
+        self._notices.clear()
         self.__prim_changed_task = None
-        self._stage_event_sub = None
-
-    @Trace.TraceFunction
-    def _on_usd_changed(self, notice, stage):
-        if not self._stage or not self._stage():
-            return
 
-        if stage != self._stage():
-            return
+    def get_stage(self):
+        return self._stage() if self._stage else None
 
-        for p in notice.GetResyncedPaths():
-            self._usd_property_changes.add(p.GetPrimPath() if p.IsPropertyPath() else p)
+    def add(self, cache):
+        # changes before the cache was added don't concern it
+        self.process_changes()
+        self._caches.add(cache)
 
-        for p in notice.GetChangedInfoOnlyPaths():
-            self._usd_property_changes.add(p.GetPrimPath() if p.IsPropertyPath() else p)
+    def remove(self, cache):
+        self._caches.discard(cache)
+        return bool(self._caches)
 
-        # Update in the next frame. We need it because we want to accumulate the affected prims
+    @Trace.TraceFunction
+    def _on_usd_changed(self, notice, stage):
+        # The paths are converted to prims in the next frame. We need it because we want to accumulate the affected
+        # prims, and to keep the work done for every change authored on the stage minimal.
+        self._notices.append(notice)
         if self.__prim_changed_task is None or self.__prim_changed_task.done():
             self.__prim_changed_task = asyncio.ensure_future(self._update_usd_cache_state())
 
     @handle_exception
     async def _update_usd_cache_state(self):
         await omni.kit.app.get_app().next_update_async()
-        if not self._stage or not self._stage():
+        self.process_changes()
+
+    def process_changes(self):
+        stage = self.get_stage()
+        if not stage or not self._notices:
+            return
+        changes = _StageChanges(stage, *self._notices.drain())
+        # caches may be destroyed by the callbacks of other caches
+        for cache in list(self._caches):
+            if cache in self._caches:
+                cache._apply_changes(changes)
+
+
+# Hubs of the stages with PrimCaching, and all PrimCaching, which follow the stage of the default UsdContext
+_prim_caching_hubs: typing.List[_PrimCachingHub] = []
+# weak references, PrimCaching must be destroyed by their owner, see PrimCaching.__del__
+_prim_cachings = weakref.WeakSet()
+_prim_caching_stage_event_sub = None
+
+
+def _get_prim_caching_hub(stage) -> _PrimCachingHub:
+    for hub in _prim_caching_hubs:
+        if hub.get_stage() == stage:
+            return hub
+    hub = _PrimCachingHub(stage)
+    _prim_caching_hubs.append(hub)
+    return hub
+
+
+def _release_prim_caching_hub(hub: _PrimCachingHub, cache):
+    if not hub.remove(cache):
+        hub.destroy()
+        _prim_caching_hubs.remove(hub)
+
+
+def _register_prim_caching(cache, stage):
+    global _prim_caching_stage_event_sub
+    _prim_cachings.add(cache)
+    if _prim_caching_stage_event_sub is None:
+        _prim_caching_stage_event_sub = (
+            omni.usd.get_context()
+            .get_stage_event_stream()
+            .create_subscription_to_pop(_on_prim_caching_stage_event, name="PrimCaching stage update")
+        )
+    cache._set_stage(stage)
+
+
+def _unregister_prim_caching(cache):
+    global _prim_caching_stage_event_sub
+    cache._set_stage(None)
+    _prim_cachings.discard(cache)
+    if not _prim_cachings:
+        _prim_caching_stage_event_sub = None
+
+
+def _on_prim_caching_stage_event(event: carb.events.IEvent):
+    if event.type == int(omni.usd.StageEventType.CLOSING):
+        carb.log_verbose(f"stage closed - cleared cache & reset stage")
+        stage = None
+    elif event.type == int(omni.usd.StageEventType.OPENED):
+        carb.log_verbose(f"new stage - cleared cache & initalized new stage")
+        stage = omni.usd.get_context().get_stage()
+    else:
+        return
+
+    for cache in list(_prim_cachings):
+        cache._set_stage(stage)
+    for cache in list(_prim_cachings):
+        cache.set_cache_state(False)
+        if cache._on_changed:
+            cache._on_changed()
+
+
+class PrimCaching:
+    """Tracks the prims of **usd_type** on **stage**, e.g. UsdShade.Material.
+
+    The cache state is set to False (and **on_changed** is called) when a prim of the type changes, so that users
+    can rebuild what they derive from these prims.
+
+    The paths of the prims of the type are indexed on the first call to :meth:`get_prim_paths` or :meth:`contains`,
+    with one traversal of the stage. The index is then updated incrementally from the changes of the stage, and
+    **on_prims_changed** is called with the :class:`PrimCachingChanges` of each update. Changes of prims of other
+    types don't affect the cache state once the index is built.
+
+    All the PrimCaching of a stage share one notice listener, and each changed path is resolved once per update
+    for all of them.
+    """
+
+    def __init__(self, usd_type, stage, on_changed=None, on_prims_changed=None):
+        self._hub = None
+        self._stage = None
+        self._usd_type = usd_type
+        self._on_changed = on_changed
+        self._on_prims_changed = on_prims_changed
+        self._usd_cache_state = False
+        # paths of the prims of usd_type, None until it's first needed
+        self._prim_paths = None
+        # path -> paths of its children in _prim_paths or having descendants in it
+        self._children = {}
+        _register_prim_caching(self, stage)
+
+    def __del__(self):
+        if self._hub:
+            carb.log_error(f"PrimCaching leak. destroy has not been called")
+            self.destroy()
+
+    def destroy(self):
+        _unregister_prim_caching(self)
+        self._usd_type = None
+
+    def _set_stage(self, stage):
+        if self._hub:
+            _release_prim_caching_hub(self._hub, self)
+        self._hub = None
+        self._stage = weakref.ref(stage) if stage else None
+        self._prim_paths = None
+        self._children = {}
+        if stage:
+            self._hub = _get_prim_caching_hub(stage)
+            self._hub.add(self)
+
+    def _apply_changes(self, changes: _StageChanges):
+        if self._prim_paths is not None:
+            self._update_prim_paths(changes)
             return
-        stage = self._stage()
-        for path in self._usd_property_changes:
-            prim = stage.GetPrimAtPath(path)
+
+        for path in changes.get_changed_prim_paths():
+            prim = changes.get_prim(path)
             # if prim is deleted or is a material, clear cache
             if not prim:
                 carb.log_verbose(f"prim {path.GetPrimPath()} deleted/renamed - cleared cache")
@@ -1043,33 +1415,87 @@ class PrimCaching:
                 if self._on_changed:
                     self._on_changed()
                 break
-            if prim.IsA(self._usd_type):
+            if changes.is_a(prim, self._usd_type):
                 carb.log_verbose(f"prim {prim} changed - cleared cache")
                 self.set_cache_state(False)
                 if self._on_changed:
                     self._on_changed()
                 break
-        self._usd_property_changes = set()
-
-    def _on_stage_event(self, event: carb.events.IEvent):
-        if event.type == int(omni.usd.StageEventType.CLOSING):
-            carb.log_verbose(f"stage closed - cleared cache & reset stage")
-            if self._notice_listener:
-                self._notice_listener.Revoke()
-            self._notice_listener = None
-            self._stage = None
-            self.set_cache_state(False)
-            if self._on_changed:
-                self._on_changed()
-        elif event.type == int(omni.usd.StageEventType.OPENED):
-            stage = omni.usd.get_context().get_stage()
-            carb.log_verbose(f"new stage - cleared cache & initalized new stage")
-            if stage:
-                self._stage = weakref.ref(stage)
-                self._notice_listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_usd_changed, stage)
-            self.set_cache_state(False)
-            if self._on_changed:
-                self._on_changed()
+
+    def _update_prim_paths(self, changes: _StageChanges):
+        # Resynced prims (and their descendants) may have been added, removed or changed type: traverse them again.
+        # Resynced properties and info only changes can only update the prims which are already indexed.
+        updated = changes.updated_prim_paths & self._prim_paths
+        added = set()
+        removed = set()
+        if changes.resynced_roots:
+            old_paths = set()
+            for root in changes.resynced_roots:
+                self._collect_indexed_paths(root, old_paths)
+            new_paths = {p.GetPath() for p in changes.get_resynced_prims() if changes.is_a(p, self._usd_type)}
+            added = new_paths - old_paths
+            removed = old_paths - new_paths
+            updated = (updated - removed) | (old_paths & new_paths)
+            self._prim_paths -= removed
+            for path in removed:
+                self._unindex_path(path)
+            self._prim_paths |= added
+            for path in added:
+                self._index_path(path)
+
+        if not added and not removed and not updated:
+            return
+
+        carb.log_verbose(f"{len(added)} prims added, {len(removed)} removed, {len(updated)} updated - cleared cache")
+        self.set_cache_state(False)
+        if self._on_prims_changed:
+            self._on_prims_changed(PrimCachingChanges(added, removed, updated))
+        if self._on_changed:
+            self._on_changed()
+
+    def _collect_indexed_paths(self, path: Sdf.Path, paths: typing.Set[Sdf.Path]):
+        """Adds the indexed paths of the subtree of **path** to **paths**."""
+        if path in self._prim_paths:
+            paths.add(path)
+        for child_path in self._children.get(path, ()):
+            self._collect_indexed_paths(child_path, paths)
+
+    def _index_path(self, path: Sdf.Path):
+        # Index the path under its ancestors, so a resynced subtree is found without looking at all the paths
+        while path != Sdf.Path.absoluteRootPath:
+            children = self._children.setdefault(path.GetParentPath(), set())
+            if path in children:
+                break
+            children.add(path)
+            path = path.GetParentPath()
+
+    def _unindex_path(self, path: Sdf.Path):
+        # Remove the path and the ancestors left without indexed descendants from the index
+        while path != Sdf.Path.absoluteRootPath and path not in self._prim_paths and not self._children.get(path):
+            self._children.pop(path, None)
+            parent_path = path.GetParentPath()
+            children = self._children.get(parent_path)
+            if children is None:
+                break
+            children.discard(path)
+            path = parent_path
+
+    def get_prim_paths(self) -> typing.Set[Sdf.Path]:
+        """Returns the paths of all the prims of **usd_type** on the stage. The set must not be modified."""
+        stage = self.get_stage()
+        if not stage or not self._hub:
+            return set()
+        # the index must include the changes which were not processed yet
+        self._hub.process_changes()
+        if self._prim_paths is None:
+            self._prim_paths = {prim.GetPath() for prim in stage.Traverse() if prim.IsA(self._usd_type)}
+            for path in self._prim_paths:
+                self._index_path(path)
+        return self._prim_paths
+
+    def contains(self, path: Union[str, Sdf.Path]) -> bool:
+        """Returns True if the prim at **path** is of **usd_type**."""
+        return Sdf.Path(path) in self.get_prim_paths()
 
     def get_cache_state(self):
         return self._usd_cache_state
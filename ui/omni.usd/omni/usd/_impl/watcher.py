@@ -1,8 +1,12 @@
+from collections import deque, namedtuple
 from enum import Enum
-from functools import lru_cache
+from time import perf_counter
 import typing
 import carb
+import carb.events
+import carb.settings
 import omni.kit.app
+import omni.usd
 
 
 from pxr import Usd, Tf, Sdf, Gf, Trace
@@ -13,74 +17,392 @@ class EventType(Enum):
     RESYNC = 1
 
 
-class EventDispatcher:
+UsdWatcherStats = namedtuple(
+    "UsdWatcherStats",
+    [
+        "resynced_received",
+        "resynced_dispatched",
+        "resynced_backlog",
+        "changed_info_received",
+        "changed_info_dispatched",
+        "changed_info_backlog",
+        "dispatch_time",
+    ],
+)
+UsdWatcherStats.__doc__ = """Paths handled by :class:`UsdWatcher` during its last update.
+
+resynced_received, changed_info_received: Number of paths received from ObjectsChanged notices, including duplicates.
+resynced_dispatched, changed_info_dispatched: Number of paths dispatched to the subscribers after coalescing.
+resynced_backlog, changed_info_backlog: Number of paths left to dispatch in the next updates.
+dispatch_time: Time spent dispatching the paths, in seconds.
+"""
+_EMPTY_STATS = UsdWatcherStats(0, 0, 0, 0, 0, 0, 0.0)
+
+
+def _get_prefixes(path: Sdf.Path):
+    # the absolute root path is the root of the tree, it has no prefixes of its own
+    if path == Sdf.Path.absoluteRootPath:
+        return []
+    return path.GetPrefixes()
+
+
+class _PathNode:
+    """Node of the tree of subscribed paths. Nodes without subscribers in their subtree are removed."""
+
+    __slots__ = ("children", "callbacks", "subtree_callbacks")
+
     def __init__(self):
-        self._path_to_callbacks = {}
+        self.children = {}
+        self.callbacks = set()
+        self.subtree_callbacks = set()
+
+    def is_empty(self):
+        return not (self.children or self.callbacks or self.subtree_callbacks)
+
+
+class EventDispatcher:
+    """Dispatches changed paths to the callbacks subscribed to them.
+
+    Subscriptions are stored in a tree of Sdf.Path prefixes, so dispatching a changed path costs O(depth + matches)
+    regardless of the number of subscriptions. A changed path notifies:
+
+    - the callbacks subscribed to the path itself, and to its prim path if it is a property path;
+    - the subtree callbacks subscribed to the path or any of its ancestors;
+    - if **notify_descendants** is True (e.g. for resyncs), all the callbacks subscribed to descendants of the path.
+
+    Callbacks are always passed the changed path.
+    """
+
+    def __init__(self, notify_descendants: bool = False):
+        self._root = _PathNode()
+        self._notify_descendants = notify_descendants
         self._dispatch_set = set()
+        self._received_count = 0
 
-    def subscribe_on_change(self, path, on_change: typing.Callable) -> carb.Subscription:
+    def subscribe_on_change(self, path, on_change: typing.Callable, subtree: bool = False) -> carb.Subscription:
         key = Sdf.Path(path)
-        callbacks = self._path_to_callbacks.setdefault(key, set())
+        prefixes = _get_prefixes(key)
+        node = self._root
+        for prefix in prefixes:
+            child = node.children.get(prefix, None)
+            if child is None:
+                child = node.children[prefix] = _PathNode()
+            node = child
+        callbacks = node.subtree_callbacks if subtree else node.callbacks
         callbacks.add(on_change)
 
         def unsub_fn():
             callbacks.discard(on_change)
+            self._prune(prefixes)
 
         return carb.Subscription(unsub_fn)
 
+    def _prune(self, prefixes):
+        # remove the nodes left without subscribers, starting from the deepest one
+        nodes = [self._root]
+        for prefix in prefixes:
+            node = nodes[-1].children.get(prefix, None)
+            if node is None:
+                return
+            nodes.append(node)
+        for i in range(len(prefixes), 0, -1):
+            if not nodes[i].is_empty():
+                return
+            del nodes[i - 1].children[prefixes[i - 1]]
+
     def on_changes(self, paths):
+        self._received_count += len(paths)
         self._dispatch_set.update(paths)
 
-    def pump(self):
-        for path in self._dispatch_set:
-            self._dispatch_changed(path)
-        self._dispatch_set.clear()
+    def take_changes(self) -> typing.Tuple[typing.Set[Sdf.Path], int]:
+        """Returns the paths changed since the last call and the number of paths received, including duplicates."""
+        paths, self._dispatch_set = self._dispatch_set, set()
+        received_count, self._received_count = self._received_count, 0
+        return paths, received_count
 
-    def _send_callbacks(self, cb_path, changed_path):
-        if cb_path in self._path_to_callbacks:
-            cb = self._path_to_callbacks[cb_path]
-            for f in cb:
-                f(changed_path)
+    def dispatch(self, paths, deadline: float = None) -> int:
+        """Dispatch **paths** in order, until the **deadline** (as returned by ``time.perf_counter()``) is reached.
 
-    def _dispatch_changed(self, path):
-        # Send callback for property path. Notify the property path subscription.
-        self._send_callbacks(cb_path=path, changed_path=path)
+        At least one path is dispatched. Returns the number of paths dispatched.
+        """
+        # the walks from the root to the prims are shared by the changed properties of the same prim
+        prim_walks = {}
+        count = 0
+        for path in paths:
+            self._dispatch_changed(path, prim_walks)
+            count += 1
+            if deadline is not None and perf_counter() >= deadline:
+                break
+        return count
 
+    def pump(self):
+        # paths changed by the callbacks are dispatched by the next pump
+        self.dispatch(self.take_changes()[0])
+
+    @staticmethod
+    def _walk(node, prefixes):
+        # returns the node of the last prefix (None if nothing is subscribed in its subtree) and the subtree callbacks
+        # of the nodes along the way, excluding the starting node
+        callbacks = []
+        for prefix in prefixes:
+            node = node.children.get(prefix, None)
+            if node is None:
+                break
+            callbacks.extend(node.subtree_callbacks)
+        return node, callbacks
+
+    def _dispatch_changed(self, path, prim_walks):
         prim_path = path.GetPrimPath()
-        if prim_path != path:
-            # Send callback for property's prim path. Notify the prim path subscription for any property change.
-            # Still pass 'path' not 'prim_path' as changed_path here
-            self._send_callbacks(cb_path=prim_path, changed_path=path)
+        walk = prim_walks.get(prim_path, None)
+        if walk is None:
+            node, callbacks = self._walk(self._root, _get_prefixes(prim_path))
+            walk = prim_walks[prim_path] = (node, list(self._root.subtree_callbacks) + callbacks)
 
+        node, callbacks = walk
+        callbacks = list(callbacks)
+        if node is not None and prim_path != path:
+            # Notify the prim path subscription for any property change, still passing the property path
+            callbacks.extend(node.callbacks)
+            node, property_callbacks = self._walk(node, path.GetPrefixes()[prim_path.pathElementCount :])
+            callbacks.extend(property_callbacks)
+
+        if node is not None:
+            callbacks.extend(node.callbacks)
+            if self._notify_descendants:
+                self._collect_descendant_callbacks(node, callbacks)
+
+        for f in callbacks:
+            f(path)
+
+    @staticmethod
+    def _collect_descendant_callbacks(node, callbacks):
+        stack = list(node.children.values())
+        while stack:
+            node = stack.pop()
+            callbacks.extend(node.callbacks)
+            callbacks.extend(node.subtree_callbacks)
+            stack.extend(node.children.values())
+
+
+def _coalesce_changes(resynced, changed_info):
+    """Drop the resynced paths whose changes are covered by a resync of one of their ancestors.
+
+    Resyncs are dispatched to the subscribers of the descendants of the resynced paths, so only the outermost resynced
+    paths are kept. Info only changes go to other subscribers, so they are kept even under resynced paths.
+    """
+    if resynced:
+        resynced = Sdf.Path.RemoveDescendentPaths(list(resynced))
+    return resynced, list(changed_info)
+
+
+class _NoticeQueue:
+    """Path arrays of ObjectsChanged notices, queued by the notice callback and drained once per update.
+
+    Queuing only keeps the arrays returned by the notice, converting and deduplicating the paths is left to whoever
+    drains the queue, so that authoring USD doesn't pay for it. Appending to and popping from a deque are atomic, so
+    notices sent from other threads are handed over without locking.
+    """
 
-class UsdWatcher:
     def __init__(self):
+        self._notices = deque()
+
+    def __bool__(self):
+        return bool(self._notices)
+
+    def append(self, notice):
+        self._notices.append((notice.GetResyncedPaths(), notice.GetChangedInfoOnlyPaths()))
+
+    def drain(self) -> typing.Tuple[typing.List[typing.List[Sdf.Path]], typing.List[typing.List[Sdf.Path]]]:
+        """Returns the resynced and the changed info only path arrays of the notices queued since the last call."""
+        resynced = []
+        changed_info = []
+        # notices may be appended while draining, pop them one at a time
+        while self._notices:
+            notice_resynced, notice_changed_info = self._notices.popleft()
+            resynced.append(notice_resynced)
+            changed_info.append(notice_changed_info)
+        return resynced, changed_info
+
+    def clear(self):
+        self._notices.clear()
+
+
+class UsdWatcher:
+    """Dispatches the changes of USD objects of one stage to subscribers once per update.
+
+    The watcher of a UsdContext follows the stage opened in it: it listens to the notices of that stage only, from
+    when it is opened until it is closed. Subscriptions are kept across stages. A watcher created for a **stage**
+    (e.g. an in-memory stage of a background job) listens to that stage only until it is destroyed.
+
+    Changes received in the same update are coalesced: a resync covers the resyncs of all the descendants of the
+    resynced path, so they are not dispatched separately. Info only changes are dispatched to their own subscribers
+    even under a resynced path.
+
+    The time spent dispatching changes in one update can be limited with the "/exts/omni.usd/watcherFrameBudget"
+    setting or :meth:`set_frame_budget`. Resyncs are dispatched before info only changes, and the changes which could
+    not be dispatched within the budget are carried over to the next update. Call :meth:`get_stats` to see how many
+    paths were received, dispatched and left over during the last update.
+    """
+
+    def __init__(self, usd_context_name: str = "", stage: Usd.Stage = None):
+        self._update_sub = None
+        self._objects_changed = None
+        self._stage_event_sub = None
+        self._change_info_only_dispatcher = EventDispatcher()
+        # a resync of a prim invalidates all of its descendants
+        self._resync_dispatcher = EventDispatcher(notify_descendants=True)
+        self._stats = _EMPTY_STATS
+        self._usd_context = None
+        self._usd_context_name = usd_context_name
+        self._notices = _NoticeQueue()
+        # coalesced changes left over by the previous updates, in the order they will be dispatched
+        self._resynced_backlog = []
+        self._changed_info_backlog = []
+        self._frame_budget = carb.settings.get_settings().get("/exts/omni.usd/watcherFrameBudget") or 0
+
+        if stage:
+            self._watch_stage(stage)
+            return
+
+        if not self._bind():
+            carb.log_warn(f"Can't watch UsdContext '{usd_context_name}', it doesn't exist yet.")
+
+    def _bind(self) -> bool:
+        """Follow the current UsdContext named **usd_context_name**, which may have been recreated since the last
+        call. Returns False if it doesn't exist.
+        """
+        usd_context = omni.usd.get_context(self._usd_context_name)
+        if not usd_context and not self._usd_context:
+            return False
+        # a UsdContext created again at the same address has the same Python object, but it doesn't send the stage
+        # events of its stage to the previous subscription
+        watching = self._objects_changed is not None
+        if usd_context is self._usd_context and watching == bool(usd_context.get_stage()):
+            return True
+        self._stage_event_sub = None
+        self._usd_context = usd_context
+        self._unwatch_stage()
+        if not usd_context:
+            return False
+        self._stage_event_sub = usd_context.get_stage_event_stream().create_subscription_to_pop(
+            self._on_stage_event, name=f"[ext: omni.usd] UsdWatcher '{self._usd_context_name}'"
+        )
+        stage = usd_context.get_stage()
+        if stage:
+            self._watch_stage(stage)
+        return True
+
+    def destroy(self):
+        self._stage_event_sub = None
+        self._usd_context = None
+        self._unwatch_stage()
+
+    def _watch_stage(self, stage):
+        self._unwatch_stage()
+        self._objects_changed = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_prim_change, stage)
         self._update_sub = (
             omni.kit.app.get_app_interface()
             .get_update_event_stream()
             .create_subscription_to_pop(lambda evt: self._pump(), name="[ext: omni.usd] UsdWatcher")
         )
-        self._change_info_only_dispatcher = EventDispatcher()
-        self._resync_dispatcher = EventDispatcher()
-        self._objects_changed = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_prim_change, None)
 
-    def destroy(self):
+    def _unwatch_stage(self):
+        if self._objects_changed:
+            self._objects_changed.Revoke()
+        self._objects_changed = None
         self._update_sub = None
+        # changes of the previous stage are not meaningful anymore
+        self._notices.clear()
+        for dispatcher in (self._resync_dispatcher, self._change_info_only_dispatcher):
+            dispatcher.take_changes()
+        self._resynced_backlog = []
+        self._changed_info_backlog = []
+
+    def _on_stage_event(self, event: carb.events.IEvent):
+        if event.type == int(omni.usd.StageEventType.OPENED):
+            stage = self._usd_context.get_stage()
+            if stage:
+                self._watch_stage(stage)
+        elif event.type == int(omni.usd.StageEventType.CLOSING):
+            self._unwatch_stage()
 
     @Trace.TraceFunction
     def _on_prim_change(self, notice, stage):
-        self._get_dispatcher(EventType.RESYNC).on_changes(notice.GetResyncedPaths())
-        self._get_dispatcher(EventType.CHANGE_INFO_ONLY).on_changes(notice.GetChangedInfoOnlyPaths())
+        # called for every change authored on the stage, everything else is done once per update by _pump()
+        self._notices.append(notice)
+
+    def subscribe_to_resync_path(self, path, on_change: typing.Callable, subtree: bool = False) -> carb.Subscription:
+        """Subscribe to resyncs of **path**, of its ancestors, and of its descendants if **subtree** is True.
+
+        **on_change** is called with the resynced path.
+        """
+        return self._get_dispatcher(EventType.RESYNC).subscribe_on_change(path, on_change, subtree)
+
+    def subscribe_to_change_info_path(
+        self, path, on_change: typing.Callable, subtree: bool = False
+    ) -> carb.Subscription:
+        """Subscribe to info only changes of **path**, of its properties if it is a prim path, and of its
+        descendants if **subtree** is True.
+
+        **on_change** is called with the changed path.
+        """
+        return self._get_dispatcher(EventType.CHANGE_INFO_ONLY).subscribe_on_change(path, on_change, subtree)
 
-    def subscribe_to_resync_path(self, path, on_change: typing.Callable) -> carb.Subscription:
-        return self._get_dispatcher(EventType.RESYNC).subscribe_on_change(path, on_change)
+    def get_stats(self) -> UsdWatcherStats:
+        """Returns the number of paths received, dispatched and left over during the last update."""
+        return self._stats
 
-    def subscribe_to_change_info_path(self, path, on_change: typing.Callable) -> carb.Subscription:
-        return self._get_dispatcher(EventType.CHANGE_INFO_ONLY).subscribe_on_change(path, on_change)
+    def set_frame_budget(self, budget: float):
+        """Set the maximum time in seconds spent dispatching changes per update. 0 for unlimited.
+
+        At least one change is dispatched per update, and the time spent in one callback can't be interrupted.
+        """
+        self._frame_budget = max(budget or 0, 0)
+
+    def get_frame_budget(self) -> float:
+        return self._frame_budget
 
     def _pump(self):
-        for t in EventType:
-            self._get_dispatcher(t).pump()
+        resynced_arrays, changed_info_arrays = self._notices.drain()
+        for paths in resynced_arrays:
+            self._resync_dispatcher.on_changes(paths)
+        for paths in changed_info_arrays:
+            self._change_info_only_dispatcher.on_changes(paths)
+
+        resynced, resynced_received = self._resync_dispatcher.take_changes()
+        changed_info, changed_info_received = self._change_info_only_dispatcher.take_changes()
+        if resynced_received or changed_info_received:
+            if self._resynced_backlog or self._changed_info_backlog:
+                resynced.update(self._resynced_backlog)
+                changed_info.update(self._changed_info_backlog)
+            resynced, changed_info = _coalesce_changes(resynced, changed_info)
+            self._resynced_backlog = list(resynced)
+            self._changed_info_backlog = list(changed_info)
+        elif not self._resynced_backlog and not self._changed_info_backlog:
+            self._stats = _EMPTY_STATS
+            return
+
+        start = perf_counter()
+        deadline = start + self._frame_budget if self._frame_budget > 0 else None
+
+        # resyncs first, paths changed by the callbacks are dispatched on the next update
+        resynced_dispatched = self._resync_dispatcher.dispatch(self._resynced_backlog, deadline)
+        del self._resynced_backlog[:resynced_dispatched]
+        changed_info_dispatched = 0
+        # the deadline only holds the info-only changes back if resyncs used the budget, or they would never progress
+        if not self._resynced_backlog and (deadline is None or not resynced_dispatched or perf_counter() < deadline):
+            changed_info_dispatched = self._change_info_only_dispatcher.dispatch(self._changed_info_backlog, deadline)
+            del self._changed_info_backlog[:changed_info_dispatched]
+
+        self._stats = UsdWatcherStats(
+            resynced_received,
+            resynced_dispatched,
+            len(self._resynced_backlog),
+            changed_info_received,
+            changed_info_dispatched,
+            len(self._changed_info_backlog),
+            perf_counter() - start,
+        )
 
     def _get_dispatcher(self, event_type: EventType):
         if event_type == EventType.RESYNC:
@@ -89,7 +411,28 @@ class UsdWatcher:
             return self._change_info_only_dispatcher
 
 
-# USD Prim Watcher singleton getter
-@lru_cache()
-def get_watcher():
-    return UsdWatcher()
+_watchers: typing.Dict[str, UsdWatcher] = {}
+
+
+def get_watcher(usd_context_name: str = "") -> UsdWatcher:
+    """Returns the watcher of the stage of the UsdContext **usd_context_name**, created on first use.
+
+    Only the changes of the stage opened in that UsdContext are dispatched, not the changes of every stage as before
+    omni.usd 1.7.0. If the UsdContext was destroyed and created again, the watcher follows the new one and keeps its
+    subscriptions. If it doesn't exist yet, the returned watcher is not kept and the next call tries again.
+    """
+    watcher = _watchers.get(usd_context_name, None)
+    if watcher is not None:
+        watcher._bind()
+        return watcher
+    watcher = UsdWatcher(usd_context_name)
+    if watcher._usd_context:
+        _watchers[usd_context_name] = watcher
+    return watcher
+
+
+def _destroy_watchers():
+    """Destroy all the watchers created by :func:`get_watcher`."""
+    for watcher in _watchers.values():
+        watcher.destroy()
+    _watchers.clear()
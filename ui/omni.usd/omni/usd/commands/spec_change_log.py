@@ -0,0 +1,262 @@
+"""
+* Copyright (c) 2021, NVIDIA CORPORATION.  All rights reserved.
+*
+* NVIDIA CORPORATION and its licensors retain all intellectual property
+* and proprietary rights in and to this software, related documentation
+* and any modifications thereto.  Any use, reproduction, disclosure or
+* distribution of this software and related documentation without an express
+* license agreement from NVIDIA CORPORATION is strictly prohibited.
+"""
+__all__ = ["SpecChangeLog", "estimate_layer_footprint"]
+
+from collections import namedtuple
+from typing import Any, List, Union
+
+import carb
+from pxr import Sdf
+
+_ESTIMATED_SPEC_FOOTPRINT = 512
+_ESTIMATED_CHANGE_FOOTPRINT = 128
+
+_SET_INFO = 0
+_CREATE_PRIM = 1
+_REMOVE_PRIM = 2
+
+# kind: One of the change kinds above.
+# layer_identifier: Identifier of the changed layer, layer handles are not kept to avoid holding layers.
+# path: Path of the changed spec. For created prims, path of the first prim spec which didn't exist.
+# data: Kind specific data:
+#   _SET_INFO: tuple(key, old value, new value), None value meaning that the field is not authored.
+#   _CREATE_PRIM: path of the created prim spec.
+#   _REMOVE_PRIM: tuple(path of the copy in the stash layer, index of the prim among its siblings).
+_Change = namedtuple("_Change", ["kind", "layer_identifier", "path", "data"])
+
+
+def estimate_layer_footprint(layer: Sdf.Layer) -> int:
+    """Estimates the memory (in bytes) used by a layer, from the number of specs in it."""
+
+    if not layer:
+        return 0
+
+    spec_count = 0
+
+    def count_spec(path):
+        nonlocal spec_count
+        spec_count += 1
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, count_spec)
+    return spec_count * _ESTIMATED_SPEC_FOOTPRINT
+
+
+def _find_layer(change: _Change) -> Sdf.Layer:
+    layer = Sdf.Find(change.layer_identifier)
+    if not layer:
+        carb.log_warn(f"Failed to replay changes to {change.path} as layer {change.layer_identifier} cannot be found.")
+    return layer
+
+
+def _set_info(spec: Sdf.Spec, key: str, value: Any):
+    if not spec:
+        return
+    if value is None:
+        spec.ClearInfo(key)
+    else:
+        spec.SetInfo(key, value)
+
+
+def _remove_prim_spec(layer: Sdf.Layer, path: Sdf.Path):
+    prim_spec = layer.GetPrimAtPath(path)
+    if not prim_spec:
+        return
+
+    name_parent = prim_spec.nameParent or layer.pseudoRoot
+    del name_parent.nameChildren[prim_spec.name]
+
+
+def _move_prim_spec_to_index(layer: Sdf.Layer, path: Sdf.Path, index: int):
+    """Moves the prim spec at **path** to **index** among its siblings.
+
+    Sdf.NamespaceEdit.Reorder() fails on the prim spec itself as source and destination overlap, so the prim spec is
+    moved to a free sibling name and back to its name at **index**. Namespace edits don't change the paths authored
+    in the moved specs.
+    """
+    name_parent = layer.GetPrimAtPath(path.GetParentPath()) or layer.pseudoRoot
+    names = list(name_parent.nameChildren.keys())
+    if names.index(path.name) == index:
+        return
+
+    temp_name = f"_{path.name}_restored"
+    while temp_name in names:
+        temp_name = f"_{temp_name}"
+    temp_path = path.GetParentPath().AppendChild(temp_name)
+
+    edit = Sdf.BatchNamespaceEdit()
+    edit.Add(path, temp_path)
+    edit.Add(temp_path, path, index)
+    if not layer.Apply(edit):
+        carb.log_warn(f"Failed to restore the position of {path} among its siblings in {layer.identifier}.")
+
+
+class SpecChangeLog:
+    """Records the changes a command makes to the specs of layers, so they can be undone and redone exactly.
+
+    Changes are made through the log, which keeps what's needed to revert each of them: the previous value of
+    changed fields, the prim specs which were created, and a copy of removed prim specs with their position among
+    their siblings. Only the changed specs are copied, into a single anonymous layer.
+
+    :meth:`undo` replays the log backwards and restores the layers to their exact previous state, including the
+    order of children. :meth:`redo` replays it forwards, which requires the layers to be in the state left by
+    :meth:`undo`, as guaranteed by the undo stack.
+    """
+
+    def __init__(self):
+        self._changes = []
+        self._stash_layer = None
+        self._undone = False
+
+    def __len__(self):
+        return len(self._changes)
+
+    @property
+    def undone(self) -> bool:
+        """True if the changes have been undone, and can be redone."""
+        return self._undone and bool(self._changes)
+
+    def clear(self):
+        """Forget all the recorded changes."""
+        self._changes.clear()
+        self._stash_layer = None
+        self._undone = False
+
+    def set_info(self, layer: Sdf.Layer, path: Union[str, Sdf.Path], key: str, value: Any):
+        """Set the field **key** of the spec at **path**, None clears it."""
+        path = Sdf.Path(path)
+        spec = layer.GetObjectAtPath(path)
+        if not spec:
+            carb.log_error(f"Failed to set {key} of {path} as it does not exist in {layer.identifier}.")
+            return
+
+        old_value = spec.GetInfo(key) if spec.HasInfo(key) else None
+        self._changes.append(_Change(_SET_INFO, layer.identifier, path, (key, old_value, value)))
+        _set_info(spec, key, value)
+
+    def create_prim_spec(self, layer: Sdf.Layer, path: Union[str, Sdf.Path]) -> Sdf.PrimSpec:
+        """Create a prim spec at **path**, and its missing ancestors, as Sdf.CreatePrimInLayer() does.
+
+        Returns:
+            The prim spec at **path**, which may have existed already.
+        """
+        path = Sdf.Path(path)
+        prim_spec = layer.GetPrimAtPath(path)
+        if prim_spec:
+            return prim_spec
+
+        # Undo removes the first missing prim spec, which removes the missing ancestors along with the prim spec
+        first_created_path = path
+        parent_path = path.GetParentPath()
+        while parent_path != Sdf.Path.absoluteRootPath and not layer.GetPrimAtPath(parent_path):
+            first_created_path = parent_path
+            parent_path = parent_path.GetParentPath()
+
+        self._changes.append(_Change(_CREATE_PRIM, layer.identifier, first_created_path, path))
+        return Sdf.CreatePrimInLayer(layer, path)
+
+    def remove_prim_spec(self, layer: Sdf.Layer, path: Union[str, Sdf.Path]) -> bool:
+        """Remove the prim spec at **path** and all its descendants.
+
+        Returns:
+            True if the prim spec existed and was removed.
+        """
+        path = Sdf.Path(path)
+        prim_spec = layer.GetPrimAtPath(path)
+        if not prim_spec:
+            return False
+
+        # Finding the position is linear in the number of siblings, as is removing the prim spec from them
+        name_parent = prim_spec.nameParent or layer.pseudoRoot
+        index = list(name_parent.nameChildren.keys()).index(prim_spec.name)
+        self._stash_and_remove_prim_spec(layer, name_parent, path, index)
+        return True
+
+    def remove_prim_specs(self, layer: Sdf.Layer, paths: List[Union[str, Sdf.Path]]) -> int:
+        """Remove the prim specs at **paths** and all their descendants, as :meth:`remove_prim_spec` does for each path.
+
+        The positions of the prim specs among their siblings are looked up once per parent, so removing many children
+        of the same parent is not quadratic. **paths** should not contain descendants of each other, see
+        Sdf.Path.RemoveDescendentPaths().
+
+        Returns:
+            The number of removed prim specs.
+        """
+        paths_per_parent = {}
+        for path in paths:
+            path = Sdf.Path(path)
+            if layer.GetPrimAtPath(path):
+                paths_per_parent.setdefault(path.GetParentPath(), {})[path.name] = path
+
+        removed_count = 0
+        for parent_path, child_paths in paths_per_parent.items():
+            name_parent = layer.GetPrimAtPath(parent_path) or layer.pseudoRoot
+            indices = {name: index for index, name in enumerate(name_parent.nameChildren.keys())}
+            # Remove in the order of the siblings, each removal shifts the position of the next ones by one
+            for shift, name in enumerate(sorted(child_paths, key=indices.get)):
+                self._stash_and_remove_prim_spec(layer, name_parent, child_paths[name], indices[name] - shift)
+            removed_count += len(child_paths)
+
+        return removed_count
+
+    def _stash_and_remove_prim_spec(self, layer: Sdf.Layer, name_parent: Sdf.PrimSpec, path: Sdf.Path, index: int):
+        if not self._stash_layer:
+            self._stash_layer = Sdf.Layer.CreateAnonymous()
+        stash_path = Sdf.Path.absoluteRootPath.AppendChild(f"_removed_{len(self._changes)}")
+        Sdf.CreatePrimInLayer(self._stash_layer, stash_path)
+        Sdf.CopySpec(layer, path, self._stash_layer, stash_path)
+
+        self._changes.append(_Change(_REMOVE_PRIM, layer.identifier, path, (stash_path, index)))
+        del name_parent.nameChildren[path.name]
+
+    def undo(self):
+        """Revert all the recorded changes, in reverse order."""
+        with Sdf.ChangeBlock():
+            for change in reversed(self._changes):
+                layer = _find_layer(change)
+                if not layer:
+                    continue
+
+                if change.kind == _SET_INFO:
+                    key, old_value, _ = change.data
+                    _set_info(layer.GetObjectAtPath(change.path), key, old_value)
+                elif change.kind == _CREATE_PRIM:
+                    _remove_prim_spec(layer, change.path)
+                elif change.kind == _REMOVE_PRIM:
+                    stash_path, index = change.data
+                    # Copied to its own path, so the paths in the prim spec are remapped back from the stash
+                    Sdf.CreatePrimInLayer(layer, change.path)
+                    Sdf.CopySpec(self._stash_layer, stash_path, layer, change.path)
+                    # The restored prim spec is the last of its siblings, move it back to where it was
+                    _move_prim_spec_to_index(layer, change.path, index)
+
+        self._undone = True
+
+    def redo(self):
+        """Apply again all the recorded changes after they have been undone."""
+        with Sdf.ChangeBlock():
+            for change in self._changes:
+                layer = _find_layer(change)
+                if not layer:
+                    continue
+
+                if change.kind == _SET_INFO:
+                    key, _, value = change.data
+                    _set_info(layer.GetObjectAtPath(change.path), key, value)
+                elif change.kind == _CREATE_PRIM:
+                    Sdf.CreatePrimInLayer(layer, change.data)
+                elif change.kind == _REMOVE_PRIM:
+                    _remove_prim_spec(layer, change.path)
+
+        self._undone = False
+
+    def get_memory_footprint(self) -> int:
+        """Returns an estimate of the memory (in bytes) used by the log."""
+        return len(self._changes) * _ESTIMATED_CHANGE_FOOTPRINT + estimate_layer_footprint(self._stash_layer)
+
@@ -11,6 +11,7 @@
 import math
 import os
 import weakref
+from collections import namedtuple
 from enum import Enum, auto
 from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
@@ -25,6 +26,7 @@ import omni.client.utils as clientutils
 
 from pxr import AudioSchema, Gf, Kind, Sdf, Trace, Usd, UsdGeom, UsdLux, UsdShade
 
+from .spec_change_log import SpecChangeLog, estimate_layer_footprint
 from .stage_helper import UsdStageHelper
 
 
@@ -627,21 +629,42 @@ class CopyPrimsCommand(omni.kit.commands.Command):
         self._flatten_references = flatten_references
         self._copy_to_introducing_layer = copy_to_introducing_layer
 
-    def do(self):
-        self._previously_selected_paths = self._selection.get_selected_prim_paths()
-        self._selection.clear_selected_prim_paths()
+    def _get_copy_kwargs_list(self):
+        kwargs_list = []
         for i in range(len(self._paths_from)):
             path_to = self._paths_to[i] if (self._paths_to is not None and i < len(self._paths_to)) else None
-            omni.kit.commands.execute(
-                "CopyPrim",
-                path_from=self._paths_from[i],
-                path_to=path_to,
-                duplicate_layers=self._duplicate_layers,
-                combine_layers=self._combine_layers,
-                exclusive_select=False,
-                flatten_references=self._flatten_references,
-                copy_to_introducing_layer=self._copy_to_introducing_layer,
+            kwargs_list.append(
+                dict(
+                    path_from=self._paths_from[i],
+                    path_to=path_to,
+                    duplicate_layers=self._duplicate_layers,
+                    combine_layers=self._combine_layers,
+                    exclusive_select=False,
+                    flatten_references=self._flatten_references,
+                    copy_to_introducing_layer=self._copy_to_introducing_layer,
+                )
             )
+        return kwargs_list
+
+    def do(self):
+        self._previously_selected_paths = self._selection.get_selected_prim_paths()
+        self._selection.clear_selected_prim_paths()
+        # the batch is undone as a whole if any of the copies fails, fail with it
+        success, _ = omni.kit.commands.execute_batch("CopyPrim", self._get_copy_kwargs_list())
+        if not success:
+            raise Exception(f"failed to copy prims {self._paths_from}")
+
+    async def do_async(self):
+        import omni.kit.app
+
+        # copy one prim per frame, copies with flattened references can take a long time each
+        self._previously_selected_paths = self._selection.get_selected_prim_paths()
+        self._selection.clear_selected_prim_paths()
+        for kwargs in self._get_copy_kwargs_list():
+            success, _ = omni.kit.commands.execute("CopyPrim", **kwargs)
+            if not success:
+                raise Exception(f"failed to copy prim {kwargs['path_from']}")
+            await omni.kit.app.get_app().next_update_async()
 
     def undo(self):
         if self._previously_selected_paths:
@@ -861,10 +884,9 @@ class DeletePrimsCommand(omni.kit.commands.Command, UsdStageHelper):
 
         self._paths = Sdf.Path.RemoveDescendentPaths(self._paths)
         self._prev_selected_paths = list(self._selection.get_selected_prim_paths())
-        self._temp_layers = {}
         self._default_prim_path = None
-        self._active_state_changed_paths = {}
-        self._changed_layer_identifier = None
+        # Changes to prim specs, which are replayed to undo and redo the delete
+        self._change_log = SpecChangeLog()
 
     def _is_auto_authoring_layer(self, layer_identifier):
         try:
@@ -874,14 +896,14 @@ class DeletePrimsCommand(omni.kit.commands.Command, UsdStageHelper):
         except Exception:
             return False
 
-    def _has_overridden_in_stronger_layer(self, stage, prim_path):
-        edit_target = stage.GetEditTarget()
-        edit_layer = edit_target.GetLayer()
-        layer_stack = stage.GetLayerStack()
-        for layer in layer_stack:
+    def _get_stronger_layers(self, layer_stack, edit_layer):
+        for i, layer in enumerate(layer_stack):
             if layer == edit_layer:
-                break
+                return layer_stack[:i]
+        return layer_stack
 
+    def _is_activated_in_layers(self, layers, prim_path):
+        for layer in layers:
             prim_spec = layer.GetPrimAtPath(prim_path)
             if not prim_spec:
                 continue
@@ -892,33 +914,40 @@ class DeletePrimsCommand(omni.kit.commands.Command, UsdStageHelper):
 
         return False
 
-    def _remove_prim_spec_in_auto_authoring_layer(self, stage, path):
-        layer_stack = stage.GetLayerStack()
-        for layer in layer_stack:
-            if self._is_auto_authoring_layer(layer.identifier):
-                remove_prim_spec(layer, path)
-                break
+    def _split_removable_paths(self, stage, layer_stack, current_layer):
+        """Splits the paths into the ones which can be removed without destruction and the ones to deactivate.
+
+        Same as calling prim_can_be_removed_without_destruction() for each path, with the layers to check computed once.
+        """
+        removable_paths = []
+        deactivated_paths = []
+        other_layers = [layer for layer in layer_stack if layer != current_layer and not layer.anonymous]
+        for path in self._paths:
+            usd_prim = stage.GetPrimAtPath(path)
+            if not usd_prim:
+                continue
+
+            # If it's under reference, it cannot be removed.
+            if omni.usd.check_ancestral(usd_prim) or any(layer.GetPrimAtPath(path) for layer in other_layers):
+                deactivated_paths.append(path)
+            else:
+                removable_paths.append(path)
+
+        return removable_paths, deactivated_paths
 
     @Trace.TraceFunction
     def _remove_prim_specs(self, stage, paths):
-        temp_layers = {}
+        if not paths:
+            return
+
         layer_stack = stage.GetLayerStack()
         for layer in layer_stack:
-            temp_layer = Sdf.Layer.CreateAnonymous()
-            edit = Sdf.BatchNamespaceEdit()
-            for path in paths:
-                prim_spec = layer.GetPrimAtPath(path)
-                if prim_spec is None:
-                    continue
-
-                Sdf.CreatePrimInLayer(temp_layer, path)
-                Sdf.CopySpec(layer, path, temp_layer, path)
-                edit.Add(path, Sdf.Path.emptyPath)
-
-            if layer.Apply(edit) and not self._is_auto_authoring_layer(layer.identifier):
-                temp_layers[layer.identifier] = temp_layer
-
-        return temp_layers
+            # Auto-authoring layer is not restored on undo
+            if self._is_auto_authoring_layer(layer.identifier):
+                for path in paths:
+                    remove_prim_spec(layer, path)
+            else:
+                self._change_log.remove_prim_specs(layer, paths)
 
     def _has_prim_specs(self, stage, path):
         for layer in stage.GetLayerStack():
@@ -929,11 +958,6 @@ class DeletePrimsCommand(omni.kit.commands.Command, UsdStageHelper):
         return False
 
     def do(self):
-        self._changed_layer_identifier = None
-        self._active_state_changed_paths.clear()
-        self._default_prim_path = None
-        self._temp_layers.clear()
-
         stage = self._get_stage()
         clear_default_prim = False
         self._default_prim_path = stage.GetDefaultPrim().GetPath() if stage.HasDefaultPrim() else None
@@ -942,111 +966,88 @@ class DeletePrimsCommand(omni.kit.commands.Command, UsdStageHelper):
         else:
             clear_default_prim = False
 
-        with Sdf.ChangeBlock():
-            to_be_removed_paths = []
-            to_be_deactivated_paths = []
-            if self._destructive:
-                to_be_removed_paths = self._paths
-            else:
-                for path in self._paths:
-                    usd_prim = stage.GetPrimAtPath(path)
-                    if not usd_prim:
-                        continue
-
-                    if prim_can_be_removed_without_destruction(self._usd_context, path):
-                        to_be_removed_paths.append(path)
-                    else:
-                        to_be_deactivated_paths.append(path)
-
-            self._temp_layers = self._remove_prim_specs(stage, to_be_removed_paths)
-            if to_be_deactivated_paths:
-                # Working with current edit target, or default layer in auto_authoring mode.
-                with active_edit_context(self._usd_context):
-                    edit_target = stage.GetEditTarget()
-                    current_layer = edit_target.GetLayer()
-                    self._changed_layer_identifier = current_layer.identifier
-
-                    temp_layer = self._temp_layers.get(current_layer.identifier, None)
-                    if not temp_layer:
-                        temp_layer = Sdf.Layer.CreateAnonymous()
-                        self._temp_layers[current_layer.identifier] = temp_layer
-
-                    for path in to_be_deactivated_paths:
-                        # Removing auto-authoring copy always
-                        self._remove_prim_spec_in_auto_authoring_layer(stage, path)
-
-                        if self._has_overridden_in_stronger_layer(stage, path):
-                            error = f"Failed to deactivate prim {path} because it is activated in a stronger layer."
-                            carb.log_warn(error)
-                            post_notification(error)
-                            continue
-
-                        created = False
-                        prim_spec = current_layer.GetPrimAtPath(path)
-                        # If it's def, removing it in current layer to save file size.
-                        if prim_spec and prim_spec.specifier == Sdf.SpecifierDef:
-                            Sdf.CreatePrimInLayer(temp_layer, path)
-                            Sdf.CopySpec(current_layer, path, temp_layer, path)
-                            remove_prim_spec(current_layer, path)
-                            # Creates prim spec to set active meta as it has deltas in other layers.
-                            prim_spec = Sdf.CreatePrimInLayer(current_layer, path)
-                        else:
-                            # Otherwise, we only deactivate it.
-                            if not prim_spec:
-                                prim_spec = Sdf.CreatePrimInLayer(current_layer, path)
-                                # Record this so we can remove it in undo.
-                                created = True
-
-                        if prim_spec.HasActive():
-                            if prim_spec.active != False:
-                                self._active_state_changed_paths[path] = (prim_spec.active, created)
-                        else:
-                            self._active_state_changed_paths[path] = (None, created)
-                        prim_spec.active = False
+        if self._change_log.undone:
+            # Redo: the layers are back to the state they were in before the delete, replay the same changes.
+            self._change_log.redo()
+        else:
+            self._change_log.clear()
+            self._delete(stage)
 
         if clear_default_prim:
             self._default_prim_path = stage.GetDefaultPrim().GetPath()
             stage.ClearDefaultPrim()
 
-    def undo(self):
+    @Trace.TraceFunction
+    def _delete(self, stage):
+        # The paths are planned in bulk: the layers to check, the auto-authoring layer and the layers stronger than the
+        # edit target are looked up once for all the paths, and prim specs are removed from each layer in one go.
+        if self._destructive:
+            with Sdf.ChangeBlock():
+                self._remove_prim_specs(stage, self._paths)
+            return
+
         with Sdf.ChangeBlock():
-            for identifier, restore_from in self._temp_layers.items():
-                restore_to = Sdf.Find(identifier)
-                if not restore_to:
-                    carb.log_warn(f"Failed to restore removed prims as target layer {identifier} cannot be found.")
-                    continue
+            # Working with current edit target, or default layer in auto_authoring mode.
+            with active_edit_context(self._usd_context):
+                edit_target = stage.GetEditTarget()
+                current_layer = edit_target.GetLayer()
+                layer_stack = stage.GetLayerStack()
 
-                for path in self._paths:
-                    if restore_from.GetPrimAtPath(path):
-                        Sdf.CreatePrimInLayer(restore_to, path)
-                        Sdf.CopySpec(restore_from, path, restore_to, path)
+                to_be_removed_paths, to_be_deactivated_paths = self._split_removable_paths(
+                    stage, layer_stack, current_layer
+                )
+                auto_authoring_layer = None
+                for layer in layer_stack:
+                    if self._is_auto_authoring_layer(layer.identifier):
+                        auto_authoring_layer = layer
+                        break
+                stronger_layers = self._get_stronger_layers(layer_stack, current_layer)
+
+                self._remove_prim_specs(stage, to_be_removed_paths)
+
+                overridden_paths = set()
+                removed_def_paths = []
+                for path in to_be_deactivated_paths:
+                    # Removing auto-authoring copy always
+                    if auto_authoring_layer:
+                        remove_prim_spec(auto_authoring_layer, path)
+
+                    if self._is_activated_in_layers(stronger_layers, path):
+                        overridden_paths.add(path)
+                        continue
 
-            for path, value in self._active_state_changed_paths.items():
-                restore_to = Sdf.Find(self._changed_layer_identifier)
-                if not restore_to:
-                    carb.log_warn(
-                        f"Failed to restore removed prims as target layer {self._changed_layer_identifier} cannot be found."
-                    )
-                    continue
+                    prim_spec = current_layer.GetPrimAtPath(path)
+                    # If it's def, removing it in current layer to save file size.
+                    if prim_spec and prim_spec.specifier == Sdf.SpecifierDef:
+                        removed_def_paths.append(path)
+                self._change_log.remove_prim_specs(current_layer, removed_def_paths)
 
-                prim_spec = restore_to.GetPrimAtPath(path)
-                if not prim_spec:
-                    carb.log_warn(
-                        f"Failed to restore removed prim {path} to {self._changed_layer_identifier} as it cannot be found."
-                    )
-                    continue
+                for path in to_be_deactivated_paths:
+                    if path in overridden_paths:
+                        continue
 
-                active, created = value
-                if created:
-                    parent_spec = prim_spec.realNameParent
-                    if prim_spec.name in parent_spec.nameChildren:
-                        del parent_spec.nameChildren[prim_spec.name]
-                    continue
+                    # Creates prim spec to set active meta as it has deltas in other layers,
+                    # otherwise, we only deactivate it.
+                    prim_spec = self._change_log.create_prim_spec(current_layer, path)
+                    if not prim_spec.HasActive() or prim_spec.active != False:
+                        self._change_log.set_info(current_layer, path, "active", False)
+
+        # A single notification for all the prims which failed
+        error = None
+        for path in to_be_deactivated_paths:
+            if path in overridden_paths:
+                error = f"Failed to deactivate prim {path} because it is activated in a stronger layer."
+                carb.log_warn(error)
+        if len(overridden_paths) > 1:
+            error = f"Failed to deactivate {len(overridden_paths)} prims because they are activated in a stronger layer."
+        if error:
+            post_notification(error)
+
+    def get_memory_footprint(self) -> int:
+        return self._change_log.get_memory_footprint()
 
-                if active is None or active == True:
-                    prim_spec.ClearActive()
-                else:
-                    prim_spec.active = active
+    def undo(self):
+        self._change_log.undo()
 
         stage = self._get_stage()
         if self._default_prim_path:
@@ -1477,6 +1478,418 @@ class SetMaterialStrengthCommand(omni.kit.commands.Command):
         self._set_strength(self._rel, self._prev_strength)
 
 
+_AXES = [Gf.Vec3d.XAxis(), Gf.Vec3d.YAxis(), Gf.Vec3d.ZAxis()]
+
+_ROTATE_AXIS_TYPES = [UsdGeom.XformOp.TypeRotateX, UsdGeom.XformOp.TypeRotateY, UsdGeom.XformOp.TypeRotateZ]
+
+_ROTATE_THREE_AXIS_TYPES = [
+    UsdGeom.XformOp.TypeRotateXYZ,
+    UsdGeom.XformOp.TypeRotateXZY,
+    UsdGeom.XformOp.TypeRotateYXZ,
+    UsdGeom.XformOp.TypeRotateYZX,
+    UsdGeom.XformOp.TypeRotateZXY,
+    UsdGeom.XformOp.TypeRotateZYX,
+]
+
+_ROTATION_ORDER_TO_TYPE = {
+    Gf.Vec3i(0, 1, 2): UsdGeom.XformOp.TypeRotateXYZ,
+    Gf.Vec3i(0, 2, 1): UsdGeom.XformOp.TypeRotateXZY,
+    Gf.Vec3i(1, 0, 2): UsdGeom.XformOp.TypeRotateYXZ,
+    Gf.Vec3i(1, 2, 0): UsdGeom.XformOp.TypeRotateYZX,
+    Gf.Vec3i(2, 0, 1): UsdGeom.XformOp.TypeRotateZXY,
+    Gf.Vec3i(2, 1, 0): UsdGeom.XformOp.TypeRotateZYX,
+}
+
+# Axes to decompose a rotation matrix on, and indices of the decomposed angles in the xformOp value, per rotation type.
+_ROTATE_DECOMPOSITION = {
+    UsdGeom.XformOp.TypeRotateXYZ: ((_AXES[2], _AXES[1], _AXES[0]), (2, 1, 0)),
+    UsdGeom.XformOp.TypeRotateXZY: ((_AXES[1], _AXES[2], _AXES[0]), (2, 0, 1)),
+    UsdGeom.XformOp.TypeRotateYXZ: ((_AXES[2], _AXES[0], _AXES[1]), (1, 2, 0)),
+    UsdGeom.XformOp.TypeRotateYZX: ((_AXES[0], _AXES[2], _AXES[1]), (0, 2, 1)),
+    UsdGeom.XformOp.TypeRotateZXY: ((_AXES[1], _AXES[0], _AXES[2]), (1, 0, 2)),
+    UsdGeom.XformOp.TypeRotateZYX: ((_AXES[0], _AXES[1], _AXES[2]), (0, 1, 2)),
+}
+
+# xformOps to author the transform of a prim to, see _resolve_xform_ops().
+# transform_op: Transform xformOp of the prim. When set, it is the only xformOp authored.
+# translate_op, rotate_ops, scale_op: xformOps of each component, there are 3 rotate_ops for single axis rotations.
+# xform_op_order: xformOpOrder to author, None to keep the current one.
+_TransformXformOps = namedtuple(
+    "_TransformXformOps", ["xformable", "transform_op", "translate_op", "rotate_ops", "scale_op", "xform_op_order"]
+)
+
+
+def _xform_op_is_time_sampled(xform_op: UsdGeom.XformOp):
+    return xform_op.GetNumTimeSamples() > 0
+
+
+def _has_time_sample(xform_op: UsdGeom.XformOp, time_code: Usd.TimeCode):
+    if time_code.IsDefault():
+        return False
+    time_samples = xform_op.GetTimeSamples()
+    time_code_value = time_code.GetValue()
+    if round(time_code_value) != time_code_value:
+        carb.log_warn(
+            f"Error: try to identify attribute {str(xform_op.GetName())} has time sample on a non round key {time_code_value}"
+        )
+        return False
+    if time_code_value in time_samples:
+        return True
+    return False
+
+
+def _xform_is_time_sampled(xform: UsdGeom.Xformable):
+    for xform_op in xform.GetOrderedXformOps():
+        if _xform_op_is_time_sampled(xform_op):
+            return True
+    return False
+
+
+def _clear_transform_at_time(xform: UsdGeom.Xformable, time_code: Usd.TimeCode):
+    if time_code.IsDefault():
+        return
+    for xform_op in xform.GetOrderedXformOps():
+        if _has_time_sample(xform_op, time_code):
+            xform_op.GetAttr().ClearAtTime(time_code)
+
+
+@carb.profiler.profile
+def _set_xform_op_value_with_precision(
+    stage: Usd.Stage,
+    xform_op: UsdGeom.XformOp,
+    value,
+    time_code: Usd.TimeCode = Usd.TimeCode.Default(),
+    skip_equal_set_for_timesample: bool = False,
+):
+    set_time_code = time_code
+    old_value = xform_op.Get(set_time_code)
+
+    if not _xform_op_is_time_sampled(xform_op):
+        set_time_code = Usd.TimeCode.Default()
+
+    if old_value is None:
+        if not set_time_code.IsDefault():
+            omni.usd.copy_timesamples_from_weaker_layer(stage, xform_op.GetAttr())
+
+        attr = xform_op.GetAttr()
+        type_name = attr.GetTypeName()
+        default_value = type_name.defaultValue
+
+        return xform_op.Set(type(default_value)(value), set_time_code)
+    else:
+        value_type = type(old_value)
+        if skip_equal_set_for_timesample:
+            if not set_time_code.IsDefault() and not _has_time_sample(xform_op, set_time_code):
+                if Gf.IsClose(value_type(value), old_value, 1e-6):
+                    return False
+        if not set_time_code.IsDefault():
+            omni.usd.copy_timesamples_from_weaker_layer(stage, xform_op.GetAttr())
+        return xform_op.Set(value_type(value), set_time_code)
+
+
+def _get_transform_edit_target(stage: Usd.Stage, path: str) -> Usd.EditTarget:
+    """Returns the edit target to author the transform of a prim to.
+
+    It is the layer defining the prim when it is defined in the session layer or its sublayers, the current edit target
+    otherwise.
+    """
+    def_layer, prim_spec = omni.usd.find_spec_on_session_or_its_sublayers(stage, path)
+    if prim_spec and def_layer and prim_spec.specifier == Sdf.SpecifierDef:
+        return Usd.EditTarget(def_layer)
+    return stage.GetEditTarget()
+
+
+def _find_or_add_xform_op(prim, xform, xform_op_type, create_if_not_exist, precision, op_suffix=""):
+    # Look up the xformOp directly. It is possible that the xformOp exists
+    # as prim attribute but not listed in xform_ops. AddXformOp will fail if called.
+
+    # basically UsdGeomXformOp::GetOpName but it has no python binding
+    type_token = UsdGeom.XformOp.GetOpTypeToken(xform_op_type)
+    attr_name = "xformOp:" + type_token
+    if op_suffix:
+        attr_name += f":{op_suffix}"
+
+    xform_op_attr = prim.GetAttribute(attr_name)
+    if xform_op_attr:
+        xform_op = UsdGeom.XformOp(xform_op_attr)
+        if xform_op:
+            return True, xform_op, xform_op.GetPrecision()
+
+    if create_if_not_exist:
+        # It is not safe to create new xformOps inside of SdfChangeBlocks, since
+        # new attribute creation via anything above Sdf API requires the PcpCache
+        # to be up to date. This is why the xformOps are resolved before the
+        # change block authoring their values is opened.
+        xform_op = xform.AddXformOp(xform_op_type, precision, op_suffix)
+        return True, xform_op, xform_op.GetPrecision()
+    return False, None, precision
+
+
+def _get_first_rotate_type(xform_ops):
+    for xform_op in xform_ops:
+        op_type = xform_op.GetOpType()
+        if op_type >= UsdGeom.XformOp.TypeRotateX and op_type <= UsdGeom.XformOp.TypeOrient:
+            return op_type, xform_op.GetPrecision()
+    return UsdGeom.XformOp.TypeInvalid, UsdGeom.XformOp.PrecisionFloat
+
+
+@carb.profiler.profile
+def _resolve_xform_ops(prim: Usd.Prim, get_rotate_op_types: Callable) -> _TransformXformOps:
+    """Finds the xformOps to author the transform of **prim** to, creating the missing ones.
+
+    Don't use UsdGeomXformCommonAPI. It can only manipulate a very limited subset of xformOpOrder combinations,
+    the xformOps are picked as non-destructively as possible instead.
+
+    Args:
+        prim: Prim to transform.
+        get_rotate_op_types: Called with the type of the first rotation xformOp of the prim (TypeInvalid if there is
+            none), returns a list of (rotation type, create if not exist) of the rotation xformOps to author.
+    """
+    xform = UsdGeom.Xformable(prim)
+    xform_ops = xform.GetOrderedXformOps()
+    for xform_op in xform_ops:
+        if xform_op.GetOpType() == UsdGeom.XformOp.TypeTransform:
+            return _TransformXformOps(xform, xform_op, None, [], None, None)
+
+    new_xform_ops = []
+
+    # Translation
+    _, translate_op, _ = _find_or_add_xform_op(
+        prim, xform, UsdGeom.XformOp.TypeTranslate, True, UsdGeom.XformOp.PrecisionDouble
+    )
+    new_xform_ops.append(translate_op)
+
+    # Pivot
+    has_pivot, pivot_op, _ = _find_or_add_xform_op(
+        prim, xform, UsdGeom.XformOp.TypeTranslate, False, UsdGeom.XformOp.PrecisionFloat, "pivot"
+    )
+    if has_pivot:
+        new_xform_ops.append(pivot_op)
+
+    # Rotation
+    rotate_ops = []
+    first_rotate_op_type, precision = _get_first_rotate_type(xform_ops)
+    for rotate_op_type, create_if_not_exist in get_rotate_op_types(first_rotate_op_type):
+        found, xform_op, precision = _find_or_add_xform_op(prim, xform, rotate_op_type, create_if_not_exist, precision)
+        if found:
+            rotate_ops.append(xform_op)
+    new_xform_ops.extend(rotate_ops)
+
+    # Scale
+    _, scale_op, _ = _find_or_add_xform_op(prim, xform, UsdGeom.XformOp.TypeScale, True, UsdGeom.XformOp.PrecisionFloat)
+    new_xform_ops.append(scale_op)
+
+    # Inverse pivot
+    if has_pivot:
+        # Assume the last xformOps is the pivot
+        new_xform_ops.append(xform_ops[-1])
+
+    return _TransformXformOps(xform, None, translate_op, rotate_ops, scale_op, new_xform_ops)
+
+
+def _resolve_matrix_xform_ops(prim: Usd.Prim) -> _TransformXformOps:
+    """Finds the xformOps to author a transform matrix to, see :func:`_author_transform_matrix`."""
+
+    def get_rotate_op_types(first_rotate_op_type):
+        if first_rotate_op_type == UsdGeom.XformOp.TypeInvalid:
+            first_rotate_op_type = get_default_rotation_order_type(prim.IsA(UsdGeom.Camera))
+
+        if first_rotate_op_type in _ROTATE_AXIS_TYPES:
+            return [(op_type, True) for op_type in reversed(_ROTATE_AXIS_TYPES)]
+        elif first_rotate_op_type in _ROTATE_THREE_AXIS_TYPES:
+            return [(first_rotate_op_type, True)]
+        elif first_rotate_op_type == UsdGeom.XformOp.TypeOrient:
+            return [(first_rotate_op_type, False)]
+        return [(UsdGeom.XformOp.TypeRotateXYZ, True)]
+
+    return _resolve_xform_ops(prim, get_rotate_op_types)
+
+
+def _resolve_srt_xform_ops(prim: Usd.Prim, rotation_order: Gf.Vec3i, settings) -> _TransformXformOps:
+    """Finds the xformOps to author a transform with **rotation_order** to, see :func:`_author_transform_srt`."""
+
+    def get_rotate_op_types(first_rotate_op_type):
+        if first_rotate_op_type == UsdGeom.XformOp.TypeInvalid:
+            default_xform_ops = settings.get_as_string(
+                PERSISTENT_SETTINGS_PREFIX + "/app/primCreation/DefaultXformOpType"
+            )
+
+            if default_xform_ops == "Scale, Orient, Translate":
+                first_rotate_op_type = UsdGeom.XformOp.TypeOrient
+            else:
+                # TODO what if default_xform_ops == "Transform"?
+                first_rotate_op_type = _ROTATION_ORDER_TO_TYPE.get(rotation_order, UsdGeom.XformOp.TypeInvalid)
+
+        if first_rotate_op_type in _ROTATE_AXIS_TYPES:
+            # Add in reverse order
+            return [(_ROTATE_AXIS_TYPES[rotation_order[i]], True) for i in range(2, -1, -1)]
+        elif first_rotate_op_type in _ROTATE_THREE_AXIS_TYPES:
+            provided_rotation_order = _ROTATION_ORDER_TO_TYPE.get(rotation_order, first_rotate_op_type)
+            if provided_rotation_order != first_rotate_op_type:
+                carb.log_warn(
+                    f"Existing rotation order {first_rotate_op_type} on prim {prim.GetPath()} is different than desired {provided_rotation_order}, overriding..."
+                )
+            return [(provided_rotation_order, True)]
+        elif first_rotate_op_type == UsdGeom.XformOp.TypeOrient:
+            return [(first_rotate_op_type, True)]
+
+        carb.log_error(f"Failed to determine rotation order {first_rotate_op_type}")
+        return []
+
+    return _resolve_xform_ops(prim, get_rotate_op_types)
+
+
+def _get_rotation_from_euler(rotation_euler, rotation_order) -> Gf.Rotation:
+    return (
+        Gf.Rotation(_AXES[rotation_order[0]], rotation_euler[rotation_order[0]])
+        * Gf.Rotation(_AXES[rotation_order[1]], rotation_euler[rotation_order[1]])
+        * Gf.Rotation(_AXES[rotation_order[2]], rotation_euler[rotation_order[2]])
+    )
+
+
+def _construct_transform_matrix_from_srt(
+    translation: Gf.Vec3d, rotation_euler: Gf.Vec3d, rotation_order: Gf.Vec3i, scale: Gf.Vec3d
+):
+    trans_mtx = Gf.Matrix4d()
+    rot_mtx = Gf.Matrix4d()
+    scale_mtx = Gf.Matrix4d()
+
+    trans_mtx.SetTranslate(translation)
+    rot_mtx.SetRotate(_get_rotation_from_euler(rotation_euler, rotation_order))
+    scale_mtx.SetScale(scale)
+    return scale_mtx * rot_mtx * trans_mtx
+
+
+@carb.profiler.profile
+def _author_transform_matrix(
+    stage: Usd.Stage,
+    xform_ops: _TransformXformOps,
+    matrix: Gf.Matrix4d,
+    time_code: Usd.TimeCode = Usd.TimeCode.Default(),
+    skip_equal_set_for_timesample: bool = False,
+):
+    """Authors **matrix** to xformOps resolved by :func:`_resolve_matrix_xform_ops`. Safe to call in a change block."""
+    if xform_ops.transform_op:
+        # This is here to prevent the TransformGizmo from writing a translation, rotation and scale on every
+        # key where it sets a value. At some point we should revisit the gizmo to simplify the logic, and
+        # start setting only the transform value the user intends.
+        _set_xform_op_value_with_precision(
+            stage, xform_ops.transform_op, matrix, time_code, skip_equal_set_for_timesample
+        )
+        return
+
+    _, scale_orient_mat_unused, scale, rot_mat, translation, persp_mat_unused = matrix.Factor()
+    rot_mat.Orthonormalize(False)
+    rotation = rot_mat.ExtractRotation()
+
+    _set_xform_op_value_with_precision(
+        stage, xform_ops.translate_op, translation, time_code, skip_equal_set_for_timesample
+    )
+
+    for xform_op in xform_ops.rotate_ops:
+        op_type = xform_op.GetOpType()
+        if op_type in _ROTATE_AXIS_TYPES:
+            angles = rotation.Decompose(Gf.Vec3d.ZAxis(), Gf.Vec3d.YAxis(), Gf.Vec3d.XAxis())
+            rotateZYX = Gf.Vec3f(angles[2], angles[1], angles[0])
+            value = rotateZYX[_ROTATE_AXIS_TYPES.index(op_type)]
+        elif op_type == UsdGeom.XformOp.TypeOrient:
+            value = rotation.GetQuat()
+        else:
+            axes, indices = _ROTATE_DECOMPOSITION[op_type]
+            angles = rotation.Decompose(*axes)
+            value = Gf.Vec3f(angles[indices[0]], angles[indices[1]], angles[indices[2]])
+        _set_xform_op_value_with_precision(stage, xform_op, value, time_code, skip_equal_set_for_timesample)
+
+    _set_xform_op_value_with_precision(
+        stage, xform_ops.scale_op, Gf.Vec3f(scale), time_code, skip_equal_set_for_timesample
+    )
+
+    xform = xform_ops.xformable
+    xform.SetXformOpOrder(xform_ops.xform_op_order, xform.GetResetXformStack())
+
+
+@carb.profiler.profile
+def _author_transform_srt(
+    stage: Usd.Stage,
+    xform_ops: _TransformXformOps,
+    translation: Gf.Vec3d,
+    rotation_euler: Gf.Vec3d,
+    rotation_order: Gf.Vec3i,
+    scale: Gf.Vec3d,
+    time_code: Usd.TimeCode = Usd.TimeCode.Default(),
+    skip_equal_set_for_timesample: bool = False,
+):
+    """Authors a transform to xformOps resolved by :func:`_resolve_srt_xform_ops`. Safe to call in a change block."""
+    if xform_ops.transform_op:
+        matrix = _construct_transform_matrix_from_srt(translation, rotation_euler, rotation_order, scale)
+        _set_xform_op_value_with_precision(
+            stage, xform_ops.transform_op, matrix, time_code, skip_equal_set_for_timesample
+        )
+        return
+
+    _set_xform_op_value_with_precision(
+        stage, xform_ops.translate_op, translation, time_code, skip_equal_set_for_timesample
+    )
+
+    for xform_op in xform_ops.rotate_ops:
+        op_type = xform_op.GetOpType()
+        if op_type in _ROTATE_AXIS_TYPES:
+            value = rotation_euler[_ROTATE_AXIS_TYPES.index(op_type)]
+        elif op_type == UsdGeom.XformOp.TypeOrient:
+            value = _get_rotation_from_euler(rotation_euler, rotation_order).GetQuat()
+        else:
+            value = rotation_euler
+        _set_xform_op_value_with_precision(stage, xform_op, value, time_code, skip_equal_set_for_timesample)
+
+    _set_xform_op_value_with_precision(
+        stage, xform_ops.scale_op, Gf.Vec3f(scale), time_code, skip_equal_set_for_timesample
+    )
+
+    xform = xform_ops.xformable
+    xform.SetXformOpOrder(xform_ops.xform_op_order, xform.GetResetXformStack())
+
+
+def _author_transforms(stage: Usd.Stage, paths: List[str], prepare: Callable[[int, Usd.Prim], Callable]):
+    """Authors the transforms of the prims at **paths** in a single change block.
+
+    Args:
+        stage: Stage of the prims.
+        paths: Paths of the prims, the ones without a prim are skipped.
+        prepare: Called with the index and the prim of each path, under the edit target the transform of the prim is
+            authored to. Resolves (and creates) the xformOps, which is not safe to do in the change block, and returns
+            the function authoring the values, or None to skip the prim.
+    """
+    prepared = []
+    for i, path in enumerate(paths):
+        prim = stage.GetPrimAtPath(path)
+        if not prim:
+            continue
+        edit_target = _get_transform_edit_target(stage, path)
+        with Usd.EditContext(stage, edit_target):
+            author = prepare(i, prim)
+        if author:
+            prepared.append((edit_target, author))
+
+    carb.profiler.begin(1, "Author transforms")
+    with Sdf.ChangeBlock():
+        for edit_target, author in prepared:
+            with Usd.EditContext(stage, edit_target):
+                author()
+    carb.profiler.end(1)
+
+
+def _to_vec3d(value) -> Gf.Vec3d:
+    if isinstance(value, Gf.Vec3d):
+        return value
+    return Gf.Vec3d(float(value[0]), float(value[1]), float(value[2]))
+
+
+def _to_vec3i(value) -> Gf.Vec3i:
+    if isinstance(value, Gf.Vec3i):
+        return value
+    return Gf.Vec3i(int(value[0]), int(value[1]), int(value[2]))
+
+
 class TransformPrimCommand(omni.kit.commands.Command):
     """
     Transform primitive undoable **Command**.
@@ -1518,304 +1931,38 @@ class TransformPrimCommand(omni.kit.commands.Command):
         time_code: Usd.TimeCode = Usd.TimeCode.Default(),
         skip_equal_set_for_timesample: bool = False,
     ):
-        stage = self._stage()
-        set_time_code = time_code
-        old_value = xform_op.Get(set_time_code)
-
-        if not self._xform_op_is_time_sampled(xform_op):
-            set_time_code = Usd.TimeCode.Default()
-
-        if old_value is None:
-            if not set_time_code.IsDefault():
-                omni.usd.copy_timesamples_from_weaker_layer(stage, xform_op.GetAttr())
-            return xform_op.Set(value, set_time_code)
-        else:
-            value_type = type(old_value)
-            if skip_equal_set_for_timesample:
-                if not set_time_code.IsDefault() and not self._has_time_sample(xform_op, set_time_code):
-                    if Gf.IsClose(value_type(value), old_value, 1e-6):
-                        return False
-            if not set_time_code.IsDefault():
-                omni.usd.copy_timesamples_from_weaker_layer(stage, xform_op.GetAttr())
-            return xform_op.Set(value_type(value), set_time_code)
+        return _set_xform_op_value_with_precision(
+            self._stage(), xform_op, value, time_code, skip_equal_set_for_timesample
+        )
 
     def _xform_op_is_time_sampled(self, xform_op: UsdGeom.XformOp):
-        return xform_op.GetNumTimeSamples() > 0
+        return _xform_op_is_time_sampled(xform_op)
 
     def _has_time_sample(self, xform_op, time_code):
-        if time_code.IsDefault():
-            return False
-        time_samples = xform_op.GetTimeSamples()
-        time_code_value = time_code.GetValue()
-        if round(time_code_value) != time_code_value:
-            carb.log_warn(
-                f"Error: try to identify attribute {str(xform_op.GetName())} has time sample on a non round key {time_code_value}"
-            )
-            return False
-        if time_code_value in time_samples:
-            return True
-        return False
+        return _has_time_sample(xform_op, time_code)
 
     def _xform_is_time_sampled(self, xform: UsdGeom.Xformable):
-        xform_ops = xform.GetOrderedXformOps()
-        for xform_op in xform_ops:
-            if self._xform_op_is_time_sampled(xform_op):
-                return True
-        return False
+        return _xform_is_time_sampled(xform)
 
     def _set_transform_matrix(
         self, matrix, time_code: Usd.TimeCode = Usd.TimeCode.Default(), skip_equal_set_for_timesample: bool = False
     ):
-        Sdf.BeginChangeBlock()  # Use non-RAII style Sdf.ChangeBlock because it *may* need to be released in create_if_not_exist
-
         # re-fetch prim every time in case redoing on a deleted then restored prim
         stage = self._stage()
         prim = stage.GetPrimAtPath(self._path)
         if prim:
-            xform = UsdGeom.Xformable(prim)
-
-            found_transfrom_op = False
-            xform_ops = xform.GetOrderedXformOps()
-            for xform_op in xform.GetOrderedXformOps():
-                if xform_op.GetOpType() == UsdGeom.XformOp.TypeTransform:
-                    found_transfrom_op = True
-                    # This is here to prevent the TransformGizmo from writing a translation, rotation and scale on every
-                    # key where it sets a value. At some point we should revisit the gizmo to simplify the logic, and
-                    # start setting only the transform value the user intends.
-                    self._set_value_with_precision(xform_op, matrix, time_code, skip_equal_set_for_timesample)
-                    break
-            if not found_transfrom_op:
-                _, scale_orient_mat_unused, scale, rot_mat, translation, persp_mat_unused = matrix.Factor()
-                rot_mat.Orthonormalize(False)
-                rotation = rot_mat.ExtractRotation()
-
-                # Don't use UsdGeomXformCommonAPI. It can only manipulate a very limited subset of xformOpOrder combinations
-                # Do it manually as non-destructively as possible
-                new_xform_ops = []
-
-                def find_or_add(xform_op_type, create_if_not_exist, precision, op_suffix=""):
-                    # Look up the xformOp directly. It is possible that the xformOp exists
-                    # as prim attribute but not listed in xform_ops. AddXformOp will fail if called.
-
-                    # basically UsdGeomXformOp::GetOpName but it has no python binding
-                    type_token = UsdGeom.XformOp.GetOpTypeToken(xform_op_type)
-                    attr_name = "xformOp:" + type_token
-                    if op_suffix:
-                        attr_name += f":{op_suffix}"
-
-                    xform_op_attr = prim.GetAttribute(attr_name)
-                    if xform_op_attr:
-                        xform_op = UsdGeom.XformOp(xform_op_attr)
-                        if xform_op:
-                            return True, xform_op, xform_op.GetPrecision()
-
-                    if create_if_not_exist:
-                        # It is not safe to create new xformOps inside of SdfChangeBlocks, since
-                        # new attribute creation via anything above Sdf API requires the PcpCache
-                        # to be up to date. Flush the current change block before creating
-                        # the new xformOp.
-                        Sdf.EndChangeBlock()
-
-                        xform_op = xform.AddXformOp(xform_op_type, precision, op_suffix)
-                        precision = xform_op.GetPrecision()
-
-                        # Create a new change block to batch the subsequent authoring operations
-                        # where possible.
-                        Sdf.BeginChangeBlock()
-                        return True, xform_op, precision
-                    return False, None, precision
-
-                def get_first_rotate_type():
-                    for xform_op in xform_ops:
-                        op_type = xform_op.GetOpType()
-                        if op_type >= UsdGeom.XformOp.TypeRotateX and op_type <= UsdGeom.XformOp.TypeOrient:
-                            return op_type, xform_op.GetPrecision()
-                    return UsdGeom.XformOp.TypeInvalid, UsdGeom.XformOp.PrecisionFloat
-
-                def decompose_and_set_value(
-                    rotation_type,
-                    axis_0,
-                    axis_1,
-                    axis_2,
-                    x_index,
-                    y_index,
-                    z_index,
-                    precision,
-                    timecode: Usd.TimeCode = Usd.TimeCode.Default(),
-                    skip_equal_set_for_timesample: bool = False,
-                ):
-                    ret = False
-                    angles = rotation.Decompose(axis_0, axis_1, axis_2)
-                    rotate = Gf.Vec3f(angles[x_index], angles[y_index], angles[z_index])
-                    found, xform_op, precision = find_or_add(rotation_type, True, precision)
-                    if found:
-                        ret = self._set_value_with_precision(xform_op, rotate, timecode, skip_equal_set_for_timesample)
-                        new_xform_ops.append(xform_op)
-                    return ret
-
-                # Set translation
-                precision = UsdGeom.XformOp.PrecisionDouble
-                found, xform_op, precision = find_or_add(UsdGeom.XformOp.TypeTranslate, True, precision)
-                if found:
-                    self._set_value_with_precision(xform_op, translation, time_code, skip_equal_set_for_timesample)
-                    new_xform_ops.append(xform_op)
-
-                # Set pivot
-                precision = UsdGeom.XformOp.PrecisionFloat
-                has_pivot, pivot_op, precision = find_or_add(UsdGeom.XformOp.TypeTranslate, False, precision, "pivot")
-                if has_pivot:
-                    new_xform_ops.append(pivot_op)
-
-                # Set rotation
-                precision = UsdGeom.XformOp.PrecisionFloat
-                first_rotate_op_type, precision = get_first_rotate_type()
-
-                if first_rotate_op_type == UsdGeom.XformOp.TypeInvalid:
-                    first_rotate_op_type = get_default_rotation_order_type(prim.IsA(UsdGeom.Camera))
-
-                if (
-                    first_rotate_op_type == UsdGeom.XformOp.TypeRotateX
-                    or first_rotate_op_type == UsdGeom.XformOp.TypeRotateY
-                    or first_rotate_op_type == UsdGeom.XformOp.TypeRotateZ
-                ):
-                    angles = rotation.Decompose(Gf.Vec3d.ZAxis(), Gf.Vec3d.YAxis(), Gf.Vec3d.XAxis())
-                    rotateZYX = Gf.Vec3f(angles[2], angles[1], angles[0])
-                    found, xform_op, precision = find_or_add(UsdGeom.XformOp.TypeRotateZ, True, precision)
-                    if found:
-                        self._set_value_with_precision(xform_op, rotateZYX[2], time_code, skip_equal_set_for_timesample)
-                        new_xform_ops.append(xform_op)
-                    found, xform_op, precision = find_or_add(UsdGeom.XformOp.TypeRotateY, True, precision)
-                    if found:
-                        self._set_value_with_precision(xform_op, rotateZYX[1], time_code, skip_equal_set_for_timesample)
-                        new_xform_ops.append(xform_op)
-                        found, xform_op, precision = find_or_add(UsdGeom.XformOp.TypeRotateX, True, precision)
-                    if found:
-                        self._set_value_with_precision(xform_op, rotateZYX[0], time_code, skip_equal_set_for_timesample)
-                        new_xform_ops.append(xform_op)
-                elif first_rotate_op_type == UsdGeom.XformOp.TypeRotateZYX:
-                    decompose_and_set_value(
-                        first_rotate_op_type,
-                        Gf.Vec3d.XAxis(),
-                        Gf.Vec3d.YAxis(),
-                        Gf.Vec3d.ZAxis(),
-                        0,
-                        1,
-                        2,
-                        precision,
-                        time_code,
-                        skip_equal_set_for_timesample,
-                    )
-                elif first_rotate_op_type == UsdGeom.XformOp.TypeRotateXZY:
-                    decompose_and_set_value(
-                        first_rotate_op_type,
-                        Gf.Vec3d.YAxis(),
-                        Gf.Vec3d.ZAxis(),
-                        Gf.Vec3d.XAxis(),
-                        2,
-                        0,
-                        1,
-                        precision,
-                        time_code,
-                        skip_equal_set_for_timesample,
-                    )
-                elif first_rotate_op_type == UsdGeom.XformOp.TypeRotateYXZ:
-                    decompose_and_set_value(
-                        first_rotate_op_type,
-                        Gf.Vec3d.ZAxis(),
-                        Gf.Vec3d.XAxis(),
-                        Gf.Vec3d.YAxis(),
-                        1,
-                        2,
-                        0,
-                        precision,
-                        time_code,
-                        skip_equal_set_for_timesample,
-                    )
-                elif first_rotate_op_type == UsdGeom.XformOp.TypeRotateYZX:
-                    decompose_and_set_value(
-                        first_rotate_op_type,
-                        Gf.Vec3d.XAxis(),
-                        Gf.Vec3d.ZAxis(),
-                        Gf.Vec3d.YAxis(),
-                        0,
-                        2,
-                        1,
-                        precision,
-                        time_code,
-                        skip_equal_set_for_timesample,
-                    )
-                elif first_rotate_op_type == UsdGeom.XformOp.TypeRotateZXY:
-                    decompose_and_set_value(
-                        first_rotate_op_type,
-                        Gf.Vec3d.YAxis(),
-                        Gf.Vec3d.XAxis(),
-                        Gf.Vec3d.ZAxis(),
-                        1,
-                        0,
-                        2,
-                        precision,
-                        time_code,
-                        skip_equal_set_for_timesample,
-                    )
-                elif first_rotate_op_type == UsdGeom.XformOp.TypeOrient:
-                    found, xform_op, precision = find_or_add(first_rotate_op_type, False, precision)
-                    if found:
-                        self._set_value_with_precision(
-                            xform_op, rotation.GetQuat(), time_code, skip_equal_set_for_timesample
-                        )
-                        new_xform_ops.append(xform_op)
-                else:  # first_rotate_op_type == UsdGeom.XformOp.TypeRotateXYZ and all else
-                    decompose_and_set_value(
-                        UsdGeom.XformOp.TypeRotateXYZ,
-                        Gf.Vec3d.ZAxis(),
-                        Gf.Vec3d.YAxis(),
-                        Gf.Vec3d.XAxis(),
-                        2,
-                        1,
-                        0,
-                        precision,
-                        time_code,
-                        skip_equal_set_for_timesample,
-                    )
-
-                # Set scale
-                precision = UsdGeom.XformOp.PrecisionFloat
-                found, xform_op, precision = find_or_add(UsdGeom.XformOp.TypeScale, True, precision)
-                if found:
-                    self._set_value_with_precision(xform_op, Gf.Vec3f(scale), time_code, skip_equal_set_for_timesample)
-                    new_xform_ops.append(xform_op)
-
-                # Set inverse pivot
-                if has_pivot:
-                    # Assume the last xformOps is the pivot
-                    new_xform_ops.append(xform_ops[-1])
-
-                xform.SetXformOpOrder(new_xform_ops, xform.GetResetXformStack())
-
-        Sdf.EndChangeBlock()
+            xform_ops = _resolve_matrix_xform_ops(prim)
+            with Sdf.ChangeBlock():
+                _author_transform_matrix(stage, xform_ops, matrix, time_code, skip_equal_set_for_timesample)
 
     def _clear_transform_at_time(self, time_code: Usd.TimeCode):
-        if time_code.IsDefault():
-            return
-        stage = self._stage()
-        prim = stage.GetPrimAtPath(self._path)
+        prim = self._stage().GetPrimAtPath(self._path)
         if prim:
-            xform = UsdGeom.Xformable(prim)
-            xform_ops = xform.GetOrderedXformOps()
-            for xform_op in xform.GetOrderedXformOps():
-                if self._has_time_sample(xform_op, time_code):
-                    xform_op.GetAttr().ClearAtTime(time_code)
+            _clear_transform_at_time(UsdGeom.Xformable(prim), time_code)
 
     def _switch_edit_tgt(self):
         stage = self._stage()
-        def_layer, prim_spec = omni.usd.find_spec_on_session_or_its_sublayers(stage, self._path)
-        if not prim_spec or not def_layer:
-            return Usd.EditContext(stage)
-
-        if prim_spec.specifier == Sdf.SpecifierDef:
-            return Usd.EditContext(stage, Usd.EditTarget(def_layer))
-        else:
-            return Usd.EditContext(stage)
+        return Usd.EditContext(stage, _get_transform_edit_target(stage, self._path))
 
     def do(self):
         with self._switch_edit_tgt() as context:
@@ -1921,7 +2068,6 @@ class TransformPrimSRTCommand(omni.kit.commands.Command):
             if self._new_scale is None:
                 self._new_scale = self._old_scale
 
-    @carb.profiler.profile
     def _set_value_with_precision(
         self,
         xform_op,
@@ -1929,73 +2075,23 @@ class TransformPrimSRTCommand(omni.kit.commands.Command):
         time_code: Usd.TimeCode = Usd.TimeCode.Default(),
         skip_equal_set_for_timesample: bool = False,
     ):
-        set_time_code = time_code
-        old_value = xform_op.Get(set_time_code)
-
-        if not self._xform_op_is_time_sampled(xform_op):
-            set_time_code = Usd.TimeCode.Default()
-
-        if old_value is None:
-            if not set_time_code.IsDefault():
-                omni.usd.copy_timesamples_from_weaker_layer(self._usd_context.get_stage(), xform_op.GetAttr())
-
-            attr = xform_op.GetAttr()
-            type_name = attr.GetTypeName()
-            default_value = type_name.defaultValue
-
-            return xform_op.Set(type(default_value)(value), set_time_code)
-        else:
-            value_type = type(old_value)
-            if skip_equal_set_for_timesample:
-                if not set_time_code.IsDefault() and not self._has_time_sample(xform_op, set_time_code):
-                    if Gf.IsClose(value_type(value), old_value, 1e-6):
-                        return False
-            if not set_time_code.IsDefault():
-                omni.usd.copy_timesamples_from_weaker_layer(self._usd_context.get_stage(), xform_op.GetAttr())
-            return xform_op.Set(value_type(value), set_time_code)
+        return _set_xform_op_value_with_precision(
+            self._usd_context.get_stage(), xform_op, value, time_code, skip_equal_set_for_timesample
+        )
 
     def _xform_op_is_time_sampled(self, xform_op: UsdGeom.XformOp):
-        return xform_op.GetNumTimeSamples() > 0
+        return _xform_op_is_time_sampled(xform_op)
 
     def _has_time_sample(self, xform_op, time_code):
-        if time_code.IsDefault():
-            return False
-        time_samples = xform_op.GetTimeSamples()
-        time_code_value = time_code.GetValue()
-        if round(time_code_value) != time_code_value:
-            carb.log_warn(
-                f"Error: try to identify attribute {str(xform_op.GetName())} has time sample on a non round key {time_code_value}"
-            )
-            return False
-        if time_code_value in time_samples:
-            return True
-        return False
+        return _has_time_sample(xform_op, time_code)
 
     def _xform_is_time_sampled(self, xform: UsdGeom.Xformable):
-        xform_ops = xform.GetOrderedXformOps()
-        for xform_op in xform_ops:
-            if self._xform_op_is_time_sampled(xform_op):
-                return True
-        return False
+        return _xform_is_time_sampled(xform)
 
     def _construct_transfrom_matrix_from_SRT(
         self, translation: Gf.Vec3d, rotation_euler: Gf.Vec3d, rotation_order: Gf.Vec3i, scale: Gf.Vec3d
     ):
-        trans_mtx = Gf.Matrix4d()
-        rot_mtx = Gf.Matrix4d()
-        scale_mtx = Gf.Matrix4d()
-
-        trans_mtx.SetTranslate(translation)
-
-        axes = [Gf.Vec3d.XAxis(), Gf.Vec3d.YAxis(), Gf.Vec3d.ZAxis()]
-        rotation = (
-            Gf.Rotation(axes[rotation_order[0]], rotation_euler[rotation_order[0]])
-            * Gf.Rotation(axes[rotation_order[1]], rotation_euler[rotation_order[1]])
-            * Gf.Rotation(axes[rotation_order[2]], rotation_euler[rotation_order[2]])
-        )
-        rot_mtx.SetRotate(rotation)
-        scale_mtx.SetScale(scale)
-        return scale_mtx * rot_mtx * trans_mtx
+        return _construct_transform_matrix_from_srt(translation, rotation_euler, rotation_order, scale)
 
     @carb.profiler.profile
     def _set_transform_srt(
@@ -2007,221 +2103,37 @@ class TransformPrimSRTCommand(omni.kit.commands.Command):
         time_code: Usd.TimeCode = Usd.TimeCode.Default(),
         skip_equal_set_for_timesample: bool = False,
     ):
-        Sdf.BeginChangeBlock()  # Use non-RAII style Sdf.ChangeBlock because it *may* need to be released in create_if_not_exist
-
         # re-fetch prim every time in case redoing on a deleted then restored prim
         stage = self._usd_context.get_stage()
         prim = stage.GetPrimAtPath(self._path)
-        if prim:
-            xform = UsdGeom.Xformable(prim)
-
-            found_transfrom_op = False
-            xform_ops = xform.GetOrderedXformOps()
-            for xform_op in xform.GetOrderedXformOps():
-                if xform_op.GetOpType() == UsdGeom.XformOp.TypeTransform:
-                    found_transfrom_op = True
-                    matrix = self._construct_transfrom_matrix_from_SRT(
-                        translation, rotation_euler, rotation_order, scale
-                    )
-                    self._set_value_with_precision(xform_op, matrix, time_code, skip_equal_set_for_timesample)
-                    break
-            if not found_transfrom_op:
-                # Don't use UsdGeomXformCommonAPI. It can only manipulate a very limited subset of xformOpOrder combinations
-                # Do it manually as non-destructively as possible
-                new_xform_ops = []
-
-                @carb.profiler.profile
-                def find_or_add(xform_op_type, create_if_not_exist, precision, op_suffix=""):
-                    # Look up the xformOp directly. It is possible that the xformOp exists
-                    # as prim attribute but not listed in xform_ops. AddXformOp will fail if called.
-
-                    # basically UsdGeomXformOp::GetOpName but it has no python binding
-                    type_token = UsdGeom.XformOp.GetOpTypeToken(xform_op_type)
-                    attr_name = "xformOp:" + type_token
-                    if op_suffix:
-                        attr_name += f":{op_suffix}"
-
-                    xform_op_attr = prim.GetAttribute(attr_name)
-                    if xform_op_attr:
-                        xform_op = UsdGeom.XformOp(xform_op_attr)
-                        if xform_op:
-                            return True, xform_op, xform_op.GetPrecision()
-
-                    if create_if_not_exist:
-                        # It is not safe to create new xformOps inside of SdfChangeBlocks, since
-                        # new attribute creation via anything above Sdf API requires the PcpCache
-                        # to be up to date. Flush the current change block before creating
-                        # the new xformOp.
-                        Sdf.EndChangeBlock()
-
-                        xform_op = xform.AddXformOp(xform_op_type, precision, op_suffix)
-                        precision = xform_op.GetPrecision()
-
-                        # Create a new change block to batch the subsequent authoring operations
-                        # where possible.
-                        Sdf.BeginChangeBlock()
-                        return True, xform_op, precision
-                    return False, None, precision
-
-                @carb.profiler.profile
-                def get_first_rotate_type():
-                    for xform_op in xform_ops:
-                        op_type = xform_op.GetOpType()
-                        if op_type >= UsdGeom.XformOp.TypeRotateX and op_type <= UsdGeom.XformOp.TypeOrient:
-                            return op_type, xform_op.GetPrecision()
-                    return UsdGeom.XformOp.TypeInvalid, UsdGeom.XformOp.PrecisionFloat
-
-                @carb.profiler.profile
-                def set_euler_value(
-                    rotation_type,
-                    precision,
-                    timecode: Usd.TimeCode = Usd.TimeCode.Default(),
-                    skip_equal_set_for_timesample: bool = False,
-                ):
-                    ret = False
-                    found, xform_op, precision = find_or_add(rotation_type, True, precision)
-                    if found:
-                        ret = self._set_value_with_precision(
-                            xform_op, rotation_euler, timecode, skip_equal_set_for_timesample
-                        )
-                        new_xform_ops.append(xform_op)
-                    return ret
-
-                # Set translation
-                precision = UsdGeom.XformOp.PrecisionDouble
-                found, xform_op, precision = find_or_add(UsdGeom.XformOp.TypeTranslate, True, precision)
-                if found:
-                    self._set_value_with_precision(xform_op, translation, time_code, skip_equal_set_for_timesample)
-                    new_xform_ops.append(xform_op)
-
-                # Set pivot
-                precision = UsdGeom.XformOp.PrecisionFloat
-                has_pivot, pivot_op, precision = find_or_add(UsdGeom.XformOp.TypeTranslate, False, precision, "pivot")
-                if has_pivot:
-                    new_xform_ops.append(pivot_op)
-
-                # Set rotation
-                precision = UsdGeom.XformOp.PrecisionFloat
-                first_rotate_op_type, precision = get_first_rotate_type()
-                rotation_order_to_type_map = {
-                    Gf.Vec3i(0, 1, 2): UsdGeom.XformOp.TypeRotateXYZ,
-                    Gf.Vec3i(0, 2, 1): UsdGeom.XformOp.TypeRotateXZY,
-                    Gf.Vec3i(1, 0, 2): UsdGeom.XformOp.TypeRotateYXZ,
-                    Gf.Vec3i(1, 2, 0): UsdGeom.XformOp.TypeRotateYZX,
-                    Gf.Vec3i(2, 0, 1): UsdGeom.XformOp.TypeRotateZXY,
-                    Gf.Vec3i(2, 1, 0): UsdGeom.XformOp.TypeRotateZYX,
-                }
-
-                if first_rotate_op_type == UsdGeom.XformOp.TypeInvalid:
-                    default_xform_ops = self._settings.get_as_string(
-                        PERSISTENT_SETTINGS_PREFIX + "/app/primCreation/DefaultXformOpType"
-                    )
+        if not prim:
+            return
 
-                    if default_xform_ops == "Scale, Orient, Translate":
-                        first_rotate_op_type = UsdGeom.XformOp.TypeOrient
-                    else:
-                        # TODO what if default_xform_ops == "Transform"?
-                        first_rotate_op_type = rotation_order_to_type_map.get(
-                            rotation_order, UsdGeom.XformOp.TypeInvalid
-                        )
-                if (
-                    first_rotate_op_type == UsdGeom.XformOp.TypeRotateX
-                    or first_rotate_op_type == UsdGeom.XformOp.TypeRotateY
-                    or first_rotate_op_type == UsdGeom.XformOp.TypeRotateZ
-                ):
-                    # Add in reverse order
-                    axis_type = [
-                        UsdGeom.XformOp.TypeRotateX,
-                        UsdGeom.XformOp.TypeRotateY,
-                        UsdGeom.XformOp.TypeRotateZ,
-                    ]
-                    for i in range(2, -1, -1):
-                        axis = rotation_order[i]
-                        found, xform_op, precision = find_or_add(axis_type[axis], True, precision)
-                        if found:
-                            self._set_value_with_precision(
-                                xform_op, rotation_euler[axis], time_code, skip_equal_set_for_timesample
-                            )
-                            new_xform_ops.append(xform_op)
-                elif (
-                    first_rotate_op_type == UsdGeom.XformOp.TypeRotateXYZ
-                    or first_rotate_op_type == UsdGeom.XformOp.TypeRotateXZY
-                    or first_rotate_op_type == UsdGeom.XformOp.TypeRotateYXZ
-                    or first_rotate_op_type == UsdGeom.XformOp.TypeRotateYZX
-                    or first_rotate_op_type == UsdGeom.XformOp.TypeRotateZXY
-                    or first_rotate_op_type == UsdGeom.XformOp.TypeRotateZYX
-                ):
-                    provided_rotation_order = rotation_order_to_type_map.get(rotation_order, first_rotate_op_type)
-                    if provided_rotation_order != first_rotate_op_type:
-                        carb.log_warn(
-                            f"Existing rotation order {first_rotate_op_type} on prim {self._path} is different than desired {provided_rotation_order}, overriding..."
-                        )
+        xform_ops = _resolve_srt_xform_ops(prim, rotation_order, self._settings)
 
-                    set_euler_value(
-                        provided_rotation_order,
-                        precision,
-                        time_code,
-                        skip_equal_set_for_timesample,
-                    )
-                elif first_rotate_op_type == UsdGeom.XformOp.TypeOrient:
-                    found, xform_op, precision = find_or_add(first_rotate_op_type, True, precision)
-                    if found:
-                        axes = [Gf.Vec3d.XAxis(), Gf.Vec3d.YAxis(), Gf.Vec3d.ZAxis()]
-                        rotation = (
-                            Gf.Rotation(axes[rotation_order[0]], rotation_euler[rotation_order[0]])
-                            * Gf.Rotation(axes[rotation_order[1]], rotation_euler[rotation_order[1]])
-                            * Gf.Rotation(axes[rotation_order[2]], rotation_euler[rotation_order[2]])
-                        )
-                        self._set_value_with_precision(
-                            xform_op, rotation.GetQuat(), time_code, skip_equal_set_for_timesample
-                        )
-                        new_xform_ops.append(xform_op)
-                    pass
-                else:  # first_rotate_op_type == UsdGeom.XformOp.TypeRotateXYZ and all else
-                    carb.log_error(f"Failed to determine rotation order {first_rotate_op_type}")
-
-                # Set scale
-                precision = UsdGeom.XformOp.PrecisionFloat
-                found, xform_op, precision = find_or_add(UsdGeom.XformOp.TypeScale, True, precision)
-                if found:
-                    self._set_value_with_precision(xform_op, Gf.Vec3f(scale), time_code, skip_equal_set_for_timesample)
-                    new_xform_ops.append(xform_op)
-
-                # Set inverse pivot
-                if has_pivot:
-                    # Assume the last xformOps is the pivot
-                    new_xform_ops.append(xform_ops[-1])
-
-                xform.SetXformOpOrder(new_xform_ops, xform.GetResetXformStack())
-
-        carb.profiler.begin(1, "Sdf.EndChangeBlock()")
-        # Calling EndChangeBlock will trigger pending USD notices to be sent out.
+        # Closing the change block will trigger pending USD notices to be sent out.
         # All USD notice handler will spend time in here.
         # In this case it takes half of the function time (~0.4ms at the time of this profiling)
-        Sdf.EndChangeBlock()
-        carb.profiler.end(1)
+        with Sdf.ChangeBlock():
+            _author_transform_srt(
+                stage,
+                xform_ops,
+                translation,
+                rotation_euler,
+                rotation_order,
+                scale,
+                time_code,
+                skip_equal_set_for_timesample,
+            )
 
     def _clear_transform_at_time(self, time_code: Usd.TimeCode):
-        if time_code.IsDefault():
-            return
-        stage = self._usd_context.get_stage()
-        prim = stage.GetPrimAtPath(self._path)
+        prim = self._usd_context.get_stage().GetPrimAtPath(self._path)
         if prim:
-            xform = UsdGeom.Xformable(prim)
-            for xform_op in xform.GetOrderedXformOps():
-                if self._has_time_sample(xform_op, time_code):
-                    xform_op.GetAttr().ClearAtTime(time_code)
+            _clear_transform_at_time(UsdGeom.Xformable(prim), time_code)
 
     def _switch_edit_tgt(self):
         stage = self._usd_context.get_stage()
-        def_layer, prim_spec = omni.usd.find_spec_on_session_or_its_sublayers(stage, self._path)
-        if not prim_spec or not def_layer:
-            return Usd.EditContext(stage)
-
-        if prim_spec.specifier == Sdf.SpecifierDef:
-            return Usd.EditContext(stage, Usd.EditTarget(def_layer))
-        else:
-            return Usd.EditContext(stage)
+        return Usd.EditContext(stage, _get_transform_edit_target(stage, self._path))
 
     def do(self):
         with self._switch_edit_tgt() as context:
@@ -2257,40 +2169,221 @@ class TransformPrimSRTCommand(omni.kit.commands.Command):
             else:
                 self._clear_transform_at_time(self._time_code)
 
+    def can_merge(self, other):
+        return (
+            type(other) is type(self)
+            and other._path == self._path
+            and other._time_code == self._time_code
+            and other._usd_context is self._usd_context
+        )
+
+    def merge(self, other):
+        # Keep the old values of this command so undo restores the transform before the first edit.
+        self._new_translation = other._new_translation
+        self._new_rotation_euler = other._new_rotation_euler
+        self._new_rotation_order = other._new_rotation_order
+        self._new_scale = other._new_scale
+
 
 class TransformPrimsCommand(omni.kit.commands.Command):
     """
     Transform multiple primitives undoable **Command**.
 
-    Undo/Redo grouping handled automatically.
+    All the transforms are authored in a single change block, with the xformOps of each prim resolved once.
 
     Args:
-        prims_to_transform: List of primitive to transform in a tuple of (path, new_transform, old_transform).
+        prims_to_transform: List of primitive to transform in a tuple of
+                            (path, new_transform, old_transform, time_code, had_transform_at_key).
+                            Set old_transform to None to use current transform.
+        usd_context_name (str): Usd context name to run the command on.
     """
 
-    def __init__(self, prims_to_transform: List[Tuple[str, Gf.Matrix4d, Gf.Matrix4d, Usd.TimeCode]]):
-        self._prims_to_transform = prims_to_transform.copy()
+    def __init__(
+        self,
+        prims_to_transform: List[Tuple[str, Gf.Matrix4d, Gf.Matrix4d, Usd.TimeCode, bool]],
+        usd_context_name: str = "",
+    ):
+        self._usd_context = omni.usd.get_context(usd_context_name)
+        stage = self._usd_context.get_stage()
+        self._paths = []
+        self._new_transform_matrices = []
+        self._old_transform_matrices = []
+        self._time_codes = []
+        self._had_transforms_at_key = []
+        for path, new_transform_matrix, old_transform_matrix, time_code, had_transform_at_key in prims_to_transform:
+            if old_transform_matrix is None:
+                xformable = UsdGeom.Xformable(stage.GetPrimAtPath(path))
+                old_transform_matrix = xformable.GetLocalTransformation(time_code)
+            self._paths.append(str(path))
+            self._new_transform_matrices.append(new_transform_matrix)
+            self._old_transform_matrices.append(old_transform_matrix)
+            self._time_codes.append(time_code)
+            self._had_transforms_at_key.append(had_transform_at_key)
+
+    def _author(self, matrices, undo):
+        stage = self._usd_context.get_stage()
+
+        def prepare(i, prim):
+            time_code = self._time_codes[i]
+            if undo and not time_code.IsDefault() and not self._had_transforms_at_key[i]:
+                xform = UsdGeom.Xformable(prim)
+                if _xform_is_time_sampled(xform):
+                    return lambda: _clear_transform_at_time(xform, time_code)
+
+            xform_ops = _resolve_matrix_xform_ops(prim)
+            return lambda: _author_transform_matrix(stage, xform_ops, matrices[i], time_code, True)
+
+        _author_transforms(stage, self._paths, prepare)
 
     def do(self):
-        for p in self._prims_to_transform:
-            omni.kit.commands.execute(
-                "TransformPrim",
-                path=p[0],
-                new_transform_matrix=p[1],
-                old_transform_matrix=p[2],
-                time_code=p[3],
-                had_transform_at_key=p[4],
+        self._author(self._new_transform_matrices, False)
+
+    def undo(self):
+        # Same as TransformPrimCommand, the resolved transforms are restored, not the original xformOps
+        self._author(self._old_transform_matrices, True)
+
+
+class TransformMultiPrimsSRTCommand(omni.kit.commands.Command):
+    """
+    Transform multiple primitives undoable **Command**.
+
+    The xformOps of each prim are resolved once and all the transforms are authored in a single change block. Only the
+    values are kept for undo, so the command stays small for large numbers of prims.
+
+    Values are given per prim, as sequences of Gf vectors or arrays of shape (number of prims, 3), e.g. NumPy arrays.
+
+    Args:
+        paths (List[str]): Prim paths.
+        new_translations: New local translations.
+        new_rotation_eulers: New local rotation euler angles (in degree).
+        new_rotation_orders: New rotation orders (e.g. (0, 1, 2) means XYZ). Leave to None to stay the same.
+        new_scales: New scales.
+        old_translations: Old local translations. Leave to None to use current values.
+        old_rotation_eulers: Old local rotation euler angles. Leave to None to use current values.
+        old_rotation_orders: Old local rotation orders. Leave to None to use current values.
+        old_scales: Old scales. Leave to None to use current values.
+        time_code (Usd.TimeCode): TimeCode to set transforms to.
+        had_transform_at_key (bool): If there's key for transfroms.
+        usd_context_name (str): Usd context name to run the command on.
+    """
+
+    def __init__(
+        self,
+        paths: List[Union[str, Sdf.Path]],
+        new_translations: Sequence[Gf.Vec3d] = None,
+        new_rotation_eulers: Sequence[Gf.Vec3d] = None,
+        new_rotation_orders: Sequence[Gf.Vec3i] = None,
+        new_scales: Sequence[Gf.Vec3d] = None,
+        old_translations: Sequence[Gf.Vec3d] = None,
+        old_rotation_eulers: Sequence[Gf.Vec3d] = None,
+        old_rotation_orders: Sequence[Gf.Vec3i] = None,
+        old_scales: Sequence[Gf.Vec3d] = None,
+        time_code: Usd.TimeCode = Usd.TimeCode.Default(),
+        had_transform_at_key: bool = False,
+        usd_context_name: str = "",
+    ):
+        self._init_transforms(
+            usd_context_name,
+            paths,
+            [time_code] * len(paths),
+            [had_transform_at_key] * len(paths),
+            [new_translations, new_rotation_eulers, new_rotation_orders, new_scales],
+            [old_translations, old_rotation_eulers, old_rotation_orders, old_scales],
+        )
+
+    def _init_transforms(self, usd_context_name, paths, time_codes, had_transforms_at_key, new_values, old_values):
+        # new_values and old_values are the lists of translations, rotation eulers, rotation orders and scales
+        self._settings = carb.settings.get_settings()
+        self._usd_context = omni.usd.get_context(usd_context_name)
+        self._paths = [str(path) for path in paths]
+        self._time_codes = time_codes
+        self._had_transforms_at_key = had_transforms_at_key
+
+        count = len(self._paths)
+        converters = [_to_vec3d, _to_vec3d, _to_vec3i, _to_vec3d]
+        columns = []
+        for values, convert in zip(new_values + old_values, converters + converters):
+            if values is None:
+                columns.append([None] * count)
+            else:
+                columns.append([None if value is None else convert(value) for value in values])
+        new_columns = columns[:4]
+        old_columns = columns[4:]
+
+        stage = self._usd_context.get_stage()
+        for i, path in enumerate(self._paths):
+            if all(column[i] is not None for column in old_columns):
+                continue
+            prim = stage.GetPrimAtPath(path)
+            if not prim:
+                carb.log_error(f"Invalid prim path to transform {path}")
+                continue
+            scale, rotation_euler, rotation_order, translation = omni.usd.get_local_transform_SRT(prim, time_codes[i])
+            for column, value in zip(old_columns, [translation, rotation_euler, rotation_order, scale]):
+                if column[i] is None:
+                    column[i] = value
+
+        for new_column, old_column in zip(new_columns, old_columns):
+            for i, value in enumerate(new_column):
+                if value is None:
+                    new_column[i] = old_column[i]
+
+        self._new_translations, self._new_rotation_eulers, self._new_rotation_orders, self._new_scales = new_columns
+        self._old_translations, self._old_rotation_eulers, self._old_rotation_orders, self._old_scales = old_columns
+
+    def _author(self, translations, rotation_eulers, rotation_orders, scales, undo):
+        stage = self._usd_context.get_stage()
+
+        def prepare(i, prim):
+            if any(values[i] is None for values in (translations, rotation_eulers, rotation_orders, scales)):
+                # prim which didn't exist when the command was created
+                return None
+
+            time_code = self._time_codes[i]
+            if undo and not time_code.IsDefault() and not self._had_transforms_at_key[i]:
+                xform = UsdGeom.Xformable(prim)
+                if _xform_is_time_sampled(xform):
+                    return lambda: _clear_transform_at_time(xform, time_code)
+
+            xform_ops = _resolve_srt_xform_ops(prim, rotation_orders[i], self._settings)
+            return lambda: _author_transform_srt(
+                stage, xform_ops, translations[i], rotation_eulers[i], rotation_orders[i], scales[i], time_code, True
             )
 
+        _author_transforms(stage, self._paths, prepare)
+
+    def do(self):
+        self._author(
+            self._new_translations, self._new_rotation_eulers, self._new_rotation_orders, self._new_scales, False
+        )
+
     def undo(self):
-        pass
+        # Same as TransformPrimSRTCommand, the resolved transforms are restored, not the original xformOps
+        self._author(
+            self._old_translations, self._old_rotation_eulers, self._old_rotation_orders, self._old_scales, True
+        )
+
+    def can_merge(self, other):
+        return (
+            type(other) is type(self)
+            and other._paths == self._paths
+            and other._time_codes == self._time_codes
+            and other._usd_context is self._usd_context
+        )
 
+    def merge(self, other):
+        # Keep the old values of this command so undo restores the transforms before the first edit.
+        self._new_translations = other._new_translations
+        self._new_rotation_eulers = other._new_rotation_eulers
+        self._new_rotation_orders = other._new_rotation_orders
+        self._new_scales = other._new_scales
 
-class TransformPrimsSRTCommand(omni.kit.commands.Command):
+
+class TransformPrimsSRTCommand(TransformMultiPrimsSRTCommand):
     """
     Transform multiple primitives undoable **Command**.
 
-    Undo/Redo grouping handled automatically.
+    Same as :class:`TransformMultiPrimsSRTCommand`, with the values of each prim given in a tuple.
 
     Args:
         prims_to_transform: List of primitive to transform in a tuple of
@@ -2305,6 +2398,7 @@ class TransformPrimsSRTCommand(omni.kit.commands.Command):
                             old_scale,
                             time_code,
                             had_transform_at_key).
+        usd_context_name (str): Usd context name to run the command on.
     """
 
     def __init__(
@@ -2314,28 +2408,17 @@ class TransformPrimsSRTCommand(omni.kit.commands.Command):
                 str, Gf.Vec3d, Gf.Vec3d, Gf.Vec3i, Gf.Vec3d, Gf.Vec3d, Gf.Vec3d, Gf.Vec3i, Gf.Vec3d, Usd.TimeCode, bool
             ]
         ],
+        usd_context_name: str = "",
     ):
-        self._prims_to_transform = prims_to_transform.copy()
-
-    def do(self):
-        for p in self._prims_to_transform:
-            omni.kit.commands.execute(
-                "TransformPrimSRT",
-                path=p[0],
-                new_translation=p[1],
-                new_rotation_euler=p[2],
-                new_rotation_order=p[3],
-                new_scale=p[4],
-                old_translation=p[5],
-                old_rotation_euler=p[6],
-                old_rotation_order=p[7],
-                old_scale=p[8],
-                time_code=p[9],
-                had_transform_at_key=p[10],
-            )
-
-    def undo(self):
-        pass
+        columns = list(zip(*prims_to_transform)) if prims_to_transform else [()] * 11
+        self._init_transforms(
+            usd_context_name,
+            columns[0],
+            list(columns[9]),
+            list(columns[10]),
+            list(columns[1:5]),
+            list(columns[5:9]),
+        )
 
 
 class FramePrimsCommand(omni.kit.commands.Command):
@@ -2757,10 +2840,14 @@ class MovePrimCommand(omni.kit.commands.Command):
     # This is currenlty targeted at Viewports only, but a separate event/extension/registry might be better
     # to allow aribtrary extensions to handle a rename event.
     class RenameHandler:
-        def __init__(self, old_path: Sdf.Path):
-            """Cache all objects that reference the old_path, before any rename occurs"""
+        def __init__(self, old_path: Union[Sdf.Path, List[Sdf.Path]]):
+            """Cache all objects that reference the old_path (or any of the old paths), before any rename occurs"""
             self.__new_vp_apis = []
             self.__legacy_vp_windows = []
+            old_paths = old_path if isinstance(old_path, list) else [old_path]
+
+            def has_prefix(path: Sdf.Path):
+                return any(path.HasPrefix(old_path) for old_path in old_paths)
 
             # Try on new Viewport if loaded
             try:
@@ -2768,7 +2855,7 @@ class MovePrimCommand(omni.kit.commands.Command):
 
                 for instance in ViewportWidget.get_instances():
                     viewport_api = instance.viewport_api
-                    if viewport_api and viewport_api.camera_path.HasPrefix(old_path):
+                    if viewport_api and has_prefix(viewport_api.camera_path):
                         self.__new_vp_apis.append(viewport_api)
             except (ImportError, ModuleNotFoundError):
                 pass
@@ -2781,7 +2868,7 @@ class MovePrimCommand(omni.kit.commands.Command):
                 # Convert to string for comparison once
                 for viewport_handle in vp_iface.get_instance_list():
                     vp_window = vp_iface.get_viewport_window(viewport_handle)
-                    if Sdf.Path(vp_window.get_active_camera() if vp_window else "").HasPrefix(old_path):
+                    if has_prefix(Sdf.Path(vp_window.get_active_camera() if vp_window else "")):
                         self.__legacy_vp_windows.append(vp_window)
             except (ImportError, ModuleNotFoundError):
                 pass
@@ -2789,6 +2876,8 @@ class MovePrimCommand(omni.kit.commands.Command):
         def apply_change(self, old_path: Sdf.Path, new_path: Sdf.Path):
             # New viewport takes the Sdf.Path natively
             for viewport_api in self.__new_vp_apis:
+                if not viewport_api.camera_path.HasPrefix(old_path):
+                    continue
                 try:
                     viewport_api.camera_path = viewport_api.camera_path.ReplacePrefix(old_path, new_path)
                 except:
@@ -2798,7 +2887,10 @@ class MovePrimCommand(omni.kit.commands.Command):
             new_path_str = str(new_path)
             for vp_window in self.__legacy_vp_windows:
                 try:
-                    vp_window_path = Sdf.Path(vp_window.get_active_camera()).ReplacePrefix(old_path, new_path)
+                    vp_window_path = Sdf.Path(vp_window.get_active_camera())
+                    if not vp_window_path.HasPrefix(old_path):
+                        continue
+                    vp_window_path = vp_window_path.ReplacePrefix(old_path, new_path)
                     vp_window.set_active_camera(vp_window_path.pathString)
                 except:
                     carb.log_warn("Failure in legacy Viewport set_active_camera")
@@ -2950,6 +3042,9 @@ class MovePrimCommand(omni.kit.commands.Command):
                     except:
                         carb.log_warn("error in MovePrimCommand on_move_fn")
 
+    def get_memory_footprint(self) -> int:
+        return self._delete_command.get_memory_footprint() if self._delete_command else 0
+
     def do(self):
         carb.log_info(f"Moving prim from {self._path_from} to {self._path_to}")
         self._move(self._path_from, self._path_to, False)
@@ -2960,10 +3055,134 @@ class MovePrimCommand(omni.kit.commands.Command):
             self._move(self._path_to, self._path_from, True)
 
 
+_LIST_OP_ITEM_FIELDS = (
+    "explicitItems",
+    "addedItems",
+    "prependedItems",
+    "appendedItems",
+    "deletedItems",
+    "orderedItems",
+)
+
+
+def _remap_path(path: Sdf.Path, path_remap: Dict[Sdf.Path, Sdf.Path]) -> Optional[Sdf.Path]:
+    """Returns path with its longest prefix found in path_remap replaced, or None if none of its prefixes moved."""
+    for prefix in reversed(path.GetPrefixes()):
+        new_prefix = path_remap.get(prefix)
+        if new_prefix is not None:
+            return path.ReplacePrefix(prefix, new_prefix)
+    return None
+
+
+def _remap_internal_arc(arc: Union[Sdf.Reference, Sdf.Payload], path_remap: Dict[Sdf.Path, Sdf.Path]):
+    if arc.assetPath or arc.primPath.isEmpty:
+        return None
+    prim_path = _remap_path(arc.primPath, path_remap)
+    if prim_path is None:
+        return None
+    if isinstance(arc, Sdf.Reference):
+        return Sdf.Reference(arc.assetPath, prim_path, arc.layerOffset, arc.customData)
+    return Sdf.Payload(arc.assetPath, prim_path, arc.layerOffset)
+
+
+def _remap_list_editor(spec: Sdf.Spec, field: str, list_editor_name: str, remap_item: Callable):
+    """Replaces the items of the list edits of field that remap_item remaps, in all the lists they are in."""
+    if not spec.HasInfo(field):
+        return
+
+    list_op = spec.GetInfo(field)
+    new_items = {}
+    for list_field in _LIST_OP_ITEM_FIELDS:
+        for item in getattr(list_op, list_field):
+            if item not in new_items:
+                new_items[item] = remap_item(item)
+
+    list_editor = None
+    for item, new_item in new_items.items():
+        if new_item is not None:
+            list_editor = list_editor or getattr(spec, list_editor_name)
+            list_editor.ReplaceItemEdits(item, new_item)
+
+
+# Up to this many moves per layer are retargeted with one native omni.usd.resolve_prim_path_references call each,
+# more with a single Python traversal of the layer.
+_NATIVE_RESOLVE_MAX_MOVES = 4
+
+
+def _can_resolve_natively(path_remap: Dict[Sdf.Path, Sdf.Path]) -> bool:
+    """Whether the moves of path_remap can be retargeted one after the other, i.e. no move retargets the paths
+    already retargeted by another one, as in a swap or a chain of moves."""
+    if len(path_remap) > _NATIVE_RESOLVE_MAX_MOVES:
+        return False
+    return not any(
+        path_from.HasPrefix(path_to) or path_to.HasPrefix(path_from)
+        for path_to in path_remap.values()
+        for path_from in path_remap
+    )
+
+
+def _resolve_prim_paths_references(layer: Sdf.Layer, path_remap: Dict[Sdf.Path, Sdf.Path]):
+    """
+    Retargets the relationships, connections, inherits, specializes, internal references and internal payloads of
+    layer to the moved prims, including the ones authored in variants. A few moves are retargeted with
+    omni.usd.resolve_prim_path_references, many moves in a single traversal of the layer.
+    """
+    if not path_remap:
+        return
+
+    if _can_resolve_natively(path_remap):
+        for path_from, path_to in path_remap.items():
+            omni.usd.resolve_prim_path_references(layer.identifier, path_from.pathString, path_to.pathString)
+        return
+
+    spec_paths = []
+    layer.Traverse(Sdf.Path.absoluteRootPath, spec_paths.append)
+
+    def remap_path(path):
+        return _remap_path(path, path_remap)
+
+    def remap_arc(arc):
+        return _remap_internal_arc(arc, path_remap)
+
+    for spec_path in spec_paths:
+        if spec_path.IsPropertyPath():
+            spec = layer.GetPropertyAtPath(spec_path)
+            if isinstance(spec, Sdf.RelationshipSpec):
+                _remap_list_editor(spec, "targetPaths", "targetPathList", remap_path)
+            else:
+                _remap_list_editor(spec, "connectionPaths", "connectionPathList", remap_path)
+        elif spec_path.IsPrimPath() or spec_path.IsPrimVariantSelectionPath():
+            # the specs of variant sets have no list edits, the specs of their variants do
+            spec = layer.GetPrimAtPath(spec_path)
+            if not spec:
+                continue
+            _remap_list_editor(spec, "inheritPaths", "inheritPathList", remap_path)
+            _remap_list_editor(spec, "specializes", "specializesList", remap_path)
+            _remap_list_editor(spec, "references", "referenceList", remap_arc)
+            _remap_list_editor(spec, "payload", "payloadList", remap_arc)
+
+
+def _apply_prim_spec_move(layer: Sdf.Layer, path_from: Sdf.Path, path_to: Sdf.Path, index: int = -1) -> bool:
+    Sdf.CreatePrimInLayer(layer, path_to.GetParentPath())
+    edit = Sdf.BatchNamespaceEdit()
+    edit.Add(path_from, path_to, index)
+    return layer.Apply(edit)
+
+
 class MovePrimsCommand(omni.kit.commands.Command):
     """
     Move primitives undoable **Command**.
 
+    The prims are moved as one batch: their specs are moved in a single change block, the viewports following them
+    are looked up once, the path references of each changed layer are retargeted in a single traversal and the world
+    transforms are kept with a single transform cache. Prims which can only be moved by stitching their prim specs
+    into the edit target (non destructive move), and batches where a prim is moved under the destination of an
+    earlier move, are moved one by one by :class:`MovePrimCommand`.
+
+    The prims are not moved by executing "MovePrim" commands, so callbacks registered for "MovePrim" are not called
+    and no "MovePrim" entries are added to the command history or journal. Register callbacks for "MovePrims" to be
+    notified of these moves.
+
     Args:
         paths_to_move Dict[str, str]: dictionary contaning entry of path_from : path_to.
         time_code(Usd.TimeCode): Current timecode of the stage.
@@ -2985,21 +3204,318 @@ class MovePrimsCommand(omni.kit.commands.Command):
         self._keep_world_transform = keep_world_transform
         self._on_move_fn = on_move_fn
         self._destructive = destructive
+        self._usd_context = omni.usd.get_context()
+        self._selection = self._usd_context.get_selection()
+        # (path from, path to) of the prims moved in batch, in order
+        self._moves = []
+        # (layer identifier, path from, path to, index under the parent before the move) of the moved prim specs
+        self._spec_moves = []
+        # MovePrimCommand of the prims moved one by one
+        self._move_commands = []
+
+    def _is_chained(self) -> bool:
+        """True if a prim is moved from the destination of an earlier move, which has to be moved first."""
+        destination_prefixes = set()
+        for path_from, path_to in self._paths_to_move.items():
+            if Sdf.Path(path_from) in destination_prefixes:
+                return True
+            if Sdf.Path.IsValidPathString(str(path_to)):
+                destination_prefixes.update(Sdf.Path(path_to).GetPrefixes())
+        return False
+
+    def _plan_moves(self, stage: Usd.Stage) -> Tuple[List[Tuple[Sdf.Path, Sdf.Path]], List[Tuple[Sdf.Path, Sdf.Path]]]:
+        """Validates the moves like MovePrimCommand does and finds their free destination.
+
+        Returns the moves of the batch and the moves which need to stitch prim specs.
+        """
+        moves = []
+        stitch_moves = []
+        moved_paths = set()
+        # paths of the prims moved away by the batch before the current move, free again at that point
+        vacated_paths = set()
+        # parent path -> names of the destinations taken by the batch, which are not on the stage yet
+        taken_names = {}
+        for path_from, path_to in self._paths_to_move.items():
+            path_from = Sdf.Path(path_from)
+            path_to = str(path_to)
+            if not Sdf.Path.IsValidPathString(path_to):
+                carb.log_error(f"Invalid path: {path_to}")
+                continue
+
+            # Prims under a prim moved earlier in the batch went away with it
+            if any(prefix in moved_paths for prefix in path_from.GetPrefixes()):
+                continue
+            prim = stage.GetPrimAtPath(path_from)
+            if not prim:
+                continue
+
+            if Sdf.Path(path_to) in vacated_paths:
+                path_to = Sdf.Path(path_to)
+            else:
+                path_to = Sdf.Path(omni.usd.get_stage_next_free_path(stage, path_to, False))
+            names = taken_names.setdefault(path_to.GetParentPath(), set())
+            if path_to.name in names:
+                free_paths = omni.usd.get_stage_next_free_paths(stage, path_to, len(names) + 1, False)
+                path_to = next(Sdf.Path(path) for path in free_paths if Sdf.Path(path).name not in names)
+
+            if prim.IsA(UsdGeom.Gprim) and omni.usd.is_ancestor_prim_type(stage, path_to, UsdGeom.Gprim):
+                post_notification(f"Cannot move prim {path_from} to {path_to} as nested gprims are not supported.")
+                continue
+
+            if omni.usd.editor.is_no_delete(prim):
+                error = f"{str(path_from)} is not deletable"
+                carb.log_error(error)
+                post_notification(error)
+                continue
+
+            if omni.usd.check_ancestral(prim):
+                error = f"Cannot move/rename ancestral prim {str(path_from)}"
+                carb.log_error(error)
+                post_notification(error)
+                continue
+
+            prim_to_parent = stage.GetPrimAtPath(path_to.GetParentPath())
+            if prim_to_parent and (prim_to_parent.IsInstance() or prim_to_parent.IsInstanceProxy()):
+                error = f"{str(path_from)} cannot be moved under an instance or instance proxy."
+                post_notification(error)
+                continue
+
+            names.add(path_to.name)
+            moved_paths.add(path_from)
+            if self._destructive or prim_can_be_removed_without_destruction(self._usd_context, path_from):
+                moves.append((path_from, path_to))
+                vacated_paths.add(path_from)
+            else:
+                stitch_moves.append((path_from, path_to))
+
+        return moves, stitch_moves
+
+    def _get_auto_authoring_layer(self, layer_stack: List[Sdf.Layer]) -> Optional[Sdf.Layer]:
+        try:
+            import omni.kit.usd.layers as layers
+
+            auto_authoring = layers.get_auto_authoring(self._usd_context)
+            for layer in layer_stack:
+                if auto_authoring.is_auto_authoring_layer(layer.identifier):
+                    return layer
+        except Exception:
+            pass
+        return None
+
+    def _get_world_matrices(
+        self, stage: Usd.Stage, moves: List[Tuple[Sdf.Path, Sdf.Path]]
+    ) -> Dict[Sdf.Path, Gf.Matrix4d]:
+        """World matrices of the Xformable subtrees of the prims changing parent, by their path after the move."""
+        world_matrices = {}
+        if not self._keep_world_transform:
+            return world_matrices
+
+        # One cache for all the prims, the transforms of their common ancestors are computed once
+        xform_cache = UsdGeom.XformCache(self._time_code)
+        for path_from, path_to in moves:
+            if path_from.GetParentPath() == path_to.GetParentPath():
+                continue
+
+            # The moved prim might not be an Xformable (i.e. Scope), in this case, we need to find the subtrees of
+            # this prim whose root are Xformable (handle nested Scope) and pin their transform.
+            prim_range_it = iter(Usd.PrimRange(stage.GetPrimAtPath(path_from)))
+            for sub_prim in prim_range_it:
+                if sub_prim.IsA(UsdGeom.Xformable):
+                    new_path = sub_prim.GetPath().ReplacePrefix(path_from, path_to)
+                    world_matrices[new_path] = xform_cache.GetLocalToWorldTransform(sub_prim)
+                    prim_range_it.PruneChildren()
+
+        return world_matrices
+
+    def _keep_world_matrices(self, stage: Usd.Stage, world_matrices: Dict[Sdf.Path, Gf.Matrix4d]):
+        xform_cache = UsdGeom.XformCache(self._time_code)
+
+        def get_parent_world_matrix(prim):
+            # An ancestor kept in place will have its old world matrix once its new local transform is authored
+            local_matrices = []
+            parent = prim.GetParent()
+            while parent and not parent.IsPseudoRoot():
+                world_mtx = world_matrices.get(parent.GetPath())
+                if world_mtx is not None:
+                    for local_mtx in reversed(local_matrices):
+                        world_mtx = local_mtx * world_mtx
+                    return world_mtx
+                local_mtx, resets_xform_stack = xform_cache.GetLocalTransformation(parent)
+                if resets_xform_stack:
+                    break
+                local_matrices.append(local_mtx)
+                parent = parent.GetParent()
+            return xform_cache.GetParentToWorldTransform(prim)
+
+        paths = []
+        new_local_matrices = []
+        for path, world_mtx in world_matrices.items():
+            prim = stage.GetPrimAtPath(path)
+            if not prim:
+                continue
+
+            new_local_mtx = world_mtx * get_parent_world_matrix(prim).GetInverse()
+            if not Gf.IsClose(new_local_mtx, omni.usd.get_local_transform_matrix(prim, self._time_code), 1e-2):
+                paths.append(path.pathString)
+                new_local_matrices.append(new_local_mtx)
+
+        # It will author the new transforms on CURRENT edit target. If an transfrom exists on a layer with stronger
+        # opinion, prim xfrom will NOT keep in place.
+        def prepare(index, prim):
+            xform_ops = _resolve_matrix_xform_ops(prim)
+            return lambda: _author_transform_matrix(
+                stage, xform_ops, new_local_matrices[index], self._time_code, True
+            )
+
+        _author_transforms(stage, paths, prepare)
+
+    @Trace.TraceFunction
+    def _move(self, stage: Usd.Stage, moves: List[Tuple[Sdf.Path, Sdf.Path]], move_prim_specs: Callable) -> List:
+        """Moves the prims with move_prim_specs, which moves their specs and returns the moves that succeeded with
+        the path remap of each changed layer. Returns the moves that succeeded."""
+        if not moves:
+            return []
+
+        # Get all of the objects that need to know about the path changes
+        rename_handler = MovePrimCommand.RenameHandler([path_from for path_from, _ in moves])
+        world_matrices = self._get_world_matrices(stage, moves)
+        default_prim = stage.GetDefaultPrim()
+        default_prim_path = default_prim.GetPath() if default_prim else None
+        selected_paths = self._selection.get_selected_prim_paths()
+
+        with Sdf.ChangeBlock():
+            moves, path_remaps = move_prim_specs()
+            for layer, path_remap in path_remaps.items():
+                _resolve_prim_paths_references(layer, path_remap)
+
+        for path_from, path_to in moves:
+            rename_handler.apply_change(path_from, path_to)
+
+        if world_matrices:
+            self._keep_world_matrices(stage, world_matrices)
+
+        new_paths = {path_from.pathString: path_to.pathString for path_from, path_to in moves}
+        if any(path in new_paths for path in selected_paths):
+            self._selection.set_selected_prim_paths([new_paths.get(path, path) for path in selected_paths], True)
+        if default_prim_path and default_prim_path.pathString in new_paths:
+            stage.SetDefaultPrim(stage.GetPrimAtPath(new_paths[default_prim_path.pathString]))
+        if self._on_move_fn:
+            for path_from, path_to in moves:
+                try:
+                    self._on_move_fn(path_from, path_to)
+                except:
+                    carb.log_warn("error in MovePrimsCommand on_move_fn")
+
+        return moves
+
+    def _move_in_batch(self, stage: Usd.Stage, moves: List[Tuple[Sdf.Path, Sdf.Path]]):
+        layer_stack = stage.GetLayerStack()
+        auto_authoring_layer = self._get_auto_authoring_layer(layer_stack)
+        layer_stack = set(layer_stack)
+        # Only move from layers in the stage, the prim stacks are taken before any spec moves
+        prim_stack_layers = [
+            [prim_spec.layer for prim_spec in stage.GetPrimAtPath(path_from).GetPrimStack()] for path_from, _ in moves
+        ]
+
+        self._spec_moves = []
+
+        def move_prim_specs():
+            moved = []
+            path_remaps = {}
+            for (path_from, path_to), layers in zip(moves, prim_stack_layers):
+                # Clean up copy inside auto-authoring firstly
+                if auto_authoring_layer:
+                    remove_prim_spec(auto_authoring_layer, path_from)
+
+                success = False
+                for layer in layers:
+                    if layer not in layer_stack:
+                        continue
+                    prim_spec = layer.GetPrimAtPath(path_from)
+                    if not prim_spec:
+                        continue
+
+                    # Each layer may have different children order. Store them separately to keep the order on undo.
+                    index = prim_spec.realNameParent.nameChildren.index(path_from.name)
+                    if _apply_prim_spec_move(layer, path_from, path_to):
+                        self._spec_moves.append((layer.identifier, path_from, path_to, index))
+                        path_remaps.setdefault(layer, {})[path_from] = path_to
+                        success = True
+
+                if success:
+                    moved.append((path_from, path_to))
+
+            return moved, path_remaps
+
+        self._moves = self._move(stage, moves, move_prim_specs)
+
+    def _undo_move_in_batch(self, stage: Usd.Stage):
+        moves = [(path_to, path_from) for path_from, path_to in reversed(self._moves)]
+        auto_authoring_layer = self._get_auto_authoring_layer(stage.GetLayerStack())
+
+        def move_prim_specs():
+            if auto_authoring_layer:
+                for path_from, _ in moves:
+                    remove_prim_spec(auto_authoring_layer, path_from)
+
+            path_remaps = {}
+            for layer_identifier, path_from, path_to, index in reversed(self._spec_moves):
+                layer = Sdf.Find(layer_identifier)
+                if layer and _apply_prim_spec_move(layer, path_to, path_from, index):
+                    path_remaps.setdefault(layer, {})[path_to] = path_from
+
+            return moves, path_remaps
+
+        self._move(stage, moves, move_prim_specs)
+        self._moves = []
+        self._spec_moves = []
 
     def do(self):
-        for src, dst in self._paths_to_move.items():
-            omni.kit.commands.execute(
-                "MovePrim",
-                path_from=src,
-                path_to=dst,
+        stage = self._usd_context.get_stage()
+        if self._is_chained():
+            # Each command finds its free destination when created, after the previous moves
+            self._move_commands = []
+            for path_from, path_to in self._paths_to_move.items():
+                command = MovePrimCommand(
+                    path_from=path_from,
+                    path_to=path_to,
+                    time_code=self._time_code,
+                    keep_world_transform=self._keep_world_transform,
+                    on_move_fn=self._on_move_fn,
+                    destructive=self._destructive,
+                )
+                command.do()
+                self._move_commands.append(command)
+            return
+
+        moves, stitch_moves = self._plan_moves(stage)
+        carb.log_info(f"Moving {len(moves) + len(stitch_moves)} prims")
+        self._move_in_batch(stage, moves)
+
+        self._move_commands = []
+        for path_from, path_to in stitch_moves:
+            command = MovePrimCommand(
+                path_from=path_from,
+                path_to=path_to,
                 time_code=self._time_code,
                 keep_world_transform=self._keep_world_transform,
                 on_move_fn=self._on_move_fn,
-                destructive=self._destructive,
+                destructive=False,
             )
+            command.do()
+            self._move_commands.append(command)
 
     def undo(self):
-        pass
+        for command in reversed(self._move_commands):
+            command.undo()
+        self._move_commands = []
+
+        if self._moves:
+            carb.log_info(f"Undo Move of {len(self._moves)} prims")
+            self._undo_move_in_batch(self._usd_context.get_stage())
+
+    def get_memory_footprint(self) -> int:
+        return sum(command.get_memory_footprint() for command in self._move_commands)
 
 
 class ReplaceReferencesCommand(omni.kit.commands.Command):
@@ -3281,6 +3797,22 @@ class ChangePropertyCommand(omni.kit.commands.Command):
                 )
                 omni.usd.set_prop_val(prop, self._value, self._time_code, auto_target_layer=False)
 
+    def can_merge(self, other):
+        return (
+            type(other) is type(self)
+            and self._do_executed
+            and other._do_executed
+            and not other._new_property
+            and other._prop_path == self._prop_path
+            and other._time_code == self._time_code
+            and other._stage is self._stage
+            and other._target_layer_identifier == self._target_layer_identifier
+        )
+
+    def merge(self, other):
+        # Keep the previous value and spec flags of this command so undo reverts to the state before the first edit.
+        self._value = other._value
+
     def undo(self):
         if not self._do_executed:
             return
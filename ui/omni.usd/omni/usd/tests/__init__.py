@@ -8,3 +8,5 @@ from .test_usd_context import *
 from .test_legacy_api import *
 from .test_refinement import *
 from .test_editor_api import *
+from .test_watcher import *
+from .test_spec_change_log import *
@@ -0,0 +1,69 @@
+## Copyright (c) 2021, NVIDIA CORPORATION.  All rights reserved.
+##
+## NVIDIA CORPORATION and its licensors retain all intellectual property
+## and proprietary rights in and to this software, related documentation
+## and any modifications thereto.  Any use, reproduction, disclosure or
+## distribution of this software and related documentation without an express
+## license agreement from NVIDIA CORPORATION is strictly prohibited.
+##
+import omni.kit.test
+
+from omni.usd.commands.spec_change_log import SpecChangeLog
+from pxr import Sdf
+
+
+class TestSpecChangeLog(omni.kit.test.AsyncTestCase):
+    def _create_layer(self):
+        layer = Sdf.Layer.CreateAnonymous()
+        for path in ["/a", "/b", "/c/w", "/c/x", "/c/y/child", "/c/z", "/d", "/e"]:
+            Sdf.CreatePrimInLayer(layer, path)
+        # Paths inside a removed prim spec are restored as they were
+        relationship = Sdf.RelationshipSpec(layer.GetPrimAtPath("/c/y"), "rel")
+        relationship.targetPathList.Append("/c/y/child")
+        layer.GetPrimAtPath("/d").SetInfo("kind", "group")
+        return layer
+
+    def _assert_round_trip(self, layer, change_log):
+        expected = layer.ExportToString()
+        change_log.undo()
+        self.assertEqual(layer.ExportToString(), self._original)
+        change_log.redo()
+        self.assertEqual(layer.ExportToString(), expected)
+        change_log.undo()
+        self.assertEqual(layer.ExportToString(), self._original)
+
+    def test_remove_prim_spec(self):
+        layer = self._create_layer()
+        self._original = layer.ExportToString()
+        change_log = SpecChangeLog()
+        # Neither the first nor the last of their siblings
+        self.assertTrue(change_log.remove_prim_spec(layer, "/c/y"))
+        self.assertTrue(change_log.remove_prim_spec(layer, "/b"))
+        self.assertFalse(change_log.remove_prim_spec(layer, "/missing"))
+        self.assertFalse(layer.GetPrimAtPath("/c/y"))
+        self._assert_round_trip(layer, change_log)
+        target_paths = layer.GetRelationshipAtPath("/c/y.rel").targetPathList.appendedItems
+        self.assertEqual(list(target_paths), [Sdf.Path("/c/y/child")])
+
+    def test_remove_prim_specs(self):
+        layer = self._create_layer()
+        self._original = layer.ExportToString()
+        change_log = SpecChangeLog()
+        self.assertEqual(change_log.remove_prim_specs(layer, ["/e", "/b", "/c/y", "/c/x", "/missing"]), 4)
+        self.assertEqual([spec.name for spec in layer.rootPrims], ["a", "c", "d"])
+        self.assertEqual([spec.name for spec in layer.GetPrimAtPath("/c").nameChildren], ["w", "z"])
+        self._assert_round_trip(layer, change_log)
+
+    def test_set_info_and_create_prim_spec(self):
+        layer = self._create_layer()
+        self._original = layer.ExportToString()
+        change_log = SpecChangeLog()
+        change_log.set_info(layer, "/d", "kind", "component")
+        change_log.set_info(layer, "/a", "kind", "group")
+        change_log.set_info(layer, "/d", "kind", None)
+        change_log.create_prim_spec(layer, "/f/g/h")
+        self.assertTrue(layer.GetPrimAtPath("/f/g/h"))
+        self.assertFalse(layer.GetPrimAtPath("/d").HasInfo("kind"))
+        self._assert_round_trip(layer, change_log)
+        self.assertEqual(len(change_log), 4)
+        self.assertTrue(change_log.undone)
@@ -2,6 +2,7 @@ from cgitb import strong
 from pathlib import Path
 import carb
 from numpy import delete
+import numpy
 import omni.kit.test
 
 import omni.kit.undo
@@ -11,7 +12,7 @@ import omni.usd
 import omni.client
 import omni.client.utils as clientutils
 
-from pxr import Gf, Kind, Sdf, Usd, UsdGeom, UsdShade
+from pxr import Gf, Kind, Sdf, Tf, Usd, UsdGeom, UsdShade
 
 CURRENT_PATH = Path(__file__).parent.joinpath("data").absolute().resolve()
 
@@ -243,6 +244,39 @@ class TestUsdCommands(omni.kit.test.AsyncTestCase):
                 
                 omni.kit.undo.undo()
             
+    async def test_copy_prims_failure(self):
+        stage = omni.usd.get_context().get_stage()
+        default_prim_path = getStageDefaultPrimPath(stage)
+        cube_path = default_prim_path.AppendChild("Cube")
+        sphere_path = default_prim_path.AppendChild("Sphere")
+        UsdGeom.Cube.Define(stage, cube_path)
+        UsdGeom.Sphere.Define(stage, sphere_path)
+
+        copy_count = 0
+
+        def fail_second_copy(info):
+            nonlocal copy_count
+            copy_count += 1
+            if copy_count == 2:
+                raise RuntimeError("copy failed")
+
+        # When one of the copies fails, CopyPrims fails and none of the copies are kept
+        undo_stack_len = len(omni.kit.undo.get_undo_stack())
+        callback = omni.kit.commands.register_callback(
+            "CopyPrim", omni.kit.commands.PRE_DO_CALLBACK, fail_second_copy
+        )
+        omni.kit.commands.set_logging_enabled(False)
+        try:
+            success, _ = omni.kit.commands.execute("CopyPrims", paths_from=[str(cube_path), str(sphere_path)])
+        finally:
+            omni.kit.commands.set_logging_enabled(True)
+            omni.kit.commands.unregister_callback(callback)
+        self.assertFalse(success)
+        self.assertEqual(copy_count, 2)
+        self.assertFalse(stage.GetPrimAtPath(default_prim_path.AppendChild("Cube_01")))
+        self.assertFalse(stage.GetPrimAtPath(default_prim_path.AppendChild("Sphere_01")))
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_stack_len)
+
     async def test_delete_prims_with_multiple_sublayers(self):
         stage = omni.usd.get_context().get_stage()
         root_layer = stage.GetRootLayer()
@@ -376,6 +410,66 @@ class TestUsdCommands(omni.kit.test.AsyncTestCase):
         omni.kit.undo.redo()
         check(self.assertFalse)
 
+    async def test_delete_prims_undo_is_exact(self):
+        stage = omni.usd.get_context().get_stage()
+        layer = stage.GetRootLayer()
+        for name in ["A", "B", "C", "D"]:
+            prim = stage.DefinePrim(f"/Root/{name}", "Xform")
+            prim.CreateAttribute("value", Sdf.ValueTypeNames.Int).Set(1)
+        stage.OverridePrim("/Root/D").SetActive(True)
+        root_spec = layer.GetPrimAtPath("/Root")
+
+        omni.kit.commands.execute("DeletePrims", paths=["/Root/B", "/Root/C"])
+        self.assertListEqual(list(root_spec.nameChildren.keys()), ["A", "D"])
+
+        # Children are restored where they were, with all their properties
+        omni.kit.undo.undo()
+        self.assertListEqual(list(root_spec.nameChildren.keys()), ["A", "B", "C", "D"])
+        self.assertEqual(stage.GetPrimAtPath("/Root/C").GetAttribute("value").Get(), 1)
+
+        await omni.kit.app.get_app().next_update_async()
+        omni.kit.undo.redo()
+        self.assertListEqual(list(root_spec.nameChildren.keys()), ["A", "D"])
+        omni.kit.undo.undo()
+
+        # Removed or deactivated prim gets its previous active opinion back
+        omni.kit.commands.execute("DeletePrims", paths=["/Root/D"], destructive=False)
+        prim = stage.GetPrimAtPath("/Root/D")
+        self.assertFalse(prim and prim.IsActive())
+        omni.kit.undo.undo()
+        self.assertListEqual(list(root_spec.nameChildren.keys()), ["A", "B", "C", "D"])
+        self.assertTrue(layer.GetPrimAtPath("/Root/D").HasActive())
+        self.assertTrue(stage.GetPrimAtPath("/Root/D").IsActive())
+
+    async def test_delete_many_prims(self):
+        stage = omni.usd.get_context().get_stage()
+        layer = stage.GetRootLayer()
+        sublayer = Sdf.Layer.CreateAnonymous()
+        layer.subLayerPaths.append(sublayer.identifier)
+        names = [f"Child{i}" for i in range(20)]
+        for name in names:
+            stage.DefinePrim(f"/Root/{name}/Leaf", "Xform")
+        with Usd.EditContext(stage, sublayer):
+            stage.OverridePrim("/Root/Child3")
+        root_spec = layer.GetPrimAtPath("/Root")
+
+        # Paths out of order, with descendants of deleted prims
+        paths = [f"/Root/{name}" for name in reversed(names[1::2])] + ["/Root/Child1/Leaf", "/Root/Child2/Leaf"]
+        omni.kit.commands.execute("DeletePrims", paths=paths, destructive=False)
+        remaining_names = names[0::2]
+        self.assertListEqual(list(root_spec.nameChildren.keys()), remaining_names)
+        self.assertFalse(stage.GetPrimAtPath("/Root/Child2/Leaf"))
+        # Specs in anonymous layers are removed as well
+        self.assertFalse(sublayer.GetPrimAtPath("/Root/Child3"))
+
+        omni.kit.undo.undo()
+        self.assertListEqual(list(root_spec.nameChildren.keys()), names)
+        self.assertTrue(sublayer.GetPrimAtPath("/Root/Child3"))
+        self.assertTrue(stage.GetPrimAtPath("/Root/Child2/Leaf"))
+
+        omni.kit.undo.redo()
+        self.assertListEqual(list(root_spec.nameChildren.keys()), remaining_names)
+
     async def test_transform_prim(self):
         stage = omni.usd.get_context().get_stage()
         default_prim_path = getStageDefaultPrimPath(stage)
@@ -495,6 +589,132 @@ class TestUsdCommands(omni.kit.test.AsyncTestCase):
         self.assertTrue(Gf.IsClose(Gf.Vec3f(0), rotation_euler_6, 0.00001))
         self.assertTrue(Gf.IsClose(Gf.Vec3f(1), scale_6, 0.00001))
 
+    async def test_transform_prim_srt_merge(self):
+        stage = omni.usd.get_context().get_stage()
+        default_prim_path = getStageDefaultPrimPath(stage)
+
+        omni.kit.commands.execute("CreatePrim", prim_type="Cube", create_default_xform=False)
+        omni.kit.commands.execute("CreatePrim", prim_type="Cone", create_default_xform=False)
+        cube_path = default_prim_path.AppendChild("Cube")
+        cone_path = default_prim_path.AppendChild("Cone")
+        prim = stage.GetPrimAtPath(cube_path)
+
+        omni.kit.undo.set_undo_merge_time_window(60)
+        self.addCleanup(omni.kit.undo.set_undo_merge_time_window)
+
+        undo_stack = omni.kit.undo.get_undo_stack()
+        undo_stack_len = len(undo_stack)
+        for x in range(1, 4):
+            omni.kit.commands.execute("TransformPrimSRT", path=cube_path, new_translation=Gf.Vec3d(x, 0, 0))
+        self.assertEqual(len(undo_stack), undo_stack_len + 1)
+        command = undo_stack[-1].command
+
+        # Transforms of another prim or at another time are not merged
+        omni.kit.commands.execute("TransformPrimSRT", path=cone_path, new_translation=Gf.Vec3d(1, 0, 0))
+        self.assertEqual(len(undo_stack), undo_stack_len + 2)
+        self.assertFalse(command.can_merge(undo_stack[-1].command))
+        omni.kit.commands.execute(
+            "TransformPrimSRT", path=cube_path, new_translation=Gf.Vec3d(4, 0, 0), time_code=Usd.TimeCode(1)
+        )
+        self.assertEqual(len(undo_stack), undo_stack_len + 3)
+        self.assertFalse(command.can_merge(undo_stack[-1].command))
+
+        omni.kit.undo.undo()
+        omni.kit.undo.undo()
+        _, _, _, translation = omni.usd.get_local_transform_SRT(prim)
+        self.assertTrue(Gf.IsClose(translation, Gf.Vec3d(3, 0, 0), 0.00001))
+
+        # Undo restores the transform before the first of the merged commands, redo the last one
+        omni.kit.undo.undo()
+        self.assertTrue(Gf.IsClose(UsdGeom.Xformable(prim).GetLocalTransformation(), Gf.Matrix4d(1.0), 0.00001))
+        omni.kit.undo.redo()
+        _, _, _, translation = omni.usd.get_local_transform_SRT(prim)
+        self.assertTrue(Gf.IsClose(translation, Gf.Vec3d(3, 0, 0), 0.00001))
+
+    async def test_transform_multi_prims_srt(self):
+        stage = omni.usd.get_context().get_stage()
+        paths = [f"/Cube{i}" for i in range(3)]
+        for path in paths:
+            UsdGeom.Cube.Define(stage, path)
+
+        notice_count = 0
+
+        def on_objects_changed(notice, sender):
+            nonlocal notice_count
+            notice_count += 1
+
+        listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, on_objects_changed, stage)
+
+        # Values can be given as arrays, the xformOps are created before the values are authored
+        translations = numpy.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]], dtype=numpy.float64)
+        rotation_eulers = numpy.array([[0, 60, 0], [60, 0, 0], [0, 0, 60]], dtype=numpy.float32)
+        scales = numpy.ones((3, 3)) * 2
+        undo_count = len(omni.kit.undo.get_undo_stack())
+        omni.kit.commands.execute(
+            "TransformMultiPrimsSRT",
+            paths=paths,
+            new_translations=translations,
+            new_rotation_eulers=rotation_eulers,
+            new_scales=scales,
+        )
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_count + 1)
+        for i, path in enumerate(paths):
+            scale, rotation_euler, _, translation = omni.usd.get_local_transform_SRT(stage.GetPrimAtPath(path))
+            self.assertTrue(Gf.IsClose(Gf.Vec3d(*translations[i]), translation, 0.00001))
+            self.assertTrue(Gf.IsClose(Gf.Vec3d(*rotation_eulers[i]), rotation_euler, 0.00001))
+            self.assertTrue(Gf.IsClose(Gf.Vec3d(2), scale, 0.00001))
+
+        # Once the xformOps exist, all the values are authored in one change block
+        notice_count = 0
+        omni.kit.commands.execute(
+            "TransformPrimsSRT",
+            prims_to_transform=[
+                (path, Gf.Vec3d(i), None, None, None, None, None, None, None, Usd.TimeCode.Default(), False)
+                for i, path in enumerate(paths)
+            ],
+        )
+        self.assertEqual(notice_count, 1)
+        for i, path in enumerate(paths):
+            scale, rotation_euler, _, translation = omni.usd.get_local_transform_SRT(stage.GetPrimAtPath(path))
+            self.assertTrue(Gf.IsClose(Gf.Vec3d(i), translation, 0.00001))
+            self.assertTrue(Gf.IsClose(Gf.Vec3d(*rotation_eulers[i]), rotation_euler, 0.00001))
+
+        notice_count = 0
+        omni.kit.undo.undo()
+        self.assertEqual(notice_count, 1)
+        omni.kit.undo.undo()
+        for path in paths:
+            xformable = UsdGeom.Xformable(stage.GetPrimAtPath(path))
+            self.assertTrue(Gf.IsClose(xformable.GetLocalTransformation(), Gf.Matrix4d(1.0), 0.00001))
+
+        omni.kit.undo.redo()
+        scale, _, _, translation = omni.usd.get_local_transform_SRT(stage.GetPrimAtPath(paths[2]))
+        self.assertTrue(Gf.IsClose(Gf.Vec3d(7, 8, 9), translation, 0.00001))
+
+        listener.Revoke()
+
+    async def test_transform_prims(self):
+        stage = omni.usd.get_context().get_stage()
+        paths = [f"/Cube{i}" for i in range(3)]
+        for path in paths:
+            UsdGeom.Cube.Define(stage, path)
+
+        matrices = [Gf.Matrix4d().SetTranslate(Gf.Vec3d(i, 0, 0)) for i in range(3)]
+        omni.kit.commands.execute(
+            "TransformPrims",
+            prims_to_transform=[
+                (path, matrix, None, Usd.TimeCode.Default(), False) for path, matrix in zip(paths, matrices)
+            ],
+        )
+        for path, matrix in zip(paths, matrices):
+            xformable = UsdGeom.Xformable(stage.GetPrimAtPath(path))
+            self.assertTrue(Gf.IsClose(xformable.GetLocalTransformation(), matrix, 0.00001))
+
+        omni.kit.undo.undo()
+        for path in paths:
+            xformable = UsdGeom.Xformable(stage.GetPrimAtPath(path))
+            self.assertTrue(Gf.IsClose(xformable.GetLocalTransformation(), Gf.Matrix4d(1.0), 0.00001))
+
     async def test_move_prim_without_destruction(self):
         stage = omni.usd.get_context().get_stage()
         root_layer = stage.GetRootLayer()
@@ -859,6 +1079,116 @@ class TestUsdCommands(omni.kit.test.AsyncTestCase):
         cube_under_scope_path = scope_path.AppendChild("Cube")
         check_cube_bound(cube_under_scope_path)
 
+    async def test_move_many_prims(self):
+        stage = omni.usd.get_context().get_stage()
+        default_prim_path = getStageDefaultPrimPath(stage)
+        group_path = default_prim_path.AppendChild("Group")
+        parent_path = default_prim_path.AppendChild("Parent")
+        group = UsdGeom.Xform.Define(stage, group_path)
+        UsdGeom.XformCommonAPI(group).SetTranslate(Gf.Vec3d(1, 2, 3))
+        UsdGeom.XformCommonAPI(group).SetRotate(Gf.Vec3f(0, 90, 0))
+        parent = UsdGeom.Xform.Define(stage, parent_path)
+        UsdGeom.XformCommonAPI(parent).SetTranslate(Gf.Vec3d(5, 0, 0))
+
+        cube_paths = []
+        for i in range(10):
+            cube = UsdGeom.Cube.Define(stage, default_prim_path.AppendChild(f"Cube{i}"))
+            UsdGeom.XformCommonAPI(cube).SetTranslate(Gf.Vec3d(i, 0, 0))
+            cube_paths.append(cube.GetPath())
+        targets = stage.DefinePrim(default_prim_path.AppendChild("Targets")).CreateRelationship("cubes")
+        targets.SetTargets(cube_paths + [parent_path])
+        variant_prim = stage.DefinePrim(default_prim_path.AppendChild("Variants"))
+        variant_set = variant_prim.GetVariantSets().AddVariantSet("v")
+        variant_set.AddVariant("x")
+        variant_set.SetVariantSelection("x")
+        with variant_set.GetVariantEditContext():
+            variant_prim.GetInherits().AddInherit(cube_paths[0])
+            variant_prim.CreateRelationship("cube").SetTargets([cube_paths[1]])
+        variant_spec = stage.GetEditTarget().GetLayer().GetPrimAtPath(
+            variant_prim.GetPath().AppendVariantSelection("v", "x")
+        )
+        world_matrices = {
+            path: omni.usd.get_world_transform_matrix(stage.GetPrimAtPath(path)) for path in cube_paths + [parent_path]
+        }
+        children_order = [prim.GetName() for prim in stage.GetPrimAtPath(default_prim_path).GetChildren()]
+
+        # The first cube goes under the new location of Parent, which is kept in place as well
+        new_parent_path = group_path.AppendChild("Parent")
+        paths_to_move = {parent_path: new_parent_path, cube_paths[0]: new_parent_path.AppendChild("Cube0")}
+        for path in cube_paths[1:]:
+            paths_to_move[path] = group_path.AppendChild(path.name)
+
+        undo_count = len(omni.kit.undo.get_undo_stack())
+        omni.kit.commands.execute("MovePrims", paths_to_move=paths_to_move)
+        self.assertEqual(len(omni.kit.undo.get_undo_stack()), undo_count + 1)
+        for old_path, new_path in paths_to_move.items():
+            self.assertFalse(stage.GetPrimAtPath(old_path))
+            new_prim = stage.GetPrimAtPath(new_path)
+            self.assertTrue(new_prim)
+            self.assertTrue(Gf.IsClose(omni.usd.get_world_transform_matrix(new_prim), world_matrices[old_path], 1e-4))
+        self.assertEqual(targets.GetTargets(), [paths_to_move[path] for path in cube_paths + [parent_path]])
+        # the arcs and relationships authored in variants are retargeted too
+        self.assertEqual(list(variant_spec.inheritPathList.prependedItems), [paths_to_move[cube_paths[0]]])
+        self.assertEqual(variant_prim.GetRelationship("cube").GetTargets(), [paths_to_move[cube_paths[1]]])
+
+        omni.kit.undo.undo()
+        for old_path, new_path in paths_to_move.items():
+            self.assertFalse(stage.GetPrimAtPath(new_path))
+            old_prim = stage.GetPrimAtPath(old_path)
+            self.assertTrue(old_prim)
+            self.assertTrue(Gf.IsClose(omni.usd.get_world_transform_matrix(old_prim), world_matrices[old_path], 1e-4))
+        self.assertEqual(targets.GetTargets(), cube_paths + [parent_path])
+        self.assertEqual(list(variant_spec.inheritPathList.prependedItems), [cube_paths[0]])
+        self.assertEqual(variant_prim.GetRelationship("cube").GetTargets(), [cube_paths[1]])
+        children_names = [prim.GetName() for prim in stage.GetPrimAtPath(default_prim_path).GetChildren()]
+        self.assertEqual(children_names, children_order)
+
+        omni.kit.undo.redo()
+        for new_path in paths_to_move.values():
+            self.assertTrue(stage.GetPrimAtPath(new_path))
+
+        # Prims moved to the same name get distinct free paths
+        omni.kit.commands.execute(
+            "MovePrims",
+            paths_to_move={
+                group_path.AppendChild("Cube1"): default_prim_path.AppendChild("Cube"),
+                group_path.AppendChild("Cube2"): default_prim_path.AppendChild("Cube"),
+            },
+        )
+        self.assertTrue(stage.GetPrimAtPath(default_prim_path.AppendChild("Cube")))
+        self.assertTrue(stage.GetPrimAtPath(default_prim_path.AppendChild("Cube_01")))
+
+        # A prim can be moved to the path of a prim moved away earlier in the batch
+        cube_path = default_prim_path.AppendChild("Cube")
+        cube_01_path = default_prim_path.AppendChild("Cube_01")
+        cube_02_path = default_prim_path.AppendChild("Cube_02")
+        tmp_path = default_prim_path.AppendChild("Tmp")
+        world_matrices = {
+            path: omni.usd.get_world_transform_matrix(stage.GetPrimAtPath(path)) for path in (cube_path, cube_01_path)
+        }
+        omni.kit.commands.execute("MovePrims", paths_to_move={cube_path: tmp_path, cube_01_path: cube_path})
+        self.assertFalse(stage.GetPrimAtPath(cube_01_path))
+        for old_path, new_path in ((cube_path, tmp_path), (cube_01_path, cube_path)):
+            new_prim = stage.GetPrimAtPath(new_path)
+            self.assertTrue(new_prim)
+            self.assertTrue(Gf.IsClose(omni.usd.get_world_transform_matrix(new_prim), world_matrices[old_path], 1e-4))
+        omni.kit.undo.undo()
+        self.assertFalse(stage.GetPrimAtPath(tmp_path))
+
+        # When swapping two prims, the first one is moved to a free path but the second one takes its place
+        omni.kit.commands.execute("MovePrims", paths_to_move={cube_path: cube_01_path, cube_01_path: cube_path})
+        for old_path, new_path in ((cube_path, cube_02_path), (cube_01_path, cube_path)):
+            new_prim = stage.GetPrimAtPath(new_path)
+            self.assertTrue(new_prim)
+            self.assertTrue(Gf.IsClose(omni.usd.get_world_transform_matrix(new_prim), world_matrices[old_path], 1e-4))
+        self.assertFalse(stage.GetPrimAtPath(cube_01_path))
+        omni.kit.undo.undo()
+        for path in (cube_path, cube_01_path):
+            prim = stage.GetPrimAtPath(path)
+            self.assertTrue(prim)
+            self.assertTrue(Gf.IsClose(omni.usd.get_world_transform_matrix(prim), world_matrices[path], 1e-4))
+        self.assertFalse(stage.GetPrimAtPath(cube_02_path))
+
     async def test_toggle_visibility_selected(self):
         carb.log_info("Test ToggleVisibilitySelectedPrimsCommand")
         timeline = omni.timeline.get_timeline_interface()
@@ -1178,6 +1508,59 @@ class TestUsdCommands(omni.kit.test.AsyncTestCase):
         omni.kit.undo.redo()
         self.assertFalse(cube.GetAttribute("another_fake").IsValid())
 
+    async def test_change_property_merge(self):
+        stage = omni.usd.get_context().get_stage()
+        default_prim_path = getStageDefaultPrimPath(stage)
+
+        omni.kit.commands.execute("CreatePrim", prim_type="Cube")
+        cube = stage.GetPrimAtPath(default_prim_path.AppendChild("Cube"))
+        size_attr = cube.GetAttribute("size")
+        size_attr_path = size_attr.GetPath()
+
+        # Commands are not merged unless merging is enabled
+        undo_stack = omni.kit.undo.get_undo_stack()
+        undo_stack_len = len(undo_stack)
+        omni.kit.commands.execute("ChangeProperty", prop_path=size_attr_path, value=3.0, prev=None)
+        omni.kit.commands.execute("ChangeProperty", prop_path=size_attr_path, value=4.0, prev=None)
+        self.assertEqual(len(undo_stack), undo_stack_len + 2)
+        omni.kit.undo.undo()
+        omni.kit.undo.undo()
+        self.assertEqual(size_attr.Get(), 2.0)
+
+        omni.kit.undo.set_undo_merge_time_window(60)
+        self.addCleanup(omni.kit.undo.set_undo_merge_time_window)
+
+        for value in range(3, 8):
+            omni.kit.commands.execute("ChangeProperty", prop_path=size_attr_path, value=float(value), prev=None)
+        self.assertEqual(size_attr.Get(), 7.0)
+        self.assertEqual(len(undo_stack), undo_stack_len + 1)
+        command = undo_stack[-1].command
+
+        # Changes of another property, or creating a property, are not merged
+        omni.kit.commands.execute(
+            "ChangeProperty",
+            prop_path=default_prim_path.AppendChild("Cube").AppendProperty("not_exist"),
+            value=True,
+            prev=None,
+            type_to_create_if_not_exist=Sdf.ValueTypeNames.Bool,
+        )
+        self.assertEqual(len(undo_stack), undo_stack_len + 2)
+        self.assertFalse(command.can_merge(undo_stack[-1].command))
+        omni.kit.commands.execute("ChangeProperty", prop_path=size_attr_path, value=8.0, prev=None, timecode=Usd.TimeCode(1))
+        self.assertEqual(len(undo_stack), undo_stack_len + 3)
+        self.assertFalse(command.can_merge(undo_stack[-1].command))
+
+        omni.kit.undo.undo()
+        omni.kit.undo.undo()
+        self.assertFalse(cube.GetAttribute("not_exist").IsValid())
+        self.assertEqual(size_attr.Get(), 7.0)
+
+        # Undo restores the value before the first of the merged commands, redo the last one
+        omni.kit.undo.undo()
+        self.assertEqual(size_attr.Get(), 2.0)
+        omni.kit.undo.redo()
+        self.assertEqual(size_attr.Get(), 7.0)
+
     async def test_relationship_target(self):
         stage = omni.usd.get_context().get_stage()
         xform = UsdGeom.Xform.Define(stage, "/Xform")
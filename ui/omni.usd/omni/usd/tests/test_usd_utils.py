@@ -8,10 +8,11 @@
 ##
 
 from pathlib import Path
+import omni.kit.app
 import omni.kit.test
 import omni.usd
 
-from pxr import Sdf, Usd, UsdGeom, Gf
+from pxr import Sdf, Usd, UsdGeom, UsdShade, Gf
 
 
 class TestUsdUtils(omni.kit.test.AsyncTestCase):
@@ -112,6 +113,33 @@ class TestUsdUtils(omni.kit.test.AsyncTestCase):
         # Verifies path without leading slash matching default prim is correct but not modified
         path = omni.usd.get_stage_next_free_path(stage, "/World/Path", True)
         self.assertEqual(path, "/World/Path")
+
+    async def test_get_stage_next_free_paths(self):
+        stage = omni.usd.get_context().get_stage()
+        for name in ["Cube", "Cube_01", "Cube_03", "Cube_7"]:
+            stage.DefinePrim(f"/World/{name}")
+
+        # First free suffixes, created or removed prims are taken into account
+        self.assertEqual(omni.usd.get_stage_next_free_path(stage, "/World/Cube", False), "/World/Cube_02")
+        stage.DefinePrim("/World/Cube_02")
+        self.assertEqual(omni.usd.get_stage_next_free_path(stage, "/World/Cube", False), "/World/Cube_04")
+        stage.RemovePrim("/World/Cube_01")
+        self.assertEqual(omni.usd.get_stage_next_free_path(stage, "/World/Cube", False), "/World/Cube_01")
+        self.assertEqual(omni.usd.get_stage_next_free_path(stage, "/World/Cube_7", False), "/World/Cube_08")
+
+        # Same paths as the ones returned one by one, creating a prim at each of them
+        paths = omni.usd.get_stage_next_free_paths(stage, "/World/Cube", 4, False)
+        self.assertListEqual(paths, ["/World/Cube_01", "/World/Cube_04", "/World/Cube_05", "/World/Cube_06"])
+        paths = omni.usd.get_stage_next_free_paths(stage, "/World/Sphere", 2, False)
+        self.assertListEqual(paths, ["/World/Sphere", "/World/Sphere_01"])
+        paths = omni.usd.get_stage_next_free_paths(stage, "/World/Cube", 4, False)
+        for path in paths:
+            self.assertEqual(omni.usd.get_stage_next_free_path(stage, "/World/Cube", False), path)
+            stage.DefinePrim(path)
+
+        # Children listed again when their parent is resynced
+        stage.RemovePrim("/World")
+        self.assertEqual(omni.usd.get_stage_next_free_path(stage, "/World/Cube", False), "/World/Cube")
     
     def _get_test_stage_with_references_and_payloads(self):
         layer_content = '''\
@@ -311,6 +339,53 @@ class TestUsdUtils(omni.kit.test.AsyncTestCase):
         # Mute prepend layer, payload should be empty
         await mute_and_test(layers["prepend"], [])
     
+    async def test_get_composed_arcs_from_prims(self):
+        stage, _, layers = self._get_test_stage_with_references_and_payloads()
+        root_prim = stage.GetPrimAtPath("/root")
+        child_prim = stage.DefinePrim("/root/child")
+        child_prim.GetReferences().AddReference("assets/Child.usda")
+
+        def get_asset_paths(arc_and_layers):
+            return [arc.assetPath for arc, _ in arc_and_layers]
+
+        # Same arcs as the ones returned prim by prim
+        composed_arcs = omni.usd.get_composed_arcs_from_prims([root_prim, child_prim])
+        self.assertEqual(len(composed_arcs), 2)
+        for prim, arcs in zip([root_prim, child_prim], composed_arcs):
+            self.assertEqual(arcs.references, omni.usd.get_composed_references_from_prim(prim))
+            self.assertEqual(arcs.payloads, omni.usd.get_composed_payloads_from_prim(prim))
+        self.assertEqual(get_asset_paths(composed_arcs[0].references), ["assets/Sphere.usda", "assets/Cylinder.usda"])
+        self.assertEqual(get_asset_paths(composed_arcs[1].references), ["assets/Child.usda"])
+
+        # The results can be modified without changing the cached ones
+        composed_arcs[0].references.clear()
+        self.assertEqual(len(omni.usd.get_composed_references_from_prim(root_prim)), 2)
+
+        # Resynced prims are composed again
+        child_prim.GetReferences().AddReference("assets/Child2.usda")
+        self.assertEqual(
+            get_asset_paths(omni.usd.get_composed_references_from_prim(child_prim)),
+            ["assets/Child.usda", "assets/Child2.usda"],
+        )
+        stage.MuteLayer(layers["append"].identifier)
+        composed_arcs = omni.usd.get_composed_arcs_from_prims([root_prim, child_prim])
+        self.assertEqual(get_asset_paths(composed_arcs[0].references), ["assets/Sphere.usda"])
+        self.assertEqual(get_asset_paths(composed_arcs[0].payloads), ["assets/Sphere.usda"])
+
+        with Usd.EditContext(stage, layers["prepend"]):
+            stage.OverridePrim("/root/child").GetReferences().AddReference("assets/Child3.usda")
+        self.assertEqual(
+            get_asset_paths(omni.usd.get_composed_references_from_prim(child_prim)),
+            ["assets/Child.usda", "assets/Child2.usda", "assets/Child3.usda"],
+        )
+        # So are the descendants of a resynced prim
+        with Usd.EditContext(stage, layers["prepend"]):
+            stage.RemovePrim("/root")
+        self.assertEqual(
+            get_asset_paths(omni.usd.get_composed_references_from_prim(child_prim)),
+            ["assets/Child.usda", "assets/Child2.usda"],
+        )
+
     async def test_get_introducing_layer(self):
         root_layer = Sdf.Layer.CreateAnonymous()
         reference_layer = Sdf.Layer.CreateAnonymous()
@@ -581,3 +656,70 @@ def Xform "test" (
 
 
 
+
+    async def test_prim_caching_index(self):
+        usd_context = omni.usd.get_context()
+        stage = usd_context.get_stage()
+        UsdShade.Material.Define(stage, "/World/Looks/Material0")
+        UsdGeom.Cube.Define(stage, "/World/Cube")
+
+        changes = []
+        cache = omni.usd.PrimCaching(UsdShade.Material, stage, on_prims_changed=lambda c: changes.append(c))
+        self.assertEqual(cache.get_prim_paths(), {Sdf.Path("/World/Looks/Material0")})
+        cache.set_cache_state(True)
+
+        # prims of other types don't invalidate the cache
+        stage.RemovePrim("/World/Cube")
+        await omni.kit.app.get_app().next_update_async()
+        await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(changes, [])
+        self.assertTrue(cache.get_cache_state())
+
+        UsdShade.Material.Define(stage, "/World/Looks/Material1")
+        UsdShade.Material.Get(stage, "/World/Looks/Material0").GetPrim().SetMetadata("comment", "test")
+        await omni.kit.app.get_app().next_update_async()
+        await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].added, {Sdf.Path("/World/Looks/Material1")})
+        self.assertEqual(changes[0].removed, set())
+        self.assertEqual(changes[0].updated, {Sdf.Path("/World/Looks/Material0")})
+        self.assertFalse(cache.get_cache_state())
+
+        # queries include the changes which were not processed yet
+        stage.RemovePrim("/World/Looks")
+        self.assertFalse(cache.contains("/World/Looks/Material0"))
+        self.assertEqual(cache.get_prim_paths(), set())
+        self.assertEqual(changes[-1].removed, {Sdf.Path("/World/Looks/Material0"), Sdf.Path("/World/Looks/Material1")})
+        # the removed paths are dropped from the index of the subtrees
+        self.assertFalse(cache._children.get(Sdf.Path.absoluteRootPath))
+
+        cache.destroy()
+
+    async def test_prim_caching_shared_listener(self):
+        usd_context = omni.usd.get_context()
+        stage = usd_context.get_stage()
+
+        materials_changed = []
+        cubes_changed = []
+        materials = omni.usd.PrimCaching(UsdShade.Material, stage, on_changed=lambda: materials_changed.append(True))
+        cubes = omni.usd.PrimCaching(UsdGeom.Cube, stage, on_changed=lambda: cubes_changed.append(True))
+        self.assertIs(materials._hub, cubes._hub)
+        self.assertEqual(cubes.get_prim_paths(), set())
+
+        UsdGeom.Cube.Define(stage, "/World/Cube")
+        await omni.kit.app.get_app().next_update_async()
+        await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(cubes.get_prim_paths(), {Sdf.Path("/World/Cube")})
+        self.assertEqual(len(cubes_changed), 1)
+        # without an index, the material cache is only invalidated by materials
+        self.assertEqual(materials_changed, [])
+
+        # a new stage moves both caches to it
+        await usd_context.new_stage_async()
+        self.assertIs(materials._hub, cubes._hub)
+        self.assertEqual(materials.get_stage(), usd_context.get_stage())
+
+        materials.destroy()
+        self.assertIsNotNone(cubes._hub)
+        cubes.destroy()
+        self.assertIsNone(cubes._hub)
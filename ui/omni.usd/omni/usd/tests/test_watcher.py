@@ -0,0 +1,265 @@
+## Copyright (c) 2021, NVIDIA CORPORATION.  All rights reserved.
+##
+## NVIDIA CORPORATION and its licensors retain all intellectual property
+## and proprietary rights in and to this software, related documentation
+## and any modifications thereto.  Any use, reproduction, disclosure or
+## distribution of this software and related documentation without an express
+## license agreement from NVIDIA CORPORATION is strictly prohibited.
+##
+import time
+import omni.kit.app
+import omni.kit.test
+import omni.usd
+
+from omni.usd._impl.watcher import EventDispatcher, _coalesce_changes
+from pxr import Sdf, Usd
+
+
+class TestUsdWatcher(omni.kit.test.AsyncTestCase):
+    def _dispatch(self, dispatcher, paths):
+        dispatcher.on_changes([Sdf.Path(path) for path in paths])
+        dispatcher.pump()
+
+    def test_dispatcher_exact_path(self):
+        dispatcher = EventDispatcher()
+        changed = []
+        sub = dispatcher.subscribe_on_change("/World/Cube", lambda path: changed.append(path))
+
+        # property changes are sent to the prim subscription, with the property path
+        self._dispatch(dispatcher, ["/World/Cube", "/World/Cube.size", "/World", "/World/Cube/Child"])
+        self.assertEqual(sorted(changed), [Sdf.Path("/World/Cube"), Sdf.Path("/World/Cube.size")])
+
+        changed.clear()
+        sub = None
+        self._dispatch(dispatcher, ["/World/Cube"])
+        self.assertEqual(changed, [])
+
+    def test_dispatcher_subtree(self):
+        dispatcher = EventDispatcher()
+        changed = []
+        sub = dispatcher.subscribe_on_change("/World", lambda path: changed.append(path), subtree=True)
+
+        self._dispatch(dispatcher, ["/World/Car/Wheel.radius", "/World", "/Other"])
+        self.assertEqual(sorted(changed), [Sdf.Path("/World"), Sdf.Path("/World/Car/Wheel.radius")])
+
+    def test_dispatcher_descendants(self):
+        dispatcher = EventDispatcher(notify_descendants=True)
+        changed = []
+        subs = [
+            dispatcher.subscribe_on_change("/World/Car/Wheel", lambda path: changed.append(("wheel", path))),
+            dispatcher.subscribe_on_change("/World/Car", lambda path: changed.append(("car", path)), subtree=True),
+            dispatcher.subscribe_on_change("/Other", lambda path: changed.append(("other", path))),
+        ]
+
+        # a resync of an ancestor reaches the subscribers of its descendants, with the resynced path
+        self._dispatch(dispatcher, ["/World"])
+        self.assertEqual(sorted(changed), [("car", Sdf.Path("/World")), ("wheel", Sdf.Path("/World"))])
+
+        changed.clear()
+        self._dispatch(dispatcher, ["/"])
+        self.assertEqual(len(changed), 3)
+
+        # unsubscribing removes the paths from the tree
+        subs = None
+        self.assertFalse(dispatcher._root.children)
+
+    async def test_watcher_resync_subtree(self):
+        usd_context = omni.usd.get_context()
+        await usd_context.new_stage_async()
+        stage = usd_context.get_stage()
+        stage.DefinePrim("/World/Car/Wheel")
+        await omni.kit.app.get_app().next_update_async()
+
+        resynced = []
+        sub = omni.usd.get_watcher().subscribe_to_resync_path("/World/Car/Wheel", lambda path: resynced.append(path))
+        stage.RemovePrim("/World")
+        await omni.kit.app.get_app().next_update_async()
+        self.assertIn(Sdf.Path("/World"), resynced)
+
+        await usd_context.close_stage_async()
+
+    def test_coalesce_changes(self):
+        resynced = {Sdf.Path(path) for path in ["/World", "/World/Car/Wheel", "/World/Car.size", "/Other.x"]}
+        changed_info = {Sdf.Path(path) for path in ["/World/Car/Wheel.radius", "/Other.x", "/Other.y"]}
+        resynced, changed_info = _coalesce_changes(resynced, changed_info)
+        self.assertEqual(sorted(resynced), [Sdf.Path("/Other.x"), Sdf.Path("/World")])
+        # info only changes go to the info only subscribers, they are not covered by resyncs
+        self.assertEqual(
+            sorted(changed_info), [Sdf.Path("/Other.x"), Sdf.Path("/Other.y"), Sdf.Path("/World/Car/Wheel.radius")]
+        )
+
+        resynced, changed_info = _coalesce_changes({Sdf.Path("/")}, changed_info)
+        self.assertEqual(resynced, [Sdf.Path("/")])
+        self.assertEqual(len(changed_info), 3)
+
+    async def test_watcher_stats(self):
+        usd_context = omni.usd.get_context()
+        await usd_context.new_stage_async()
+        stage = usd_context.get_stage()
+        await omni.kit.app.get_app().next_update_async()
+
+        prim = stage.DefinePrim("/World/Car")
+        for i in range(10):
+            stage.DefinePrim(f"/World/Car/Wheel{i}")
+        prim.CreateAttribute("size", Sdf.ValueTypeNames.Double).Set(1.0)
+        await omni.kit.app.get_app().next_update_async()
+
+        stats = omni.usd.get_watcher().get_stats()
+        self.assertGreater(stats.resynced_received, stats.resynced_dispatched)
+        self.assertEqual(stats.changed_info_backlog, 0)
+
+        await usd_context.close_stage_async()
+
+    async def test_watcher_scoped_to_stage(self):
+        usd_context = omni.usd.get_context()
+        await usd_context.new_stage_async()
+        await omni.kit.app.get_app().next_update_async()
+
+        resynced = []
+        sub = omni.usd.get_watcher().subscribe_to_resync_path("/", lambda path: resynced.append(path), subtree=True)
+
+        # changes of other stages don't reach the watcher of the UsdContext
+        other_stage = Usd.Stage.CreateInMemory()
+        other_stage.DefinePrim("/World/Cube")
+        await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(resynced, [])
+        self.assertEqual(omni.usd.get_watcher().get_stats().resynced_received, 0)
+
+        # a watcher of the other stage receives them
+        other_resynced = []
+        other_watcher = omni.usd.UsdWatcher(stage=other_stage)
+        other_sub = other_watcher.subscribe_to_resync_path("/World", lambda path: other_resynced.append(path))
+        other_stage.RemovePrim("/World")
+        await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(other_resynced, [Sdf.Path("/World")])
+        self.assertEqual(resynced, [])
+        other_watcher.destroy()
+
+        # subscriptions are kept when a new stage is opened in the UsdContext
+        await usd_context.new_stage_async()
+        usd_context.get_stage().DefinePrim("/World")
+        await omni.kit.app.get_app().next_update_async()
+        self.assertIn(Sdf.Path("/World"), resynced)
+
+        await usd_context.close_stage_async()
+
+    async def test_watcher_context_created_later(self):
+        context_name = "test_watcher_context"
+
+        # a watcher which could not bind to the UsdContext is not kept
+        watcher = omni.usd.get_watcher(context_name)
+        self.assertIsNot(omni.usd.get_watcher(context_name), watcher)
+
+        usd_context = omni.usd.create_context(context_name)
+        await usd_context.new_stage_async()
+        watcher = omni.usd.get_watcher(context_name)
+        self.assertIs(omni.usd.get_watcher(context_name), watcher)
+
+        resynced = []
+        sub = watcher.subscribe_to_resync_path("/World", lambda path: resynced.append(path))
+        usd_context.get_stage().DefinePrim("/World")
+        await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(resynced, [Sdf.Path("/World")])
+
+        # the watcher follows the UsdContext when it is created again and keeps its subscriptions
+        await usd_context.close_stage_async()
+        omni.usd.destroy_context(context_name)
+        usd_context = omni.usd.create_context(context_name)
+        await usd_context.new_stage_async()
+        self.assertIs(omni.usd.get_watcher(context_name), watcher)
+        resynced.clear()
+        usd_context.get_stage().DefinePrim("/World")
+        await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(resynced, [Sdf.Path("/World")])
+
+        await usd_context.close_stage_async()
+        omni.usd.destroy_context(context_name)
+
+    async def test_watcher_frame_budget(self):
+        stage = Usd.Stage.CreateInMemory()
+        watcher = omni.usd.UsdWatcher(stage=stage)
+        watcher.set_frame_budget(0.001)
+
+        changed = []
+
+        def on_change(path):
+            changed.append(path)
+            time.sleep(0.001)
+
+        sub_resync = watcher.subscribe_to_resync_path("/", on_change, subtree=True)
+        sub_info = watcher.subscribe_to_change_info_path("/", on_change, subtree=True)
+        for i in range(5):
+            stage.DefinePrim(f"/World{i}").SetMetadata("comment", "test")
+        await omni.kit.app.get_app().next_update_async()
+
+        # one path per update, resyncs first
+        stats = watcher.get_stats()
+        self.assertEqual(stats.resynced_dispatched, 1)
+        self.assertEqual(stats.resynced_backlog, 4)
+        self.assertEqual(len(changed), 1)
+
+        # then the info only changes
+        for _ in range(10):
+            await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(len(changed), 10)
+        self.assertEqual(watcher.get_stats().resynced_backlog, 0)
+        self.assertEqual(watcher.get_stats().changed_info_backlog, 0)
+        watcher.destroy()
+
+    async def test_watcher_info_under_resync(self):
+        stage = Usd.Stage.CreateInMemory()
+        attr = stage.DefinePrim("/World/Car").CreateAttribute("size", Sdf.ValueTypeNames.Double)
+        watcher = omni.usd.UsdWatcher(stage=stage)
+
+        # info only subscribers are notified of their changes even when an ancestor is resynced in the same update
+        changed = []
+        sub_info = watcher.subscribe_to_change_info_path("/World/Car.size", lambda path: changed.append(path))
+        await omni.kit.app.get_app().next_update_async()
+        stage.GetPrimAtPath("/World").SetTypeName("Xform")
+        attr.Set(2.0)
+        await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(changed, [Sdf.Path("/World/Car.size")])
+        watcher.destroy()
+
+    async def test_watcher_frame_budget_info_only(self):
+        stage = Usd.Stage.CreateInMemory()
+        for i in range(3):
+            stage.DefinePrim(f"/World{i}")
+        watcher = omni.usd.UsdWatcher(stage=stage)
+        # the budget is exhausted before anything is dispatched, one path is still dispatched per update
+        watcher.set_frame_budget(1e-9)
+
+        changed = []
+        sub_info = watcher.subscribe_to_change_info_path("/", lambda path: changed.append(path), subtree=True)
+        await omni.kit.app.get_app().next_update_async()
+        for i in range(3):
+            stage.GetPrimAtPath(f"/World{i}").SetMetadata("comment", "test")
+        await omni.kit.app.get_app().next_update_async()
+
+        stats = watcher.get_stats()
+        self.assertEqual(stats.changed_info_dispatched, 1)
+        self.assertEqual(stats.changed_info_backlog, 2)
+        self.assertEqual(len(changed), 1)
+
+        for _ in range(5):
+            await omni.kit.app.get_app().next_update_async()
+        self.assertEqual(len(changed), 3)
+        self.assertEqual(watcher.get_stats().changed_info_backlog, 0)
+        watcher.destroy()
+
+    async def test_watcher_notice_queue(self):
+        stage = Usd.Stage.CreateInMemory()
+        watcher = omni.usd.UsdWatcher(stage=stage)
+        resynced = []
+        sub = watcher.subscribe_to_resync_path("/World", lambda path: resynced.append(path))
+
+        # notices are only queued, their paths are processed by the next update
+        stage.DefinePrim("/World")
+        stage.DefinePrim("/World")
+        self.assertTrue(watcher._notices)
+        self.assertFalse(watcher._resync_dispatcher._dispatch_set)
+
+        await omni.kit.app.get_app().next_update_async()
+        self.assertFalse(watcher._notices)
+        self.assertEqual(resynced, [Sdf.Path("/World")])
+        watcher.destroy()